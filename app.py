@@ -3,14 +3,40 @@ import json
 import os
 from datetime import datetime, timedelta
 import folium
+from folium.plugins import MarkerCluster
+from folium.utilities import JsCode
+from branca.element import MacroElement
+from jinja2 import Template
 from streamlit_folium import st_folium
+from map_render import cached_folium_map
+from tile_cache import (
+    get_tile_cache, tile_url_template, bbox_around, count_tiles,
+    TILE_ATTRIBUTION, TILE_SERVER_URL, MAX_PREFETCH_TILES, AVERAGE_TILE_BYTES,
+)
 from PIL import Image
 import io
 import base64
+import hashlib
+import hmac
+import secrets
+import uuid
+import threading
+import numpy as np
 import pandas as pd
 import altair as alt
 import math
-import requests
+import time
+from geocoding import (
+    GeocodingService, shared_geocode_cache, PROVIDER_RATE_LIMITS,
+    start_batch_job, get_batch_job, clear_batch_job,
+)
+from itinerary import build_day_index, unresolved_location_texts, parse_day, day_hotels, hotel_location_text
+from spatial import GridIndex
+from routes import DistanceMatrix, leg_distances, optimize_route
+from http_client import http_get
+from circuit_breaker import provider_health
+from async_io import gather_calls, DEFAULT_TIMEOUT as GATHER_TIMEOUT
+from jobs import get_scheduler, INTERACTIVE, NORMAL, PREFETCH
 
 # Database layer: use Supabase when configured (Streamlit Cloud); else local files
 try:
@@ -27,6 +53,16 @@ except ImportError:
     def db_save_photo(place_id, filename, base64_data):
         return False
 
+# Offline reverse geocoder (bundled city index); falls back to Nominatim when unavailable
+try:
+    from offline_geocoder import reverse_geocode as offline_reverse_geocode
+    from offline_geocoder import lookup_city as offline_lookup_city
+except ImportError:
+    def offline_reverse_geocode(lat, lon):
+        return None
+    def offline_lookup_city(text):
+        return None
+
 # Page configuration
 st.set_page_config(
     page_title="USA CA Trip Planner",
@@ -106,6 +142,7 @@ NOTES_FILE = os.path.join(DATA_DIR, "notes.json")
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
 WEATHER_FILE = os.path.join(DATA_DIR, "weather.json")
 EXCHANGE_RATE_FILE = os.path.join(DATA_DIR, "exchange_rates.json")
+GEOCODE_CACHE_FILE = os.path.join(DATA_DIR, "geocode_cache.json")
 
 # Ensure data directory exists
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -327,83 +364,100 @@ def _save_exchange_rates_to_storage(data):
     with open(EXCHANGE_RATE_FILE, 'w') as f:
         json.dump(data, f, indent=2)
 
+def _load_geocode_cache_from_storage():
+    if use_database():
+        data = db_load("geocode_cache")
+        if data is not None:
+            return data
+    if os.path.exists(GEOCODE_CACHE_FILE):
+        with open(GEOCODE_CACHE_FILE, 'r') as f:
+            return json.load(f)
+    return {"entries": []}
+
+def _save_geocode_cache_to_storage(data):
+    if use_database() and db_save("geocode_cache", data):
+        return
+    with open(GEOCODE_CACHE_FILE, 'w') as f:
+        json.dump(data, f)
+
 # --- App-facing load/save: use session_state; mark dirty (persist only on "Save all") ---
+def _load_session_key(key, loader):
+    """
+    Session copy of a storage key, taken from the post-login warm-up read when
+    that read is already under way (waiting at most WARMUP_READ_WAIT_SECONDS);
+    otherwise read directly, so a busy scheduler never delays the first paint.
+    """
+    if key not in st.session_state:
+        data = None
+        future = st.session_state.get("warmup_storage", {}).pop(key, None)
+        if future is not None and future.started_at is not None:
+            try:
+                data = future.result(timeout=WARMUP_READ_WAIT_SECONDS)
+            except Exception:
+                data = None
+        st.session_state[key] = data if data is not None else loader()
+    return st.session_state[key]
+
 def load_places():
-    if "places" not in st.session_state:
-        st.session_state["places"] = _load_places_from_storage()
-    return st.session_state["places"]
+    return _load_session_key("places", _load_places_from_storage)
 
 def save_places(data):
     st.session_state["places"] = data
     st.session_state["dirty_places"] = True
+    # Bumped on every change so cached map renders are rebuilt
+    st.session_state["places_version"] = st.session_state.get("places_version", 0) + 1
 
 def load_todo():
-    if "todo" not in st.session_state:
-        st.session_state["todo"] = _load_todo_from_storage()
-    return st.session_state["todo"]
+    return _load_session_key("todo", _load_todo_from_storage)
 
 def save_todo(data):
     st.session_state["todo"] = data
     st.session_state["dirty_todo"] = True
 
 def load_trip_info():
-    if "trip_info" not in st.session_state:
-        st.session_state["trip_info"] = _load_trip_info_from_storage()
-    return st.session_state["trip_info"]
+    return _load_session_key("trip_info", _load_trip_info_from_storage)
 
 def save_trip_info(data):
     st.session_state["trip_info"] = data
     st.session_state["dirty_trip_info"] = True
 
 def load_packing():
-    if "packing" not in st.session_state:
-        st.session_state["packing"] = _load_packing_from_storage()
-    return st.session_state["packing"]
+    return _load_session_key("packing", _load_packing_from_storage)
 
 def save_packing(data):
     st.session_state["packing"] = data
     st.session_state["dirty_packing"] = True
 
 def load_budget():
-    if "budget" not in st.session_state:
-        st.session_state["budget"] = _load_budget_from_storage()
-    return st.session_state["budget"]
+    return _load_session_key("budget", _load_budget_from_storage)
 
 def save_budget(data):
     st.session_state["budget"] = data
     st.session_state["dirty_budget"] = True
 
 def load_notes():
-    if "notes" not in st.session_state:
-        st.session_state["notes"] = _load_notes_from_storage()
-    return st.session_state["notes"]
+    return _load_session_key("notes", _load_notes_from_storage)
 
 def save_notes(data):
     st.session_state["notes"] = data
     st.session_state["dirty_notes"] = True
 
 def load_users():
-    if "users" not in st.session_state:
-        st.session_state["users"] = _load_users_from_storage()
-    return st.session_state["users"]
+    return _load_session_key("users", _load_users_from_storage)
 
 def save_users(data):
     st.session_state["users"] = data
     st.session_state["dirty_users"] = True
 
 def load_weather():
-    if "weather" not in st.session_state:
-        st.session_state["weather"] = _load_weather_from_storage()
-    return st.session_state["weather"]
+    return _load_session_key("weather", _load_weather_from_storage)
 
 def save_weather(data):
     st.session_state["weather"] = data
     st.session_state["dirty_weather"] = True
 
 def load_exchange_rates():
-    if "exchange_rates" not in st.session_state:
-        st.session_state["exchange_rates"] = _load_exchange_rates_from_storage()
-    return st.session_state["exchange_rates"]
+    return _load_session_key("exchange_rates", _load_exchange_rates_from_storage)
 
 def save_exchange_rates(data):
     st.session_state["exchange_rates"] = data
@@ -427,39 +481,27 @@ def flush_all_to_storage():
             save_fn(st.session_state[key])
             if f"dirty_{key}" in st.session_state:
                 del st.session_state[f"dirty_{key}"]
+    # Geocode cache is shared by all sessions and normally written behind; flush it too
+    get_geocode_cache().maybe_persist(force=True)
 
-def get_usd_to_pln_rate(date_str=None):
-    """Get USD to PLN exchange rate from free API (exchangerate.host)"""
-    if date_str is None:
-        date_str = datetime.now().strftime("%Y-%m-%d")
-    
-    # Check cache first
-    rates_cache = load_exchange_rates()
-    if date_str in rates_cache:
-        cached_rate = rates_cache[date_str]
-        # Check if cache is from today (still valid)
-        if cached_rate.get("date") == date_str:
-            return cached_rate.get("rate")
-    
+def get_geocode_cache():
+    """Process-wide geocode result cache (persisted under the geocode_cache key)."""
+    return shared_geocode_cache(_load_geocode_cache_from_storage, _save_geocode_cache_to_storage, get_scheduler())
+
+def fetch_usd_to_pln_rate(date_str):
+    """Download the USD to PLN rate for date_str (YYYY-MM-DD). Returns None on failure; no cache access."""
     try:
         # Try exchangerate-api.com (free tier, no API key needed for basic usage)
         # Format: YYYY-MM-DD -> YYYYMMDD for historical API
         date_formatted = date_str.replace("-", "")
         url = f"https://api.exchangerate-api.com/v4/historical/USD/{date_formatted}"
-        response = requests.get(url, timeout=10)
+        response = http_get(url)
         
         if response.status_code == 200:
             data = response.json()
             if "rates" in data and "PLN" in data["rates"]:
                 rate = data["rates"]["PLN"]
                 if rate:
-                    # Cache the rate
-                    rates_cache[date_str] = {
-                        "rate": rate,
-                        "date": date_str,
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    save_exchange_rates(rates_cache)
                     return rate
     except Exception as e:
         pass
@@ -468,20 +510,13 @@ def get_usd_to_pln_rate(date_str=None):
     try:
         if date_str == datetime.now().strftime("%Y-%m-%d"):
             url = "https://api.exchangerate-api.com/v4/latest/USD"
-            response = requests.get(url, timeout=10)
+            response = http_get(url)
             
             if response.status_code == 200:
                 data = response.json()
                 if "rates" in data and "PLN" in data["rates"]:
                     rate = data["rates"]["PLN"]
                     if rate:
-                        # Cache the rate
-                        rates_cache[date_str] = {
-                            "rate": rate,
-                            "date": date_str,
-                            "timestamp": datetime.now().isoformat()
-                        }
-                        save_exchange_rates(rates_cache)
                         return rate
     except Exception as e:
         pass
@@ -493,23 +528,45 @@ def get_usd_to_pln_rate(date_str=None):
             "base": "USD",
             "symbols": "PLN"
         }
-        response = requests.get(url, params=params, timeout=10)
+        response = http_get(url, params=params)
         
         if response.status_code == 200:
             data = response.json()
             if data.get("success") and "rates" in data:
                 rate = data["rates"].get("PLN")
                 if rate:
-                    # Cache the rate
-                    rates_cache[date_str] = {
-                        "rate": rate,
-                        "date": date_str,
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    save_exchange_rates(rates_cache)
                     return rate
     except Exception as e:
         pass
+    return None
+
+def cache_exchange_rate(date_str, rate):
+    """Remember a downloaded rate in the exchange_rates store."""
+    rates_cache = load_exchange_rates()
+    rates_cache[date_str] = {
+        "rate": rate,
+        "date": date_str,
+        "timestamp": datetime.now().isoformat()
+    }
+    save_exchange_rates(rates_cache)
+
+def get_usd_to_pln_rate(date_str=None):
+    """Get USD to PLN exchange rate from free API (exchangerate.host)"""
+    if date_str is None:
+        date_str = datetime.now().strftime("%Y-%m-%d")
+    
+    # Check cache first
+    rates_cache = load_exchange_rates()
+    if date_str in rates_cache:
+        cached_rate = rates_cache[date_str]
+        # Check if cache is from today (still valid)
+        if cached_rate.get("date") == date_str:
+            return cached_rate.get("rate")
+    
+    rate = fetch_usd_to_pln_rate(date_str)
+    if rate:
+        cache_exchange_rate(date_str, rate)
+        return rate
     
     # Fallback to cached rate if available (even if old)
     if rates_cache:
@@ -520,8 +577,22 @@ def get_usd_to_pln_rate(date_str=None):
     # Final fallback - approximate rate
     return 4.0  # Approximate USD/PLN rate
 
-def get_city_from_coordinates(lat, lon):
-    """Get city name from coordinates using Nominatim (OpenStreetMap) - free, no API key"""
+def _reverse_cache_query(lat, lon):
+    return f"{float(lat):.4f},{float(lon):.4f}"
+
+def city_lookup_cached(lat, lon):
+    """True when the geocode cache already answers (lat, lon), even with "no city"."""
+    found, _ = get_geocode_cache().get("reverse", _reverse_cache_query(lat, lon))
+    return found
+
+def get_city_from_coordinates(lat, lon, online=True):
+    """Get city name from coordinates using Nominatim (OpenStreetMap) - free, no API key.
+    With online=False only the geocode cache is consulted."""
+    cache = get_geocode_cache()
+    cache_query = _reverse_cache_query(lat, lon)
+    found, cached_city = cache.get("reverse", cache_query)
+    if found or not online:
+        return cached_city
     try:
         url = "https://nominatim.openstreetmap.org/reverse"
         params = {
@@ -530,25 +601,68 @@ def get_city_from_coordinates(lat, lon):
             "format": "json",
             "addressdetails": 1
         }
-        headers = {
-            "User-Agent": "USA_Trip_Planner/1.0"
-        }
-        response = requests.get(url, params=params, headers=headers, timeout=5)
+        response = http_get(url, params=params, provider="nominatim")
         if response.status_code == 200:
             data = response.json()
             address = data.get("address", {})
             # Try to get city name (can be city, town, village, or municipality)
             city = address.get("city") or address.get("town") or address.get("village") or address.get("municipality")
-            if city:
-                return city
-            # Fallback to county or state
-            return address.get("county") or address.get("state", "Unknown")
+            if not city:
+                # Fallback to county or state
+                city = address.get("county") or address.get("state", "Unknown")
+            cache.put("reverse", cache_query, city)
+            return city
     except:
         pass
     return None
 
+def _pick_place_result(results, place_name):
+    """Choose the best Nominatim search result: California first, then US, then anything."""
+    # Prefer results in California
+    for result in results:
+        address = result.get("address", {})
+        state = address.get("state", "").upper()
+        country = address.get("country", "").upper()
+        
+        # Check if it's in California
+        if "CALIFORNIA" in state or "CA" in state or country == "UNITED STATES":
+            return {
+                "name": result.get("display_name", place_name).split(",")[0],  # Get first part of display name
+                "lat": float(result.get("lat", 0)),
+                "lon": float(result.get("lon", 0)),
+                "country": address.get("country", ""),
+                "admin1": address.get("state", "")
+            }
+    
+    # If no California match, return first US result
+    for result in results:
+        address = result.get("address", {})
+        country = address.get("country", "").upper()
+        if country == "UNITED STATES":
+            return {
+                "name": result.get("display_name", place_name).split(",")[0],
+                "lat": float(result.get("lat", 0)),
+                "lon": float(result.get("lon", 0)),
+                "country": address.get("country", ""),
+                "admin1": address.get("state", "")
+            }
+    
+    # Fallback to first result
+    result = results[0]
+    return {
+        "name": result.get("display_name", place_name).split(",")[0],
+        "lat": float(result.get("lat", 0)),
+        "lon": float(result.get("lon", 0)),
+        "country": result.get("address", {}).get("country", ""),
+        "admin1": result.get("address", {}).get("state", "")
+    }
+
 def geocode_place_name(place_name):
     """Geocode place name using Nominatim (OpenStreetMap) - better for specific places"""
+    cache = get_geocode_cache()
+    found, cached_result = cache.get("place", place_name)
+    if found:
+        return cached_result
     try:
         # Try multiple search variations
         search_queries = [
@@ -556,6 +670,7 @@ def geocode_place_name(place_name):
             f"{place_name}, Los Angeles, California",  # Add location context
             f"{place_name}, California, USA",  # Add state and country
         ]
+        answered = 0
         
         for query in search_queries:
             url = "https://nominatim.openstreetmap.org/search"
@@ -566,58 +681,29 @@ def geocode_place_name(place_name):
                 "addressdetails": 1,
                 "countrycodes": "us"  # Prioritize US results
             }
-            headers = {
-                "User-Agent": "USA_Trip_Planner/1.0"  # Required by Nominatim
-            }
             
-            response = requests.get(url, params=params, headers=headers, timeout=10)
+            response = http_get(url, params=params, provider="nominatim")
             if response.status_code == 200:
+                answered += 1
                 results = response.json()
                 if results:
-                    # Prefer results in California
-                    for result in results:
-                        address = result.get("address", {})
-                        state = address.get("state", "").upper()
-                        country = address.get("country", "").upper()
-                        
-                        # Check if it's in California
-                        if "CALIFORNIA" in state or "CA" in state or country == "UNITED STATES":
-                            return {
-                                "name": result.get("display_name", place_name).split(",")[0],  # Get first part of display name
-                                "lat": float(result.get("lat", 0)),
-                                "lon": float(result.get("lon", 0)),
-                                "country": address.get("country", ""),
-                                "admin1": address.get("state", "")
-                            }
-                    
-                    # If no California match, return first US result
-                    for result in results:
-                        address = result.get("address", {})
-                        country = address.get("country", "").upper()
-                        if country == "UNITED STATES":
-                            return {
-                                "name": result.get("display_name", place_name).split(",")[0],
-                                "lat": float(result.get("lat", 0)),
-                                "lon": float(result.get("lon", 0)),
-                                "country": address.get("country", ""),
-                                "admin1": address.get("state", "")
-                            }
-                    
-                    # Fallback to first result
-                    result = results[0]
-                    return {
-                        "name": result.get("display_name", place_name).split(",")[0],
-                        "lat": float(result.get("lat", 0)),
-                        "lon": float(result.get("lon", 0)),
-                        "country": result.get("address", {}).get("country", ""),
-                        "admin1": result.get("address", {}).get("state", "")
-                    }
+                    result = _pick_place_result(results, place_name)
+                    cache.put("place", place_name, result)
+                    return result
+        
+        # Only remember "not found" when every variant really answered with no results
+        if answered == len(search_queries):
+            cache.put("place", place_name, None)
     except Exception as e:
         pass
     return None
 
 def geocode_city_name(city_name):
     """Validate and geocode city name using Open-Meteo Geocoding API (for weather)"""
+    cache = get_geocode_cache()
+    found, cached_result = cache.get("city", city_name)
+    if found:
+        return cached_result
     try:
         url = "https://geocoding-api.open-meteo.com/v1/search"
         params = {
@@ -625,31 +711,99 @@ def geocode_city_name(city_name):
             "count": 1,
             "language": "en"
         }
-        response = requests.get(url, params=params, timeout=5)
+        response = http_get(url, params=params, provider="open-meteo")
         if response.status_code == 200:
             data = response.json()
             results = data.get("results", [])
+            city_info = None
             if results:
                 result = results[0]
-                return {
+                city_info = {
                     "name": result.get("name", city_name),
                     "lat": result.get("latitude"),
                     "lon": result.get("longitude"),
                     "country": result.get("country", ""),
                     "admin1": result.get("admin1", "")  # State/Province
                 }
+            cache.put("city", city_name, city_info)
+            return city_info
     except Exception as e:
         pass
     return None
 
+@st.cache_resource
+def get_geocoding_service():
+    """Shared (per-process) geocoding service, running on the background job scheduler."""
+    return GeocodingService(scheduler=get_scheduler())
+
+# Batch geocoding of every place without coordinates (runs in the background)
+BATCH_GEOCODE_JOB = "places_missing_coords"
+
+def batch_geocode_job_name():
+    """This session's batch job name; results go into this session's places, so jobs aren't shared."""
+    if "batch_geocode_job_name" not in st.session_state:
+        st.session_state.batch_geocode_job_name = f"{BATCH_GEOCODE_JOB}:{uuid.uuid4().hex}"
+    return st.session_state.batch_geocode_job_name
+
+def start_batch_geocode(places):
+    """Queue all places without coordinates on the geocoding service."""
+    queries = {p["id"]: p["name"] for p in places if p.get("lat") is None or p.get("lon") is None}
+    if queries:
+        start_batch_job(batch_geocode_job_name(), get_geocoding_service(), geocode_place_name, queries)
+
+def apply_batch_geocode_results(job):
+    """Write finished batch results into places with one save_places() call. Returns count found."""
+    results = job.results()
+    places_data = load_places()
+    updated = 0
+    for place in places_data.get("places", []):
+        city_info = results.get(place.get("id"))
+        if city_info and (place.get("lat") is None or place.get("lon") is None):
+            place["lat"] = city_info["lat"]
+            place["lon"] = city_info["lon"]
+            updated += 1
+    if updated:
+        save_places(places_data)
+    clear_batch_job(batch_geocode_job_name(), job)
+    return updated
+
+@st.fragment(run_every=1)
+def show_batch_geocode_progress(lang="en"):
+    """Live progress for the batch geocode job; applies results when it finishes."""
+    job = get_batch_job(batch_geocode_job_name())
+    if job is None:
+        return
+    if not job.is_done():
+        st.progress(job.done_count / max(job.total, 1),
+                    text=t("geocode_all_progress", lang).format(job.done_count, job.total))
+        return
+    found = apply_batch_geocode_results(job)
+    message = t("geocode_all_done", lang).format(found, job.total)
+    if found:
+        message += " " + t("geocode_all_unsaved", lang)
+    st.session_state.batch_geocode_message = message
+    st.rerun()
+
 def group_places_by_city(places):
-    """Group places by city name and calculate average coordinates"""
+    """
+    Group places by city name and calculate average coordinates. Cities come
+    from the bundled index or the geocode cache only (never the network);
+    start_city_lookups() fills in the rest in the background.
+    """
     city_groups = {}
     
+    place_cities = {}
+    for place in places:
+        if place.get("lat") and place.get("lon"):
+            offline_city = offline_reverse_geocode(place.get("lat"), place.get("lon"))
+            if offline_city:
+                place_cities[id(place)] = offline_city["name"]
+            else:
+                place_cities[id(place)] = get_city_from_coordinates(place.get("lat"), place.get("lon"), online=False)
+    
     for place in places:
         if place.get("lat") and place.get("lon"):
-            # Try to get city name from coordinates
-            city_name = get_city_from_coordinates(place.get("lat"), place.get("lon"))
+            city_name = place_cities.get(id(place))
             
             if not city_name:
                 # Fallback: use place name or "Unknown"
@@ -688,119 +842,545 @@ def group_places_by_city(places):
     
     return city_groups
 
-def get_weather_from_api(lat, lon, date):
-    """Fetch weather data from Open-Meteo API (free, no API key required)"""
+def _lookup_cities(coords):
+    """Background job: reverse-geocode each (lat, lon) on Nominatim; answers land in the geocode cache."""
+    for lat, lon in coords:
+        get_city_from_coordinates(lat, lon)
+    return len(coords)
+
+def start_city_lookups(places):
+    """
+    Queue one background job looking up the cities group_places_by_city()
+    couldn't resolve offline (each place is tried once per session). Never
+    blocks; returns the running job or None.
+    """
+    job = st.session_state.get("city_lookup_job")
+    if job is not None and not job.done():
+        return job
+    tried = st.session_state.setdefault("city_lookups_tried", set())
+    coords = []
+    for place in places:
+        lat, lon = place.get("lat"), place.get("lon")
+        if lat and lon and (lat, lon) not in tried and not offline_reverse_geocode(lat, lon) \
+                and get_city_from_coordinates(lat, lon, online=False) is None:
+            coords.append((lat, lon))
+    if not coords:
+        return None
+    tried.update(coords)
+    job = st.session_state.city_lookup_job = get_scheduler().submit("geocode", _lookup_cities, coords, priority=NORMAL)
+    return job
+
+@st.fragment(run_every=2)
+def show_city_lookup_progress(lang="en"):
+    """While the city lookups run, say so; rerun the page with the new cities when they finish."""
+    job = st.session_state.get("city_lookup_job")
+    if job is None:
+        return
+    if not job.done():
+        st.caption(t("city_lookup_pending", lang).format(len(job.args[0])))
+        return
+    del st.session_state["city_lookup_job"]
+    st.rerun()
+
+# Forecast cache: full 16-day forecasts per grid cell, kept in the "weather" store
+FORECAST_GRID_DEG = 0.1          # ~11 km cells; nearby places share one forecast
+FORECAST_TTL_SECONDS = 3600      # older forecasts are served but refreshed in the background
+FORECAST_MAX_AGE_SECONDS = 7 * 24 * 3600  # forecasts older than this are dropped from the store
+FORECAST_BATCH_SIZE = 50         # locations per Open-Meteo request in batch mode
+
+# Weather code mapping (WMO codes)
+WEATHER_CODES = {
+    0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
+    45: "Foggy", 48: "Depositing rime fog",
+    51: "Light drizzle", 53: "Moderate drizzle", 55: "Dense drizzle",
+    56: "Light freezing drizzle", 57: "Dense freezing drizzle",
+    61: "Slight rain", 63: "Moderate rain", 65: "Heavy rain",
+    66: "Light freezing rain", 67: "Heavy freezing rain",
+    71: "Slight snow", 73: "Moderate snow", 75: "Heavy snow",
+    77: "Snow grains", 80: "Slight rain showers", 81: "Moderate rain showers",
+    82: "Violent rain showers", 85: "Slight snow showers", 86: "Heavy snow showers",
+    95: "Thunderstorm", 96: "Thunderstorm with slight hail", 99: "Thunderstorm with heavy hail"
+}
+
+# Emoji per simplified condition
+WEATHER_ICONS = {
+    "Clear": "☀️",
+    "Cloudy": "☁️",
+    "Rain": "🌧️",
+    "Drizzle": "🌦️",
+    "Thunderstorm": "⛈️",
+    "Snow": "❄️",
+    "Foggy": "🌫️",
+    "Unknown": "🌤️"
+}
+
+def forecast_cell(lat, lon):
+    """Grid cell key for the forecast cache, e.g. "34.1,-118.3"."""
+    cell_lat = round(float(lat) / FORECAST_GRID_DEG) * FORECAST_GRID_DEG
+    cell_lon = round(float(lon) / FORECAST_GRID_DEG) * FORECAST_GRID_DEG
+    return f"{cell_lat:.1f},{cell_lon:.1f}"
+
+def fetch_forecasts_batch(coords):
+    """
+    Download 16-day daily forecasts for many (lat, lon) pairs in one Open-Meteo
+    request (the API takes comma-separated coordinate lists). Returns the daily
+    dicts in input order. Raises on failure.
+    """
+    url = "https://api.open-meteo.com/v1/forecast"
+    params = {
+        "latitude": ",".join(str(lat) for lat, _ in coords),
+        "longitude": ",".join(str(lon) for _, lon in coords),
+        "daily": "temperature_2m_max,temperature_2m_min,weathercode,precipitation_sum,windspeed_10m_max,winddirection_10m_dominant",
+        "temperature_unit": "fahrenheit",
+        "windspeed_unit": "mph",
+        "precipitation_unit": "inch",
+        "timezone": "auto",
+        "forecast_days": 16  # Get 16-day forecast
+    }
+    response = http_get(url, params=params)
+    response.raise_for_status()
+    data = response.json()
+    # A single location comes back as an object, several as a list
+    if isinstance(data, dict):
+        data = [data]
+    return [item.get("daily", {}) for item in data]
+
+def fetch_forecast(lat, lon):
+    """Download the full 16-day daily forecast from Open-Meteo (free, no API key). Raises on failure."""
+    return fetch_forecasts_batch([(lat, lon)])[0]
+
+def _forecast_entries():
+    """Cached forecasts {cell: entry} from the weather store (migrates the old list format)."""
+    weather_data = load_weather()
+    if not isinstance(weather_data.get("forecasts"), dict):
+        weather_data["forecasts"] = {}
+    return weather_data["forecasts"]
+
+def store_forecast(cell, daily):
+    """Put a downloaded forecast into the weather store."""
+    weather_data = load_weather()
+    entries = _forecast_entries()
+    entries[cell] = {
+        "daily": daily,
+        "fetched_at": datetime.now().isoformat()
+    }
+    # Drop forecasts nobody has refreshed for a week so the store doesn't grow forever
+    for old_cell in [c for c, e in entries.items() if _forecast_age_seconds(e) > FORECAST_MAX_AGE_SECONDS]:
+        del entries[old_cell]
+    save_weather(weather_data)
+
+def _forecast_age_seconds(entry):
     try:
-        # Open-Meteo API - completely free, no API key needed
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "daily": "temperature_2m_max,temperature_2m_min,weathercode,precipitation_sum,windspeed_10m_max,winddirection_10m_dominant",
-            "temperature_unit": "fahrenheit",
-            "windspeed_unit": "mph",
-            "precipitation_unit": "inch",
-            "timezone": "auto",
-            "forecast_days": 16  # Get 16-day forecast
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            daily = data.get("daily", {})
-            
-            # Find the forecast for the requested date
-            dates = daily.get("time", [])
-            target_date_str = date.strftime("%Y-%m-%d")
-            
-            if target_date_str in dates:
-                idx = dates.index(target_date_str)
-                
-                # Weather code mapping (WMO codes)
-                weather_codes = {
-                    0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
-                    45: "Foggy", 48: "Depositing rime fog",
-                    51: "Light drizzle", 53: "Moderate drizzle", 55: "Dense drizzle",
-                    56: "Light freezing drizzle", 57: "Dense freezing drizzle",
-                    61: "Slight rain", 63: "Moderate rain", 65: "Heavy rain",
-                    66: "Light freezing rain", 67: "Heavy freezing rain",
-                    71: "Slight snow", 73: "Moderate snow", 75: "Heavy snow",
-                    77: "Snow grains", 80: "Slight rain showers", 81: "Moderate rain showers",
-                    82: "Violent rain showers", 85: "Slight snow showers", 86: "Heavy snow showers",
-                    95: "Thunderstorm", 96: "Thunderstorm with slight hail", 99: "Thunderstorm with heavy hail"
-                }
-                
-                weathercode = daily.get("weathercode", [0])[idx] if idx < len(daily.get("weathercode", [])) else 0
-                condition = weather_codes.get(weathercode, "Unknown")
-                
-                # Simplify condition for display
-                if weathercode in [0, 1]:
-                    condition_short = "Clear"
-                elif weathercode in [2, 3]:
-                    condition_short = "Cloudy"
-                elif weathercode in [45, 48]:
-                    condition_short = "Foggy"
-                elif weathercode in [51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82]:
-                    condition_short = "Rain"
-                elif weathercode in [71, 73, 75, 77, 85, 86]:
-                    condition_short = "Snow"
-                elif weathercode in [95, 96, 99]:
-                    condition_short = "Thunderstorm"
-                else:
-                    condition_short = "Unknown"
-                
-                temp_max = daily.get("temperature_2m_max", [0])[idx] if idx < len(daily.get("temperature_2m_max", [])) else 0
-                temp_min = daily.get("temperature_2m_min", [0])[idx] if idx < len(daily.get("temperature_2m_min", [])) else 0
-                temp_avg = (temp_max + temp_min) / 2
-                
-                precipitation = daily.get("precipitation_sum", [0])[idx] if idx < len(daily.get("precipitation_sum", [])) else 0
-                wind_speed = daily.get("windspeed_10m_max", [0])[idx] if idx < len(daily.get("windspeed_10m_max", [])) else 0
-                wind_direction = daily.get("winddirection_10m_dominant", [0])[idx] if idx < len(daily.get("winddirection_10m_dominant", [])) else 0
-                
-                return {
-                    "temperature": round(temp_avg),
-                    "temp_max": round(temp_max),
-                    "temp_min": round(temp_min),
-                    "feels_like": round(temp_avg),  # Open-Meteo doesn't provide feels_like, use average
-                    "condition": condition_short,
-                    "description": condition,
-                    "precipitation": round(precipitation, 2),
-                    "wind_speed": round(wind_speed),
-                    "wind_direction": round(wind_direction),
-                    "weathercode": weathercode,
-                    "forecast_time": target_date_str
-                }
+        fetched_at = datetime.fromisoformat(entry.get("fetched_at", ""))
+    except (TypeError, ValueError):
+        return float("inf")
+    return (datetime.now() - fetched_at).total_seconds()
+
+def _forecast_is_stale(entry):
+    return _forecast_age_seconds(entry) > FORECAST_TTL_SECONDS
+
+def collect_forecast_refreshes():
+    """Move finished background refreshes into the weather store."""
+    pending = st.session_state.get("forecast_refreshes", {})
+    for cell, future in list(pending.items()):
+        if future.done():
+            del pending[cell]
+            if not future.cancelled() and future.exception() is None:
+                store_forecast(cell, future.result())
+
+def _schedule_forecast_refresh(cell):
+    pending = st.session_state.setdefault("forecast_refreshes", {})
+    if cell not in pending:
+        cell_lat, cell_lon = (float(v) for v in cell.split(","))
+        pending[cell] = get_scheduler().submit("forecast", fetch_forecast, cell_lat, cell_lon, priority=PREFETCH)
+
+def get_cached_forecast(lat, lon):
+    """Cached daily forecast for (lat, lon) or None; never waits on the network (stale entries refresh in the background)."""
+    collect_forecast_refreshes()
+    cell = forecast_cell(lat, lon)
+    entry = _forecast_entries().get(cell)
+    if not entry:
+        return None
+    if _forecast_is_stale(entry):
+        _schedule_forecast_refresh(cell)
+    return entry.get("daily")
+
+def get_forecast(lat, lon, date=None):
+    """
+    Full daily forecast for the grid cell around (lat, lon).
+    Fresh cache entries are returned as-is; stale ones are returned immediately
+    while a background refresh runs (stale-while-revalidate). The network is
+    only waited on when nothing is cached or the stale forecast lacks `date`.
+    """
+    collect_forecast_refreshes()
+    cell = forecast_cell(lat, lon)
+    entry = _forecast_entries().get(cell)
+    if entry:
+        if not _forecast_is_stale(entry):
+            return entry["daily"]
+        if date is None or date.strftime("%Y-%m-%d") in entry["daily"].get("time", []):
+            _schedule_forecast_refresh(cell)
+            return entry["daily"]
+    cell_lat, cell_lon = (float(v) for v in cell.split(","))
+    daily = fetch_forecast(cell_lat, cell_lon)
+    store_forecast(cell, daily)
+    return daily
+
+def prefetch_forecasts(locations):
+    """
+    Fill the forecast cache for many (lat, lon) locations using batched requests
+    (FORECAST_BATCH_SIZE cells per call). Only missing or stale cells are fetched.
+    Returns the number of cells downloaded.
+    """
+    collect_forecast_refreshes()
+    entries = _forecast_entries()
+    cells = []
+    for lat, lon in locations:
+        cell = forecast_cell(lat, lon)
+        entry = entries.get(cell)
+        if cell not in cells and (not entry or _forecast_is_stale(entry)):
+            cells.append(cell)
+    for cell, daily in download_forecasts(cells).items():
+        store_forecast(cell, daily)
+    return len(cells)
+
+def download_forecasts(cells):
+    """Fetch forecasts for grid cells, FORECAST_BATCH_SIZE per request. Returns {cell: daily}; no cache access."""
+    forecasts = {}
+    for start in range(0, len(cells), FORECAST_BATCH_SIZE):
+        chunk = cells[start:start + FORECAST_BATCH_SIZE]
+        coords = [tuple(float(v) for v in cell.split(",")) for cell in chunk]
+        forecasts.update(zip(chunk, fetch_forecasts_batch(coords)))
+    return forecasts
+
+def build_trip_forecast_table(city_groups):
+    """
+    Date × city table of cached forecasts, e.g. "☀️ 80°/61°". Days on which
+    the city has places planned are marked with 📍. Uses the cache only.
+    """
+    columns = {}
+    for city_name, city_info in city_groups.items():
+        if not city_info.get("lat") or not city_info.get("lon"):
+            continue
+        daily = get_cached_forecast(city_info["lat"], city_info["lon"])
+        if not daily:
+            continue
+        planned = {d.strftime("%Y-%m-%d") for d in city_info.get("dates", [])}
+        column = {}
+        for date_str in daily.get("time", []):
+            weather = weather_for_date(daily, datetime.strptime(date_str, "%Y-%m-%d").date())
+            if weather:
+                marker = "📍 " if date_str in planned else ""
+                icon = WEATHER_ICONS.get(weather["condition"], "🌤️")
+                column[date_str] = f"{marker}{icon} {weather['temp_max']}°/{weather['temp_min']}°"
+        columns[city_name] = column
+    if not columns:
+        return None
+    table = pd.DataFrame(columns).sort_index()
+    table.index.name = "Date"
+    return table.fillna("")
+
+# Itinerary weather (Weather page): where the group is each day, joined with cached forecasts
+ITINERARY_REFRESH_SECONDS = 30 * 60
+
+def resolve_location_cached(text):
+    """Coordinates for a free-text location without network: bundled city index, then geocode cache."""
+    if not text:
+        return None
+    city = offline_lookup_city(text)
+    if city:
+        return city
+    found, city_info = get_geocode_cache().get("city", text)
+    return city_info if found else None
+
+def offline_city_name(lat, lon):
+    """City name from the bundled index only (None when no city is close)."""
+    city = offline_reverse_geocode(lat, lon)
+    return city["name"] if city else None
+
+def _stale_cells(coords, skip):
+    """Forecast cells of `coords` not in `skip`, in order, without duplicates."""
+    cells = []
+    for lat, lon in coords:
+        cell = forecast_cell(lat, lon)
+        if cell not in skip and cell not in cells:
+            cells.append(cell)
+    return cells
+
+def _refresh_itinerary_forecasts(location_texts, coords, fresh_cells, deadline=None):
+    """
+    Background job: geocode hotel/flight locations not known yet (results land
+    in the shared geocode cache) while the forecasts for the known coordinates
+    download, then fetch the cells of the newly found places. With a
+    `deadline` (epoch seconds), stops waiting then and skips the second
+    download. Returns {cell: daily}.
+    """
+    known_cells = _stale_cells(coords, fresh_cells)
+    calls = {("city", text): ("geocode", geocode_city_name, text) for text in location_texts}
+    if known_cells:
+        calls["forecasts"] = ("forecast", download_forecasts, known_cells)
+    timeout = GATHER_TIMEOUT if deadline is None else max(1.0, deadline - time.time())
+    results = gather_calls(calls, timeout=timeout, priority=PREFETCH)
+    forecasts = results.get("forecasts")
+    forecasts = dict(forecasts) if isinstance(forecasts, dict) else {}
+    found = [
+        (info["lat"], info["lon"]) for key, info in results.items()
+        if key != "forecasts" and isinstance(info, dict) and info.get("lat") is not None
+    ]
+    new_cells = _stale_cells(found, set(fresh_cells) | set(known_cells))
+    if new_cells and (deadline is None or time.time() < deadline):
+        forecasts.update(download_forecasts(new_cells))
+    return forecasts
+
+def refresh_itinerary_weather(places, trip_info, force=False):
+    """Merge a finished background refresh and start the next one when due (never blocks)."""
+    state = st.session_state.setdefault("itinerary_weather", {"future": None, "refreshed_at": 0.0})
+    future = state["future"]
+    if future is not None:
+        if not future.done():
+            return
+        state["future"] = None
+        state["refreshed_at"] = time.time()
+        if not future.cancelled() and future.exception() is None:
+            for cell, daily in future.result().items():
+                store_forecast(cell, daily)
+    if not force and time.time() - state["refreshed_at"] < ITINERARY_REFRESH_SECONDS:
+        return
+    day_index = build_day_index(places, trip_info, resolve_location_cached, offline_city_name)
+    coords = [(loc["lat"], loc["lon"]) for locations in day_index.values() for loc in locations]
+    location_texts = unresolved_location_texts(trip_info, resolve_location_cached)
+    fresh_cells = {cell for cell, entry in _forecast_entries().items() if not _forecast_is_stale(entry)}
+    if coords or location_texts:
+        # Not a "forecast" job: it waits on the forecast/geocode jobs it starts
+        state["future"] = get_scheduler().submit(
+            "weather", _refresh_itinerary_forecasts, location_texts, coords, fresh_cells,
+            priority=NORMAL if force else PREFETCH,
+        )
+
+def build_itinerary_weather_rows(places, trip_info, lang="en"):
+    """One row per trip day and location, from cached data only (no network)."""
+    source_labels = {
+        "places": t("source_places", lang),
+        "hotel": t("source_hotel", lang),
+        "flight": t("source_flight", lang),
+    }
+    rows = []
+    day_index = build_day_index(places, trip_info, resolve_location_cached, offline_city_name)
+    for day, locations in day_index.items():
+        date_label = day.strftime("%a, %b %d")
+        if not locations:
+            rows.append({t("date", lang): date_label, t("where", lang): t("unknown_location", lang),
+                         t("forecast", lang): "", t("high_low", lang): "", t("precipitation", lang): "",
+                         t("based_on", lang): ""})
+            continue
+        for loc in locations:
+            daily = get_cached_forecast(loc["lat"], loc["lon"])
+            weather = weather_for_date(daily, day) if daily else None
+            if weather:
+                forecast = f"{WEATHER_ICONS.get(weather['condition'], '🌤️')} {weather['description']}"
+                high_low = f"{weather['temp_max']}° / {weather['temp_min']}°F"
+                precipitation = f"{weather['precipitation']} in"
             else:
-                return None
-        else:
-            return None
+                forecast = t("beyond_forecast", lang) if daily else "…"
+                high_low = precipitation = ""
+            rows.append({t("date", lang): date_label, t("where", lang): loc["name"],
+                         t("forecast", lang): forecast, t("high_low", lang): high_low,
+                         t("precipitation", lang): precipitation,
+                         t("based_on", lang): source_labels.get(loc["source"], loc["source"])})
+    return rows
+
+@st.fragment(run_every=30)
+def show_itinerary_weather(lang="en"):
+    """Trip-day weather table; re-renders from cache while refreshes run in the background."""
+    places = load_places().get("places", [])
+    trip_info = load_trip_info()
+    st.subheader(t("itinerary_weather_header", lang))
+    force = st.button(t("refresh_now", lang), key="itinerary_refresh_btn")
+    refresh_itinerary_weather(places, trip_info, force=force)
+    rows = build_itinerary_weather_rows(places, trip_info, lang)
+    if not rows:
+        st.caption(t("itinerary_weather_empty", lang))
+        return
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    state = st.session_state.get("itinerary_weather", {})
+    if state.get("future") is not None:
+        st.caption(t("itinerary_updating", lang))
+    elif state.get("refreshed_at"):
+        st.caption(t("itinerary_updated", lang).format(datetime.fromtimestamp(state["refreshed_at"]).strftime("%H:%M")))
+
+def weather_for_date(daily, date):
+    """Extract one day's weather from an Open-Meteo daily forecast (None if date not covered)."""
+    # Find the forecast for the requested date
+    dates = daily.get("time", [])
+    target_date_str = date.strftime("%Y-%m-%d")
+    
+    if target_date_str not in dates:
+        return None
+    idx = dates.index(target_date_str)
+    
+    weathercode = daily.get("weathercode", [0])[idx] if idx < len(daily.get("weathercode", [])) else 0
+    condition = WEATHER_CODES.get(weathercode, "Unknown")
+    
+    # Simplify condition for display
+    if weathercode in [0, 1]:
+        condition_short = "Clear"
+    elif weathercode in [2, 3]:
+        condition_short = "Cloudy"
+    elif weathercode in [45, 48]:
+        condition_short = "Foggy"
+    elif weathercode in [51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82]:
+        condition_short = "Rain"
+    elif weathercode in [71, 73, 75, 77, 85, 86]:
+        condition_short = "Snow"
+    elif weathercode in [95, 96, 99]:
+        condition_short = "Thunderstorm"
+    else:
+        condition_short = "Unknown"
+    
+    temp_max = daily.get("temperature_2m_max", [0])[idx] if idx < len(daily.get("temperature_2m_max", [])) else 0
+    temp_min = daily.get("temperature_2m_min", [0])[idx] if idx < len(daily.get("temperature_2m_min", [])) else 0
+    temp_avg = (temp_max + temp_min) / 2
+    
+    precipitation = daily.get("precipitation_sum", [0])[idx] if idx < len(daily.get("precipitation_sum", [])) else 0
+    wind_speed = daily.get("windspeed_10m_max", [0])[idx] if idx < len(daily.get("windspeed_10m_max", [])) else 0
+    wind_direction = daily.get("winddirection_10m_dominant", [0])[idx] if idx < len(daily.get("winddirection_10m_dominant", [])) else 0
+    
+    return {
+        "temperature": round(temp_avg),
+        "temp_max": round(temp_max),
+        "temp_min": round(temp_min),
+        "feels_like": round(temp_avg),  # Open-Meteo doesn't provide feels_like, use average
+        "condition": condition_short,
+        "description": condition,
+        "precipitation": round(precipitation, 2),
+        "wind_speed": round(wind_speed),
+        "wind_direction": round(wind_direction),
+        "weathercode": weathercode,
+        "forecast_time": target_date_str
+    }
+
+def get_weather_from_api(lat, lon, date):
+    """Weather for one date from the cached 16-day Open-Meteo forecast (fetched when needed)"""
+    try:
+        return weather_for_date(get_forecast(lat, lon, date), date)
     except Exception as e:
         st.error(f"Error fetching weather: {str(e)}")
         return None
-    
-    return None
 
 # Distance calculation functions
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points using Haversine formula (in miles)"""
-    R = 3959  # Earth radius in miles
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    return R * c
-
 def calculate_route_distance(places_list):
     """Calculate total distance for a route through multiple places"""
     if len(places_list) < 2:
         return 0
-    total = 0
-    for i in range(len(places_list) - 1):
-        p1 = places_list[i]
-        p2 = places_list[i + 1]
-        total += haversine_distance(p1['lat'], p1['lon'], p2['lat'], p2['lon'])
-    return total
+    return float(leg_distances([(p['lat'], p['lon']) for p in places_list]).sum())
+
+# Distance matrices over more places than this are stored as float32 (half the memory)
+ROUTES_FLOAT32_ABOVE = 1000
+NEAREST_PLACES_SHOWN = 5
+HOTEL_LOCATE_TIMEOUT = 10  # seconds to wait for hotel lookups before using their cities
+
+def get_distance_matrix(places, key="routes_matrix"):
+    """DistanceMatrix over places with coordinates, kept across reruns; moved places only update their rows."""
+    ids = [p.get("id") for p in places]
+    points = [(p["lat"], p["lon"]) for p in places]
+    matrix = st.session_state.get(key)
+    if matrix is None or matrix.ids != ids:
+        dtype = np.float32 if len(places) > ROUTES_FLOAT32_ABOVE else np.float64
+        matrix = st.session_state[key] = DistanceMatrix(points, ids=ids, dtype=dtype)
+    else:
+        matrix.sync(points)
+    return matrix
+
+def plan_day_route(matrix, stops, start=None, end=None, closed=False):
+    """Best order of `stops` (rows of matrix by id): {"stops" in order, "route" incl. the return leg, "result"}."""
+    result = optimize_route(matrix.sub([matrix.index[p.get("id")] for p in stops]), start=start, end=end, closed=closed)
+    ordered = [stops[i] for i in result["order"]]
+    return {"stops": ordered, "route": ordered + ordered[:1] if closed else ordered, "result": result}
+
+def hotel_geocode_text(hotel):
+    """Query for a hotel's own position: its name plus its location."""
+    return ", ".join(part for part in (hotel.get("name"), hotel.get("location")) if part)
+
+def locate_hotels(hotels):
+    """
+    Route stops for the hotels that can be located, by hotel id. Each hotel is
+    geocoded by name and location; new ones are looked up together on the
+    geocoding workers, waiting at most HOTEL_LOCATE_TIMEOUT seconds in all.
+    Hotels that can't be found (or in time) fall back to their city.
+    Answers are kept in the session per hotel record, so planning again only
+    looks up hotels that were added or changed.
+    """
+    session_cache = st.session_state.setdefault("located_hotels", {})
+    keys = {hotel.get("id"): json.dumps(hotel, sort_keys=True, default=str) for hotel in hotels}
+    cache = get_geocode_cache()
+    texts = {hotel.get("id"): hotel_geocode_text(hotel) for hotel in hotels if keys[hotel.get("id")] not in session_cache}
+    unknown = [text for text in set(texts.values()) if text and not cache.get("place", text)[0]]
+    futures = get_geocoding_service().submit_batch(geocode_place_name, unknown, priority=INTERACTIVE)
+    deadline = time.time() + HOTEL_LOCATE_TIMEOUT
+    located = {}
+    for hotel in hotels:
+        key = keys[hotel.get("id")]
+        if key in session_cache:
+            stop = session_cache[key]
+        else:
+            text = texts[hotel.get("id")]
+            future = futures.get(text)
+            try:
+                coords = future.result(timeout=max(0.0, deadline - time.time())) if future else cache.get("place", text)[1]
+            except Exception:
+                coords = None
+            coords = coords or resolve_location_cached(hotel_location_text(hotel))
+            stop = None
+            if coords and coords.get("lat") is not None:
+                stop = {
+                    "id": ("hotel", hotel.get("id")), "name": f"🏨 {hotel.get('name', '')}",
+                    "lat": coords["lat"], "lon": coords["lon"], "hotel": True,
+                }
+            # A lookup still running isn't kept: it lands in the geocode cache for the next plan
+            if future is None or future.done():
+                session_cache[key] = stop
+        if stop is not None:
+            located[hotel.get("id")] = stop
+    return located
+
+def plan_trip_routes(places, trip_info, days=None):
+    """
+    Route for every day with places (or just `days`): from the hotel the group
+    wakes up in, through the day's places, to the hotel it sleeps in (a loop
+    when that's the same hotel). Only the hotels of those days are located,
+    and all days are planned in one pass over a single distance matrix of
+    places and hotels. Returns a list of plan_day_route() dicts with "day",
+    "morning" and "night" added.
+    """
+    hotels = trip_info.get("hotels", [])
+    by_day = {}
+    for place in places:
+        if place.get("day") and (days is None or place["day"] in days):
+            by_day.setdefault(place["day"], []).append(place)
+    day_stays = {}
+    for day in by_day:
+        date = parse_day(day)
+        day_stays[day] = day_hotels(hotels, date) if date else (None, None)
+    needed = {hotel.get("id"): hotel for stays in day_stays.values() for hotel in stays if hotel is not None}
+    located = locate_hotels(list(needed.values()))
+    matrix = get_distance_matrix(places + list(located.values()), key="trip_routes_matrix")
+    plans = []
+    for day in sorted(by_day):
+        stops = list(by_day[day])
+        morning, night = day_stays[day]
+        morning = located.get(morning.get("id")) if morning else None
+        night = located.get(night.get("id")) if night else None
+        start = end = None
+        if morning is not None:
+            stops.append(morning)
+            start = len(stops) - 1
+        if night is not None and night is not morning:
+            stops.append(night)
+            end = len(stops) - 1
+        plan = plan_day_route(matrix, stops, start=start, end=end, closed=morning is not None and night is morning)
+        plan.update(day=day, morning=morning, night=night)
+        plans.append(plan)
+    return plans
 
 def estimate_travel_time(distance_miles, mode="driving"):
     """Estimate travel time based on distance and mode"""
@@ -814,18 +1394,24 @@ def estimate_travel_time(distance_miles, mode="driving"):
 # Photo helper functions (support DB storage when use_database())
 def save_photo(uploaded_file, place_id):
     """Save uploaded photo and return the file path (or db:place_id when using DB)."""
+    # The path can stay the same when a photo is replaced, so drop the cached map popup
+    st.session_state.get("map_popup_cache", {}).pop(place_id, None)
     if uploaded_file is None:
         return None
+    img_bytes = bytes(uploaded_file.getbuffer())
     if use_database():
         file_ext = os.path.splitext(uploaded_file.name)[1]
-        b64 = base64.b64encode(uploaded_file.getbuffer().read()).decode()
-        if db_save_photo(place_id, f"place_{place_id}{file_ext}", b64):
-            return f"db:{place_id}"
-        return None
-    file_ext = os.path.splitext(uploaded_file.name)[1]
-    photo_path = os.path.join(PHOTOS_DIR, f"place_{place_id}{file_ext}")
-    with open(photo_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+        b64 = base64.b64encode(img_bytes).decode()
+        if not db_save_photo(place_id, f"place_{place_id}{file_ext}", b64):
+            return None
+        photo_path = f"db:{place_id}"
+    else:
+        file_ext = os.path.splitext(uploaded_file.name)[1]
+        photo_path = os.path.join(PHOTOS_DIR, f"place_{place_id}{file_ext}")
+        with open(photo_path, "wb") as f:
+            f.write(img_bytes)
+    # The map only looks thumbnails up, so make it now while the bytes are at hand
+    write_photo_thumbnail(photo_path, img_bytes)
     return photo_path
 
 
@@ -848,6 +1434,120 @@ def get_photo_base64(photo_path):
     return None
 
 
+# Map popups load photos by URL from Streamlit's static file server
+# (server.enableStaticServing), as small JPEGs written under static/thumbs/ when
+# a photo is saved. The static server doesn't check the password, so each file
+# is named by an HMAC of the photo path under a key kept outside static/: the
+# URLs can't be guessed from place ids.
+STATIC_DIR = "static"
+THUMBS_DIR = os.path.join(STATIC_DIR, "thumbs")
+THUMBNAIL_KEY_FILE = os.path.join(DATA_DIR, "thumbnail_key")
+THUMBNAIL_MAX_PX = 560  # twice the popup width, sharp on phone screens
+# Relative to the Streamlit page; maps are shown in iframes at different paths,
+# so LazyPopupImages resolves it against the page (see there)
+THUMBNAIL_URL_PREFIX = "app/static/thumbs/"
+
+@st.cache_resource
+def get_thumbnail_key():
+    """
+    Secret key naming the thumbnails, created on first use. A new key means
+    the old names are unknown, so thumbnails left from before (including
+    ones named by plain path hashes) are removed; the map makes them again.
+    """
+    try:
+        with open(THUMBNAIL_KEY_FILE, "rb") as f:
+            key = f.read()
+        if len(key) >= 32:
+            return key
+    except OSError:
+        pass
+    key = secrets.token_bytes(32)
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(THUMBNAIL_KEY_FILE, "wb") as f:
+        f.write(key)
+    if os.path.isdir(THUMBS_DIR):
+        for name in os.listdir(THUMBS_DIR):
+            try:
+                os.remove(os.path.join(THUMBS_DIR, name))
+            except OSError:
+                pass
+    return key
+
+def photo_thumbnail_path(photo_path):
+    """Where the thumbnail of a photo (path or db:place_id) is kept."""
+    token = hmac.new(get_thumbnail_key(), photo_path.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+    return os.path.join(THUMBS_DIR, token + ".jpg")
+
+def write_photo_thumbnail(photo_path, img_bytes):
+    """Resize a photo's bytes to its JPEG thumbnail. Returns True on success."""
+    thumb_path = photo_thumbnail_path(photo_path)
+    tmp_path = f"{thumb_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(THUMBS_DIR, exist_ok=True)
+        img = Image.open(io.BytesIO(img_bytes))
+        img.thumbnail((THUMBNAIL_MAX_PX, THUMBNAIL_MAX_PX))
+        img.convert("RGB").save(tmp_path, "JPEG", quality=80, optimize=True)
+        os.replace(tmp_path, thumb_path)
+        return True
+    except Exception:
+        return False
+
+def photo_thumbnail_url(photo_path):
+    """
+    URL of the photo's existing thumbnail, or None if there is none yet. Only
+    looks on disk (thumbnails are written by save_photo() and
+    make_photo_thumbnails()); the file's mtime in the query string makes
+    browsers reload a replaced photo.
+    """
+    if not photo_path:
+        return None
+    thumb_path = photo_thumbnail_path(photo_path)
+    try:
+        version = int(os.path.getmtime(thumb_path))
+    except OSError:
+        return None
+    return f"{THUMBNAIL_URL_PREFIX}{os.path.basename(thumb_path)}?v={version}"
+
+def make_photo_thumbnails(photo_paths):
+    """Background job: read each photo (db photos are fetched) and write its thumbnail. Returns how many were made."""
+    made = 0
+    for photo_path in photo_paths:
+        photo_b64 = get_photo_base64(photo_path)
+        if photo_b64 and write_photo_thumbnail(photo_path, base64.b64decode(photo_b64)):
+            made += 1
+    return made
+
+def queue_missing_thumbnails(places):
+    """
+    Make thumbnails the map is missing (photos saved before thumbnails existed,
+    or a fresh container) in one background job, so building the map never
+    reads photos. Returns True once a finished job made new ones, i.e. the
+    map should be rebuilt.
+    """
+    job = st.session_state.get("thumbnail_job")
+    if job is not None:
+        if not job.done():
+            return False
+        del st.session_state["thumbnail_job"]
+        return not job.cancelled() and job.exception() is None and job.result() > 0
+    attempted = st.session_state.setdefault("thumbnails_attempted", set())
+    missing = [
+        p["photo"] for p in places
+        if p.get("photo") and p["photo"] not in attempted and not os.path.exists(photo_thumbnail_path(p["photo"]))
+    ]
+    if missing:
+        attempted.update(missing)
+        st.session_state["thumbnail_job"] = get_scheduler().submit("thumbnails", make_photo_thumbnails, missing, priority=PREFETCH)
+    return False
+
+@st.fragment(run_every=2)
+def watch_thumbnail_job():
+    """Rerun the app once the thumbnail job finishes, so the map picks the new thumbnails up."""
+    job = st.session_state.get("thumbnail_job")
+    if job is not None and job.done():
+        st.rerun()
+
+
 def display_photo_in_streamlit(photo_path):
     """Display photo in Streamlit (supports db:place_id)."""
     if not photo_path:
@@ -912,6 +1612,21 @@ TRANSLATIONS = {
         "all_dates": "All Dates",
         "unassigned": "Unassigned",
         "showing_places": "Showing {} of {} places",
+        "map_clustered": "Many places: nearby markers are grouped. Click a cluster or zoom in to see them.",
+        "map_client_filter": "Filter days on the map",
+        "map_viewport": "Large trip: only the area in view is loaded ({} places). Zoom in to see individual places.",
+        "offline_tiles": "🗺️ Offline map tiles",
+        "offline_tiles_help": "Download the map for the area around your places while you have signal. Maps use the downloaded tiles when the tile server is running (python tile_cache.py, TRIP_TILE_URL).",
+        "offline_tiles_source": "Maps load tiles from {}",
+        "offline_tiles_check": "Show stored tiles",
+        "offline_tiles_stored": "{} tiles stored ({:.0f} of {:.0f} MB)",
+        "offline_tiles_zooms": "Zoom levels",
+        "offline_tiles_estimate": "{} tiles in the trip area, about {:.1f} MB",
+        "offline_tiles_too_many": "Too many tiles (at most {}). Choose fewer or lower zoom levels.",
+        "offline_tiles_download": "Download map tiles",
+        "offline_tiles_progress": "Downloading tiles... {} of {}",
+        "offline_tiles_done": "Map tiles ready: {} downloaded, {} failed",
+        "map_client_filter_help": "Loads every day as its own map layer; tick days in the map's layer box to show or hide them instantly.",
         "manage_places": "Manage Places",
         "add_new_place": "Add New Place",
         "place_name": "Place Name",
@@ -923,6 +1638,9 @@ TRANSLATIONS = {
         "optional": "optional",
         "upload_photo": "Upload Photo",
         "existing_places": "Existing Places",
+        "search_places": "Search places",
+        "places_per_page": "Places per page",
+        "places_page": "Page {} of {} ({} places)",
         "mark_as_completed": "Mark as completed",
         "update_photo": "Update Photo",
         "no_places": "No places added yet. Add your first place using the form on the left!",
@@ -935,6 +1653,10 @@ TRANSLATIONS = {
         "places_without_coordinates": "Places Without Coordinates",
         "geocode_place": "Find Location",
         "enter_place_name": "Enter place name to find coordinates",
+        "geocode_all": "Find all locations ({})",
+        "geocode_all_progress": "Finding locations... {} of {} done",
+        "geocode_all_done": "Found coordinates for {} of {} places.",
+        "geocode_all_unsaved": "They are not saved yet: click \"Save all changes to database\" in the sidebar to keep them.",
         # To-Do
         "todo_header": "✅ To-Do List",
         "new_todo_item": "New to-do item",
@@ -976,6 +1698,9 @@ TRANSLATIONS = {
         "save_all_changes": "Save all changes to database",
         "save_all_changes_success": "All changes saved.",
         "no_unsaved_changes": "No unsaved changes.",
+        "service_health": "Services",
+        "service_down": "{} is not responding - retrying in {} s",
+        "background_jobs": "Background jobs: {} running, {} queued",
         # Before Trip
         "before_trip_header": "🎒 Before Trip Checklist",
         "manage_packing": "Manage packing lists for each traveler",
@@ -1054,6 +1779,7 @@ TRANSLATIONS = {
         "or_enter_city": "Or Enter City Name",
         "enter_city_name": "Enter City Name",
         "city_not_found": "City not found. Please check the spelling and try again.",
+        "city_lookup_pending": "Finding the cities of {} places in the background; they are listed under their own names until then.",
         "city_found": "City found:",
         "select_city_or_place": "Select City or Place",
         "manual_city": "Manual City Input",
@@ -1073,9 +1799,41 @@ TRANSLATIONS = {
         "hpa": "hpa",
         "degrees": "°",
         "fahrenheit": "°F",
+        "trip_forecast_header": "📅 Trip-wide Forecast",
+        "get_all_forecasts": "Get forecasts for all cities ({})",
+        "trip_forecast_caption": "📍 = you have places planned in that city on that day. High/low in °F.",
+        "trip_forecast_empty": "No forecasts loaded yet. Fetch all cities at once with the button above.",
+        "itinerary_weather_header": "🧳 Weather Along Your Itinerary",
+        "itinerary_weather_empty": "Add dates to places, hotels or flights to see the weather for each day of the trip.",
+        "itinerary_updating": "Updating forecasts in the background...",
+        "itinerary_updated": "Forecasts updated at {}",
+        "refresh_now": "Refresh now",
+        "where": "Where",
+        "forecast": "Forecast",
+        "high_low": "High / Low",
+        "precipitation": "Precipitation",
+        "based_on": "Based on",
+        "source_places": "📍 Planned places",
+        "source_hotel": "🏨 Hotel",
+        "source_flight": "✈️ Flight",
+        "beyond_forecast": "Beyond 16-day forecast",
+        "unknown_location": "Unknown location",
         # Routes
         "routes_header": "🗺️ Routes & Distance Calculator",
         "routes_description": "Calculate distances and plan routes between your places",
+        "nearest_places": "Nearest to {}: ",
+        "route_round_trip": "Return to the first stop",
+        "route_start": "Start at",
+        "route_end": "End at",
+        "route_any": "Any",
+        "route_method_exact": "shortest possible",
+        "route_from_hotel": "Start and end at the hotel",
+        "trip_routes": "🏨 Daily Routes from Your Hotels",
+        "trip_routes_help": "Every day starts at the hotel you wake up in, visits that day's places in the best order and ends at the hotel you sleep in.",
+        "trip_routes_planning": "Locating hotels and planning routes...",
+        "trip_routes_total": "Whole trip",
+        "plan_all_days": "Plan all days",
+        "route_improvement": "Greedy route {:.1f} → optimized {:.1f} {} ({:.1f}% shorter; {}, {:.2f} s)",
         "select_from": "From",
         "select_to": "To",
         "calculate_distance": "Calculate Distance",
@@ -1137,6 +1895,21 @@ TRANSLATIONS = {
         "all_dates": "Wszystkie Daty",
         "unassigned": "Nieprzypisane",
         "showing_places": "Pokazuje {} z {} miejsc",
+        "map_clustered": "Duzo miejsc: pobliskie znaczniki sa zgrupowane. Kliknij grupe lub przybliz mape.",
+        "map_client_filter": "Filtruj dni na mapie",
+        "map_viewport": "Duza podroz: wczytywany jest tylko widoczny obszar ({} miejsc). Przybliz, aby zobaczyc pojedyncze miejsca.",
+        "offline_tiles": "🗺️ Mapy offline",
+        "offline_tiles_help": "Pobierz mape obszaru wokol Twoich miejsc, poki masz zasieg. Mapy korzystaja z pobranych kafelkow, gdy dziala serwer kafelkow (python tile_cache.py, TRIP_TILE_URL).",
+        "offline_tiles_source": "Mapy wczytuja kafelki z {}",
+        "offline_tiles_check": "Pokaz zapisane kafelki",
+        "offline_tiles_stored": "Zapisane kafelki: {} ({:.0f} z {:.0f} MB)",
+        "offline_tiles_zooms": "Poziomy przyblizenia",
+        "offline_tiles_estimate": "Kafelki w obszarze podrozy: {}, okolo {:.1f} MB",
+        "offline_tiles_too_many": "Za duzo kafelkow (maksymalnie {}). Wybierz mniej lub nizsze poziomy przyblizenia.",
+        "offline_tiles_download": "Pobierz kafelki mapy",
+        "offline_tiles_progress": "Pobieranie kafelkow... {} z {}",
+        "offline_tiles_done": "Kafelki mapy gotowe: pobrane {}, bledy {}",
+        "map_client_filter_help": "Kazdy dzien jest osobna warstwa mapy; zaznaczaj dni w polu warstw, aby od razu je pokazac lub ukryc.",
         "manage_places": "Zarzadzaj Miejscami",
         "add_new_place": "Dodaj Nowe Miejsce",
         "place_name": "Nazwa Miejsca",
@@ -1148,6 +1921,9 @@ TRANSLATIONS = {
         "optional": "opcjonalne",
         "upload_photo": "Wgraj Zdjecie",
         "existing_places": "Istniejace Miejsca",
+        "search_places": "Szukaj miejsc",
+        "places_per_page": "Miejsc na stronie",
+        "places_page": "Strona {} z {} ({} miejsc)",
         "mark_as_completed": "Oznacz jako zakonczone",
         "update_photo": "Aktualizuj Zdjecie",
         "no_places": "Nie dodano jeszcze miejsc. Dodaj pierwsze miejsce uzywajac formularza po lewej!",
@@ -1160,6 +1936,10 @@ TRANSLATIONS = {
         "places_without_coordinates": "Miejsca Bez Wspolrzednych",
         "geocode_place": "Znajdz Lokalizacje",
         "enter_place_name": "Wprowadz nazwe miejsca, aby znalezc wspolrzedne",
+        "geocode_all": "Znajdz wszystkie lokalizacje ({})",
+        "geocode_all_progress": "Szukanie lokalizacji... {} z {} gotowe",
+        "geocode_all_done": "Znaleziono wspolrzedne dla {} z {} miejsc.",
+        "geocode_all_unsaved": "Nie sa jeszcze zapisane: kliknij \"Zapisz wszystkie zmiany do bazy\" w panelu bocznym, aby je zachowac.",
         # To-Do
         "todo_header": "✅ Lista Zadan",
         "new_todo_item": "Nowe zadanie",
@@ -1201,6 +1981,9 @@ TRANSLATIONS = {
         "save_all_changes": "Zapisz wszystkie zmiany do bazy",
         "save_all_changes_success": "Wszystkie zmiany zapisane.",
         "no_unsaved_changes": "Brak niezapisanych zmian.",
+        "service_health": "Uslugi",
+        "service_down": "{} nie odpowiada - ponowna proba za {} s",
+        "background_jobs": "Zadania w tle: {} w toku, {} w kolejce",
         # Before Trip
         "before_trip_header": "🎒 Lista Przed Podroza",
         "manage_packing": "Zarzadzaj listami pakowania dla kazdego podroznika",
@@ -1279,6 +2062,7 @@ TRANSLATIONS = {
         "or_enter_city": "Lub Wprowadz Nazwe Miasta",
         "enter_city_name": "Wprowadz Nazwe Miasta",
         "city_not_found": "Miasto nie znalezione. Sprawdz pisownie i sprobuj ponownie.",
+        "city_lookup_pending": "Wyszukiwanie miast dla {} miejsc w tle; do tego czasu sa pokazane pod wlasnymi nazwami.",
         "city_found": "Znalezione miasto:",
         "select_city_or_place": "Wybierz Miasto lub Miejsce",
         "manual_city": "Reczne Wprowadzenie Miasta",
@@ -1298,9 +2082,41 @@ TRANSLATIONS = {
         "hpa": "hpa",
         "degrees": "°",
         "fahrenheit": "°F",
+        "trip_forecast_header": "📅 Prognoza dla Calej Podrozy",
+        "get_all_forecasts": "Pobierz prognozy dla wszystkich miast ({})",
+        "trip_forecast_caption": "📍 = masz zaplanowane miejsca w tym miescie tego dnia. Maks./min. w °F.",
+        "trip_forecast_empty": "Brak pobranych prognoz. Pobierz wszystkie miasta naraz przyciskiem powyzej.",
+        "itinerary_weather_header": "🧳 Pogoda na Trasie Podrozy",
+        "itinerary_weather_empty": "Dodaj daty do miejsc, hoteli lub lotow, aby zobaczyc pogode na kazdy dzien podrozy.",
+        "itinerary_updating": "Aktualizowanie prognoz w tle...",
+        "itinerary_updated": "Prognozy zaktualizowane o {}",
+        "refresh_now": "Odswiez teraz",
+        "where": "Gdzie",
+        "forecast": "Prognoza",
+        "high_low": "Maks. / Min.",
+        "precipitation": "Opady",
+        "based_on": "Na podstawie",
+        "source_places": "📍 Zaplanowane miejsca",
+        "source_hotel": "🏨 Hotel",
+        "source_flight": "✈️ Lot",
+        "beyond_forecast": "Poza 16-dniowa prognoza",
+        "unknown_location": "Nieznana lokalizacja",
         # Routes
         "routes_header": "🗺️ Kalkulator Tras i Odleglosci",
         "routes_description": "Oblicz odleglosci i planuj trasy miedzy miejscami",
+        "nearest_places": "Najblizej {}: ",
+        "route_round_trip": "Powrot do pierwszego miejsca",
+        "route_start": "Start w",
+        "route_end": "Koniec w",
+        "route_any": "Dowolne",
+        "route_method_exact": "najkrotsza mozliwa",
+        "route_from_hotel": "Start i koniec w hotelu",
+        "trip_routes": "🏨 Dzienne Trasy z Hoteli",
+        "trip_routes_help": "Kazdy dzien zaczyna sie w hotelu, w ktorym sie budzicie, odwiedza miejsca z tego dnia w najlepszej kolejnosci i konczy w hotelu, w ktorym nocujecie.",
+        "trip_routes_planning": "Szukanie hoteli i planowanie tras...",
+        "trip_routes_total": "Cala podroz",
+        "plan_all_days": "Zaplanuj wszystkie dni",
+        "route_improvement": "Trasa zachlanna {:.1f} → zoptymalizowana {:.1f} {} (krotsza o {:.1f}%; {}, {:.2f} s)",
         "select_from": "Z",
         "select_to": "Do",
         "calculate_distance": "Oblicz Odleglosc",
@@ -1325,6 +2141,128 @@ def t(key, lang="en"):
     """Get translation for a key"""
     return TRANSLATIONS.get(lang, TRANSLATIONS["en"]).get(key, key)
 
+# Post-login warm-up: read every storage key and prefetch what Budget, Weather
+# and Map need next, as background jobs, so the first paint never waits on it
+WARMUP_BUDGET_SECONDS = 20        # wall-clock budget for the whole warm-up
+# Reverse geocodes the budget fits at Nominatim's rate, leaving a quarter for the user's own lookups
+WARMUP_MAX_ONLINE_LOOKUPS = int(WARMUP_BUDGET_SECONDS * PROVIDER_RATE_LIMITS["nominatim"][0] * 0.75)
+WARMUP_READ_WAIT_SECONDS = 1.0    # longest a page waits on a warm-up storage read already running
+
+STORAGE_LOADERS = {
+    "places": _load_places_from_storage,
+    "todo": _load_todo_from_storage,
+    "trip_info": _load_trip_info_from_storage,
+    "packing": _load_packing_from_storage,
+    "budget": _load_budget_from_storage,
+    "notes": _load_notes_from_storage,
+    "users": _load_users_from_storage,
+    "weather": _load_weather_from_storage,
+    "exchange_rates": _load_exchange_rates_from_storage,
+}
+
+def _warm_caches(storage_futures, deadline):
+    """
+    Background job: resolve cities for places neither the bundled index nor the
+    geocode cache covers (results land in the shared geocode cache), fetch
+    today's USD/PLN rate and download forecasts for trip days and place
+    cities, all at once, stopping at `deadline`.
+    Returns {"rate": (date_str, rate) or None, "forecasts": {cell: daily}}.
+    """
+    def stored(key, default):
+        try:
+            return storage_futures[key].result(timeout=max(0.0, deadline - time.time())) or default
+        except Exception:
+            return default
+
+    places = stored("places", {}).get("places", [])
+    trip_info = stored("trip_info", {})
+    forecasts = stored("weather", {}).get("forecasts")
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    day_index = build_day_index(places, trip_info, resolve_location_cached, offline_city_name)
+    coords = [(loc["lat"], loc["lon"]) for locations in day_index.values() for loc in locations]
+    coords += [
+        (group["lat"], group["lon"]) for group in group_places_by_city(places).values()
+        if group["lat"] is not None
+    ]
+    fresh_cells = set()
+    if isinstance(forecasts, dict):
+        fresh_cells = {cell for cell, entry in forecasts.items() if not _forecast_is_stale(entry)}
+    location_texts = unresolved_location_texts(trip_info, resolve_location_cached)
+
+    # The forecast batch runs next to the geocodes, not after them. It isn't a
+    # "forecast" job since it waits on the ones it starts, and it stops a
+    # second early so its results are in before this job stops waiting.
+    calls = {"forecasts": ("weather", _refresh_itinerary_forecasts, location_texts, coords, fresh_cells, deadline - 1)}
+    if today not in stored("exchange_rates", {}):
+        calls["rate"] = ("rates", fetch_usd_to_pln_rate, today)
+    lookups = 0
+    for n, place in enumerate(places):
+        if lookups >= WARMUP_MAX_ONLINE_LOOKUPS:
+            break
+        lat, lon = place.get("lat"), place.get("lon")
+        if lat and lon and not offline_reverse_geocode(lat, lon) and not city_lookup_cached(lat, lon):
+            calls[n] = ("geocode", get_city_from_coordinates, lat, lon)
+            lookups += 1
+    results = gather_calls(calls, timeout=max(1.0, deadline - time.time()), priority=PREFETCH)
+    rate = results.get("rate")
+    forecasts = results.get("forecasts")
+    return {
+        "rate": (today, rate) if isinstance(rate, (int, float)) else None,
+        "forecasts": forecasts if isinstance(forecasts, dict) else {},
+    }
+
+def start_warmup():
+    """Queue the warm-up once per session, right after login. Returns immediately."""
+    if st.session_state.get("warmup_started"):
+        return
+    st.session_state["warmup_started"] = True
+    scheduler = get_scheduler()
+    storage_futures = {
+        key: scheduler.submit("storage", loader, priority=NORMAL)
+        for key, loader in STORAGE_LOADERS.items() if key not in st.session_state
+    }
+    # load_X() picks these up instead of reading storage again
+    st.session_state["warmup_storage"] = dict(storage_futures)
+    st.session_state["warmup_job"] = scheduler.submit(
+        "warmup", _warm_caches, storage_futures, time.time() + WARMUP_BUDGET_SECONDS, priority=PREFETCH
+    )
+
+def collect_warmup():
+    """Merge a finished warm-up (today's rate, forecasts) into the session. Never blocks."""
+    future = st.session_state.get("warmup_job")
+    if future is None or not future.done():
+        return
+    del st.session_state["warmup_job"]
+    if future.cancelled() or future.exception() is not None:
+        return
+    warmed = future.result()
+    if warmed["rate"]:
+        date_str, rate = warmed["rate"]
+        if date_str not in load_exchange_rates():
+            cache_exchange_rate(date_str, rate)
+    for cell, daily in warmed["forecasts"].items():
+        store_forecast(cell, daily)
+
+def show_service_health(lang="en"):
+    """Sidebar line with the circuit-breaker state of each external service used so far"""
+    health = provider_health()
+    if not health:
+        return
+    icons = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}
+    st.sidebar.caption(
+        f"{t('service_health', lang)}: " + " · ".join(f"{icons[h['state']]} {h['name']}" for h in health)
+    )
+    for h in health:
+        if h["state"] == "open":
+            st.sidebar.warning(t("service_down", lang).format(h["name"], int(h["retry_in"]) + 1))
+
+def show_background_jobs(lang="en"):
+    """Sidebar caption while the job scheduler has work queued or running"""
+    status = get_scheduler().status()
+    if status["running"] or status["queued"]:
+        st.sidebar.caption("⏳ " + t("background_jobs", lang).format(status["running"], status["queued"]))
+
 # Initialize default data
 init_default_data()
 
@@ -1334,6 +2272,10 @@ def main():
     if not check_password():
         st.stop()  # Stop execution if password is incorrect
     
+    # Prefetch in the background what the next pages need
+    start_warmup()
+    collect_warmup()
+    
     # Initialize language in session state
     if "language" not in st.session_state:
         st.session_state.language = "en"
@@ -1361,7 +2303,7 @@ def main():
     st.sidebar.title(t("nav", lang))
     page = st.sidebar.radio(
         t("choose_page", lang),
-        [t("users", lang), t("map", lang), t("todo", lang), t("trip_info", lang), t("before_trip", lang), t("budget", lang), t("weather", lang), t("notes", lang)]
+        [t("users", lang), t("map", lang), t("routes", lang), t("todo", lang), t("trip_info", lang), t("before_trip", lang), t("budget", lang), t("weather", lang), t("notes", lang)]
     )
 
     # Save all changes to database (below nav)
@@ -1374,12 +2316,16 @@ def main():
             st.rerun()
     else:
         st.sidebar.caption(t("no_unsaved_changes", lang))
+    show_service_health(lang)
+    show_background_jobs(lang)
     
     # Get current language
     lang = st.session_state.language
     
     if page == t("map", lang) or "Map" in page:
         show_map(lang)
+    elif page == t("routes", lang) or "Routes" in page or "Trasy" in page:
+        show_routes(lang)
     elif page == t("todo", lang) or "To-Do" in page or "Zadan" in page:
         show_todo(lang)
     elif page == t("trip_info", lang) or "Trip Info" in page or "Podrozy" in page:
@@ -1395,6 +2341,478 @@ def main():
     elif page == t("notes", lang) or "Notes" in page or "Notatki" in page:
         show_notes(lang)
 
+# Above this many places the map is drawn as clusters from one GeoJSON layer
+MAP_CLUSTER_THRESHOLD = 200
+
+def place_marker_color(place):
+    """Marker color: green when visited, red for restaurants, blue otherwise."""
+    if place.get("completed", False):
+        return "green"
+    elif place.get("type") == "restaurant":
+        return "red"
+    return "blue"
+
+def format_place_day(day):
+    """'2026-02-01' -> 'February 01, 2026' (unparseable values are returned as-is)."""
+    try:
+        return datetime.strptime(day, "%Y-%m-%d").strftime("%B %d, %Y")
+    except:
+        return day
+
+def place_popup_html(place):
+    """Full HTML popup for a place marker (photo referenced by URL, loaded on open)."""
+    # Get photo for popup; LazyPopupImages sets src when the popup opens
+    photo_html = ""
+    photo_url = photo_thumbnail_url(place.get("photo"))
+    if photo_url:
+        photo_html = f'<img data-src="{photo_url}" loading="lazy" alt="" style="width: 100%; max-width: 280px; margin: 10px 0; border-radius: 5px;">'
+    
+    # Date info
+    day_info = ""
+    if place.get("day"):
+        day_info = f'<p><strong>Date:</strong> {format_place_day(place.get("day"))}</p>'
+    
+    # Link info
+    link_html = ""
+    if place.get('link'):
+        link_html = f'<p><strong>Link:</strong> <a href="{place["link"]}" target="_blank">{place["link"]}</a></p>'
+    
+    # Create popup content
+    popup_html = f"""
+    <div style="width: 300px;">
+        <h3>{place['name']}</h3>
+        {photo_html}
+        <p><strong>Type:</strong> {place.get('type', 'attraction').title()}</p>
+        {day_info}
+        <p>{place.get('description', 'No description available')}</p>
+        {link_html}
+    </div>
+    """
+    return popup_html
+
+def cached_place_popup_html(place):
+    """Popup HTML for a place, rebuilt only when its record changed (photos are the slow part)."""
+    cache = st.session_state.setdefault("map_popup_cache", {})
+    fingerprint = json.dumps([place, photo_thumbnail_url(place.get("photo"))], sort_keys=True, default=str)
+    entry = cache.get(place.get("id"))
+    if entry is None or entry[0] != fingerprint:
+        entry = cache[place.get("id")] = (fingerprint, place_popup_html(place))
+    return entry[1]
+
+def add_place_markers(m, places):
+    """One folium.Marker with a full HTML popup per place (small place sets)."""
+    for place in places:
+        color = place_marker_color(place)
+        
+        popup_html = cached_place_popup_html(place)
+        
+        folium.Marker(
+            location=[place['lat'], place['lon']],
+            popup=folium.Popup(popup_html, max_width=300),
+            tooltip=place['name'],
+            icon=folium.Icon(color=color, icon='info-sign')
+        ).add_to(m)
+
+class LazyPopupImages(MacroElement):
+    """
+    Loads <img data-src> images when their popup opens, so closed popups download
+    nothing. Relative URLs are resolved against the Streamlit page the map's
+    iframe sits in (st_folium's component frame and a srcdoc frame differ).
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        {{ this._parent.get_name() }}.on("popupopen", function(e) {
+            var base = document.baseURI;
+            try { base = window.parent.location.href; } catch (err) {}
+            var images = e.popup.getElement().querySelectorAll("img[data-src]");
+            for (var i = 0; i < images.length; i++) {
+                images[i].src = new URL(images[i].getAttribute("data-src"), base).href;
+                images[i].removeAttribute("data-src");
+            }
+        });
+        {% endmacro %}
+    """)
+
+# Builds a place popup in the browser from its GeoJSON properties, only when it is opened
+PLACE_POPUP_JS = JsCode("""
+function(feature, layer) {
+    var p = feature.properties;
+    function esc(value) {
+        return String(value == null ? "" : value).replace(/[&<>"']/g, function(c) {
+            return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+        });
+    }
+    layer.bindPopup(function() {
+        var html = '<div style="width: 300px;"><h3>' + esc(p.name) + '</h3>';
+        if (p.photo) {
+            html += '<img data-src="' + esc(p.photo) + '" loading="lazy" alt="" style="width: 100%; max-width: 280px; margin: 10px 0; border-radius: 5px;">';
+        }
+        html += '<p><strong>Type:</strong> ' + esc(p.type) + '</p>';
+        if (p.date) { html += '<p><strong>Date:</strong> ' + esc(p.date) + '</p>'; }
+        html += '<p>' + esc(p.description || 'No description available') + '</p>';
+        if (p.link) {
+            html += '<p><strong>Link:</strong> <a href="' + esc(p.link) + '" target="_blank">' + esc(p.link) + '</a></p>';
+        }
+        return html + '</div>';
+    }, {maxWidth: 300});
+}
+""")
+
+def place_feature_collection(places):
+    """GeoJSON FeatureCollection of places with the few properties popups need."""
+    features = []
+    for place in places:
+        features.append({
+            "type": "Feature",
+            "id": place.get("id"),
+            "geometry": {"type": "Point", "coordinates": [place["lon"], place["lat"]]},
+            "properties": {
+                "name": place.get("name", ""),
+                "type": place.get("type", "attraction").title(),
+                "date": format_place_day(place["day"]) if place.get("day") else "",
+                "description": place.get("description", ""),
+                "link": place.get("link", ""),
+                "photo": photo_thumbnail_url(place.get("photo")) or "",
+                "color": place_marker_color(place),
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+def add_clustered_place_markers(m, places, name=None):
+    """All places as one GeoJSON layer inside a MarkerCluster; popups are built client-side."""
+    cluster = MarkerCluster(name=name).add_to(m)
+    folium.GeoJson(
+        place_feature_collection(places),
+        marker=folium.Marker(icon=folium.Icon(icon="info-sign")),
+        style_function=lambda feature: {"markerColor": feature["properties"]["color"]},
+        tooltip=folium.GeoJsonTooltip(fields=["name"], labels=False),
+        on_each_feature=PLACE_POPUP_JS,
+    ).add_to(cluster)
+    return cluster
+
+def add_day_layers(m, places, lang, clustered):
+    """
+    One toggleable layer per day (plus unassigned) and a LayerControl, all in a
+    single map payload, so days are shown and hidden in the browser.
+    """
+    by_day = {}
+    for place in places:
+        by_day.setdefault(place.get("day"), []).append(place)
+    days = sorted(d for d in by_day if d is not None) + ([None] if None in by_day else [])
+    for day in days:
+        if day is None:
+            label = t("unassigned", lang)
+        else:
+            try:
+                label = datetime.strptime(day, "%Y-%m-%d").strftime("%b %d")
+            except:
+                label = day
+        name = f"{label} ({len(by_day[day])})"
+        if clustered:
+            add_clustered_place_markers(m, by_day[day], name=name)
+        else:
+            layer = folium.FeatureGroup(name=name).add_to(m)
+            add_place_markers(layer, by_day[day])
+    folium.LayerControl(collapsed=False).add_to(m)
+
+def map_tile_options():
+    """folium.Map tile arguments: the local tile server when TRIP_TILE_URL is set, else OpenStreetMap."""
+    url = tile_url_template()
+    if url:
+        return {"tiles": url, "attr": TILE_ATTRIBUTION}
+    return {"tiles": "OpenStreetMap"}
+
+TILE_PREFETCH_ZOOMS = list(range(4, 17))
+TILE_PREFETCH_DEFAULT_ZOOMS = (6, 11)
+
+@st.fragment(run_every=1)
+def show_tile_prefetch_progress(lang="en"):
+    """Live progress of the tile download; reports the result when it finishes."""
+    job, progress = st.session_state.tile_prefetch
+    if not job.done():
+        st.progress(progress.get("done", 0) / max(progress.get("total", 0), 1),
+                    text=t("offline_tiles_progress", lang).format(progress.get("done", 0), progress.get("total", 0)))
+        return
+    del st.session_state["tile_prefetch"]
+    st.session_state.tile_cache_stats = get_tile_cache().store.stats()
+    if job.exception() is not None:
+        st.session_state.tile_prefetch_message = ("error", str(job.exception()))
+    else:
+        st.session_state.tile_prefetch_message = ("success", t("offline_tiles_done", lang).format(progress["fetched"], progress["failed"]))
+    st.rerun()
+
+def show_offline_tiles(places, lang="en"):
+    """Download the map tiles around the trip's places for use without signal (see tile_cache.py)."""
+    with st.expander(t("offline_tiles", lang)):
+        st.caption(t("offline_tiles_help", lang))
+        if tile_url_template():
+            st.caption(t("offline_tiles_source", lang).format(TILE_SERVER_URL))
+        # The expander's body runs on every rerun, so the tile store is only read on request
+        if "tile_cache_stats" not in st.session_state and st.button(t("offline_tiles_check", lang), key="tile_stats_button"):
+            st.session_state.tile_cache_stats = get_tile_cache().store.stats()
+        stats = st.session_state.get("tile_cache_stats")
+        if stats:
+            st.caption(t("offline_tiles_stored", lang).format(stats["tiles"], stats["bytes"] / 1024 / 1024, stats["max_bytes"] / 1024 / 1024))
+        
+        bbox = bbox_around((p["lat"], p["lon"]) for p in places if p.get("lat") is not None and p.get("lon") is not None)
+        if bbox is None:
+            return
+        low, high = st.select_slider(t("offline_tiles_zooms", lang), options=TILE_PREFETCH_ZOOMS,
+                                     value=TILE_PREFETCH_DEFAULT_ZOOMS, key="tile_zooms")
+        zooms = list(range(low, high + 1))
+        tile_count = count_tiles(bbox, zooms)
+        st.caption(t("offline_tiles_estimate", lang).format(tile_count, tile_count * AVERAGE_TILE_BYTES / 1024 / 1024))
+        too_many = tile_count > MAX_PREFETCH_TILES
+        if too_many:
+            st.warning(t("offline_tiles_too_many", lang).format(MAX_PREFETCH_TILES))
+        
+        if "tile_prefetch_message" in st.session_state:
+            level, message = st.session_state.pop("tile_prefetch_message")
+            (st.error if level == "error" else st.success)(message)
+        if "tile_prefetch" in st.session_state:
+            show_tile_prefetch_progress(lang)
+        elif st.button(t("offline_tiles_download", lang), disabled=too_many, key="tile_prefetch_button"):
+            progress = {}
+            job = get_scheduler().submit("tiles", get_tile_cache().prefetch, bbox, zooms, progress, priority=NORMAL)
+            st.session_state.tile_prefetch = (job, progress)
+            st.rerun()
+
+# Above this many places only the markers in view are sent to the browser
+MAP_VIEWPORT_THRESHOLD = 1000
+MAP_VIEWPORT_MARGIN = 0.25        # extra fraction of the view loaded on each side
+MAP_DETAIL_ZOOM = 10              # below this zoom, places are aggregated per grid cell
+MAP_AGGREGATE_CELL_PX = 80        # aggregation cell size in screen pixels
+MAP_VIEWPORT_MAX_MARKERS = 300    # more than this in view: aggregate even when zoomed in
+MAP_DEFAULT_VIEW = {"bounds": {"_southWest": {"lat": 31.0, "lng": -125.0}, "_northEast": {"lat": 39.0, "lng": -109.0}}, "zoom": 6}
+
+def get_places_index(places, cache_key):
+    """Spatial grid index of places with coordinates, rebuilt only when cache_key changes."""
+    cached = st.session_state.get("map_places_index")
+    if cached is None or cached[0] != cache_key:
+        index = GridIndex(cell_deg=0.5)
+        for place in places:
+            index.insert(place["lat"], place["lon"], place)
+        cached = st.session_state["map_places_index"] = (cache_key, index)
+    return cached[1]
+
+def viewport_bbox(viewport):
+    """(south, west, north, east) of the reported map view plus MAP_VIEWPORT_MARGIN on each side."""
+    bounds = (viewport.get("bounds") or {})
+    south_west = bounds.get("_southWest") or {}
+    north_east = bounds.get("_northEast") or {}
+    if south_west.get("lat") is None or north_east.get("lat") is None:
+        return viewport_bbox(MAP_DEFAULT_VIEW)
+    south, west = south_west["lat"], south_west["lng"]
+    north, east = north_east["lat"], north_east["lng"]
+    lat_margin = (north - south) * MAP_VIEWPORT_MARGIN
+    lon_margin = (east - west) * MAP_VIEWPORT_MARGIN
+    return (
+        max(-90.0, south - lat_margin), max(-180.0, west - lon_margin),
+        min(90.0, north + lat_margin), min(180.0, east + lon_margin),
+    )
+
+def build_viewport_layer(index, viewport):
+    """
+    FeatureGroup with the places around the current view: individual markers
+    when zoomed in, one circle per grid cell (sized by place count) when
+    zoomed out or crowded. Returns (layer, number of places in range).
+    """
+    layer = folium.FeatureGroup(name="places")
+    zoom = viewport.get("zoom") or MAP_DEFAULT_VIEW["zoom"]
+    visible = [place for _, _, place in index.query_bbox(*viewport_bbox(viewport))]
+    if zoom >= MAP_DETAIL_ZOOM and len(visible) <= MAP_VIEWPORT_MAX_MARKERS:
+        add_place_markers(layer, visible)
+        return layer, len(visible)
+    cell_deg = MAP_AGGREGATE_CELL_PX * 360.0 / (256 * 2 ** zoom)
+    cells = {}
+    for place in visible:
+        cells.setdefault((math.floor(place["lat"] / cell_deg), math.floor(place["lon"] / cell_deg)), []).append(place)
+    for group in cells.values():
+        if len(group) == 1:
+            add_place_markers(layer, group)
+            continue
+        folium.CircleMarker(
+            location=[sum(p["lat"] for p in group) / len(group), sum(p["lon"] for p in group) / len(group)],
+            radius=min(30, 6 + 3 * math.sqrt(len(group))),
+            tooltip=f"{len(group)} places",
+            color="#3186cc",
+            fill=True,
+            fill_opacity=0.6,
+        ).add_to(layer)
+    return layer, len(visible)
+
+PLACES_PAGE_SIZES = [10, 25, 50]
+
+def _reset_places_page():
+    st.session_state.places_page = 0
+
+def place_list_label(place, lang="en"):
+    """'Name (type) - Feb 01, 2026' for the places list."""
+    if place.get("day"):
+        try:
+            date_obj = datetime.strptime(place.get("day"), "%Y-%m-%d")
+            day_label = date_obj.strftime("%b %d, %Y")
+        except:
+            day_label = place.get("day")
+    else:
+        day_label = t("unassigned", lang)
+    return f"{place['name']} ({place.get('type', 'attraction')}) - {day_label}"
+
+def show_place_details(place, places_data, lang="en"):
+    """Photo, details and edit widgets of one place in the places list."""
+    # Display photo if exists
+    photo_path = place.get("photo")
+    if photo_path:
+        display_photo_in_streamlit(photo_path)
+    
+    st.write(f"**{t('description', lang)}:** {place.get('description', '')}")
+    if place.get('link'):
+        st.markdown(f"🔗 [Link]({place['link']})")
+    if place.get("lat") is not None and place.get("lon") is not None:
+        st.write(f"**{t('location', lang)}:** {place['lat']}, {place['lon']}")
+    else:
+        st.warning("⚠️ No coordinates - this place won't appear on the map")
+        # Quick geocode option
+        if st.button(t("find_coordinates", lang), key=f"quick_geocode_{place['id']}"):
+            with st.spinner("Searching..."):
+                city_info = get_geocoding_service().geocode(geocode_place_name, place['name'])
+                if city_info:
+                    place["lat"] = city_info["lat"]
+                    place["lon"] = city_info["lon"]
+                    save_places(places_data)
+                    st.success(f"✅ {t('coordinates_found', lang)}")
+                    st.rerun()
+                else:
+                    st.error(t("coordinates_not_found", lang))
+    
+    # Date selector
+    current_day = place.get("day")
+    # Convert string date to date object for date_input
+    default_date = datetime.now().date()
+    if current_day:
+        try:
+            default_date = datetime.strptime(current_day, "%Y-%m-%d").date()
+        except:
+            default_date = datetime.now().date()
+    
+    unassign_date = st.checkbox(f"{t('unassign', lang)} {t('date', lang).lower()}", value=False, key=f"unassign_{place['id']}")
+    
+    if not unassign_date:
+        new_day_input = st.date_input(
+            t("date", lang),
+            value=default_date,
+            key=f"day_{place['id']}"
+        )
+        new_day = new_day_input.strftime("%Y-%m-%d") if new_day_input else None
+    else:
+        new_day = None
+    
+    if new_day != current_day:
+        place["day"] = new_day
+        save_places(places_data)
+        st.rerun()
+    
+    # Photo upload/update
+    st.markdown(f"**{t('update_photo', lang)}:**")
+    with st.form(f"photo_form_{place['id']}"):
+        new_photo = st.file_uploader(
+            t("upload_photo", lang),
+            type=['png', 'jpg', 'jpeg'],
+            key=f"photo_{place['id']}"
+        )
+        if st.form_submit_button(t("update_photo", lang)):
+            if new_photo is not None:
+                photo_path = save_photo(new_photo, place['id'])
+                place["photo"] = photo_path
+                save_places(places_data)
+                st.success(t("update_photo", lang) + "!")
+                st.rerun()
+            else:
+                st.warning(t("please_select_photo", lang))
+    
+    completed = st.checkbox(
+        t("mark_as_completed", lang),
+        value=place.get("completed", False),
+        key=f"completed_{place['id']}"
+    )
+    if completed != place.get("completed", False):
+        place["completed"] = completed
+        save_places(places_data)
+        st.rerun()
+    
+    if st.button(f"{t('delete', lang)} {place['name']}", key=f"delete_{place['id']}"):
+        # Delete photo file if exists
+        if place.get("photo") and os.path.exists(place.get("photo")):
+            try:
+                os.remove(place.get("photo"))
+            except:
+                pass
+        places_data["places"].remove(place)
+        save_places(places_data)
+        st.rerun()
+
+def show_places_list(places_data, lang="en"):
+    """
+    Searchable, paginated list of places. Each place is a single button; only
+    the opened one builds its photo and edit widgets, so reruns stay fast
+    however many places the trip has.
+    """
+    places = places_data.get("places", [])
+    if not places:
+        st.info(t("no_places", lang))
+        return
+    
+    # Sort by date, then by name
+    def sort_key(place):
+        day = place.get("day")
+        if day:
+            try:
+                date_obj = datetime.strptime(day, "%Y-%m-%d")
+                return (date_obj, place['name'])
+            except:
+                # If date parsing fails, use far future date
+                return (datetime(9999, 12, 31), place['name'])
+        # Unassigned places go to the end
+        return (datetime(9999, 12, 31), place['name'])
+    
+    search = st.text_input(t("search_places", lang), key="places_search", on_change=_reset_places_page)
+    labels = [(place, place_list_label(place, lang)) for place in sorted(places, key=sort_key)]
+    if search.strip():
+        query = search.strip().lower()
+        labels = [
+            (place, label) for place, label in labels
+            if query in label.lower() or query in (place.get("description") or "").lower()
+        ]
+    
+    page_size = st.selectbox(t("places_per_page", lang), PLACES_PAGE_SIZES, key="places_page_size", on_change=_reset_places_page)
+    page_count = max(1, math.ceil(len(labels) / page_size))
+    page = min(st.session_state.get("places_page", 0), page_count - 1)
+    
+    for place, label in labels[page * page_size:(page + 1) * page_size]:
+        if st.session_state.get("open_place_id") == place["id"]:
+            with st.container(border=True):
+                st.markdown(f"**{label}**")
+                if st.button(t("close", lang), key=f"close_place_{place['id']}"):
+                    st.session_state.open_place_id = None
+                    st.rerun()
+                show_place_details(place, places_data, lang)
+        elif st.button(label, key=f"open_place_{place['id']}", use_container_width=True):
+            st.session_state.open_place_id = place["id"]
+            st.rerun()
+    
+    if page_count > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("◀", key="places_page_prev", disabled=page == 0, use_container_width=True):
+                st.session_state.places_page = page - 1
+                st.rerun()
+        with col2:
+            st.caption(t("places_page", lang).format(page + 1, page_count, len(labels)))
+        with col3:
+            if st.button("▶", key="places_page_next", disabled=page >= page_count - 1, use_container_width=True):
+                st.session_state.places_page = page + 1
+                st.rerun()
+
 def show_map(lang="en"):
     st.header(t("map_header", lang))
     st.markdown(t("map_instructions", lang))
@@ -1413,44 +2831,49 @@ def show_map(lang="en"):
     if "selected_day_filter" not in st.session_state:
         st.session_state.selected_day_filter = "all"
     
-    # Create button layout - first row with "All Days" and dates
-    buttons_per_row = 8
-    all_buttons = ["all"] + all_dates + (["unassigned"] if has_unassigned else [])
+    # In browser mode every day is its own map layer, so no day buttons (and no reruns)
+    client_filter = st.toggle(t("map_client_filter", lang), key="map_client_filter", help=t("map_client_filter_help", lang))
+    
+    if not client_filter:
+        # Create button layout - first row with "All Days" and dates
+        buttons_per_row = 8
+        all_buttons = ["all"] + all_dates + (["unassigned"] if has_unassigned else [])
     
-    # Split buttons into rows
-    for row_start in range(0, len(all_buttons), buttons_per_row):
-        row_buttons = all_buttons[row_start:row_start + buttons_per_row]
-        cols = st.columns(len(row_buttons))
+        # Split buttons into rows
+        for row_start in range(0, len(all_buttons), buttons_per_row):
+            row_buttons = all_buttons[row_start:row_start + buttons_per_row]
+            cols = st.columns(len(row_buttons))
         
-        for col, btn_value in zip(cols, row_buttons):
-            with col:
-                if btn_value == "all":
-                    btn_label = t("all_dates", lang)
-                    btn_key = "filter_all"
-                elif btn_value == "unassigned":
-                    btn_label = t("unassigned", lang)
-                    btn_key = "filter_unassigned"
-                else:
-                    # Format date for display (e.g., "Feb 1" or "Feb 15")
-                    try:
-                        date_obj = datetime.strptime(btn_value, "%Y-%m-%d")
-                        btn_label = date_obj.strftime("%b %d")
-                    except:
-                        btn_label = btn_value
-                    btn_key = f"filter_date_{btn_value}"
+            for col, btn_value in zip(cols, row_buttons):
+                with col:
+                    if btn_value == "all":
+                        btn_label = t("all_dates", lang)
+                        btn_key = "filter_all"
+                    elif btn_value == "unassigned":
+                        btn_label = t("unassigned", lang)
+                        btn_key = "filter_unassigned"
+                    else:
+                        # Format date for display (e.g., "Feb 1" or "Feb 15")
+                        try:
+                            date_obj = datetime.strptime(btn_value, "%Y-%m-%d")
+                            btn_label = date_obj.strftime("%b %d")
+                        except:
+                            btn_label = btn_value
+                        btn_key = f"filter_date_{btn_value}"
                 
-                is_selected = st.session_state.selected_day_filter == btn_value
-                if st.button(btn_label, key=btn_key, use_container_width=True,
-                           type="primary" if is_selected else "secondary"):
-                    st.session_state.selected_day_filter = btn_value
-                    st.rerun()
+                    is_selected = st.session_state.selected_day_filter == btn_value
+                    if st.button(btn_label, key=btn_key, use_container_width=True,
+                               type="primary" if is_selected else "secondary"):
+                        st.session_state.selected_day_filter = btn_value
+                        st.rerun()
     
-    # Determine which date to filter by
+    # Determine which date to filter by (browser mode always sends every day)
+    selected_day_filter = "all" if client_filter else st.session_state.selected_day_filter
     filter_day = None
-    if st.session_state.selected_day_filter == "unassigned":
+    if selected_day_filter == "unassigned":
         filter_day = "unassigned"
-    elif st.session_state.selected_day_filter != "all":
-        filter_day = st.session_state.selected_day_filter
+    elif selected_day_filter != "all":
+        filter_day = selected_day_filter
     
     # Filter places by day
     filtered_places = places
@@ -1463,68 +2886,58 @@ def show_map(lang="en"):
     places_with_coords = [p for p in filtered_places if p.get("lat") is not None and p.get("lon") is not None]
     places_without_coords = [p for p in filtered_places if p.get("lat") is None or p.get("lon") is None]
     
-    # Create map centered on the trip area
-    m = folium.Map(
-        location=[35.0, -117.0],
-        zoom_start=6,
-        tiles='OpenStreetMap'
-    )
+    # Large place sets are clustered
+    clustered = len(places_with_coords) > MAP_CLUSTER_THRESHOLD
     
-    # Add markers for each filtered place with coordinates
-    for place in places_with_coords:
-        # Determine marker color
-        if place.get("completed", False):
-            color = "green"
-        elif place.get("type") == "restaurant":
-            color = "red"
+    def build_map():
+        # Create map centered on the trip area
+        m = folium.Map(
+            location=[35.0, -117.0],
+            zoom_start=6,
+            **map_tile_options()
+        )
+        LazyPopupImages().add_to(m)
+        # Add markers for each filtered place with coordinates
+        if client_filter:
+            add_day_layers(m, places_with_coords, lang, clustered)
+        elif clustered:
+            add_clustered_place_markers(m, places_with_coords)
         else:
-            color = "blue"
-        
-        # Get photo for popup
-        photo_html = ""
-        photo_path = place.get("photo")
-        if photo_path and os.path.exists(photo_path):
-            photo_b64 = get_photo_base64(photo_path)
-            if photo_b64:
-                photo_html = f'<img src="data:image/jpeg;base64,{photo_b64}" style="width: 100%; max-width: 280px; margin: 10px 0; border-radius: 5px;">'
-        
-        # Date info
-        day_info = ""
-        if place.get("day"):
-            try:
-                date_obj = datetime.strptime(place.get("day"), "%Y-%m-%d")
-                formatted_date = date_obj.strftime("%B %d, %Y")
-                day_info = f'<p><strong>Date:</strong> {formatted_date}</p>'
-            except:
-                day_info = f'<p><strong>Date:</strong> {place.get("day")}</p>'
-        
-        # Link info
-        link_html = ""
-        if place.get('link'):
-            link_html = f'<p><strong>Link:</strong> <a href="{place["link"]}" target="_blank">{place["link"]}</a></p>'
-        
-        # Create popup content
-        popup_html = f"""
-        <div style="width: 300px;">
-            <h3>{place['name']}</h3>
-            {photo_html}
-            <p><strong>Type:</strong> {place.get('type', 'attraction').title()}</p>
-            {day_info}
-            <p>{place.get('description', 'No description available')}</p>
-            {link_html}
-        </div>
-        """
-        
-        folium.Marker(
-            location=[place['lat'], place['lon']],
-            popup=folium.Popup(popup_html, max_width=300),
-            tooltip=place['name'],
-            icon=folium.Icon(color=color, icon='info-sign')
-        ).add_to(m)
+            add_place_markers(m, places_with_coords)
+        return m
     
-    # Display map
+    # Display map; it is only rebuilt when places, the day filter, the language or the thumbnails change
     st.info(t("showing_places", lang).format(len(places_with_coords), len(filtered_places)))
-    map_data = st_folium(m, width=1200, height=600)
+    places_version = st.session_state.get("places_version", 0)
+    if queue_missing_thumbnails(places):
+        st.session_state["thumbnails_version"] = st.session_state.get("thumbnails_version", 0) + 1
+    thumbnails_version = st.session_state.get("thumbnails_version", 0)
+    if "thumbnail_job" in st.session_state:
+        watch_thumbnail_job()
+    if not client_filter and len(places_with_coords) > MAP_VIEWPORT_THRESHOLD:
+        # Very large sets: only what is in view is sent, re-queried after every pan/zoom
+        index = get_places_index(places_with_coords, (places_version, selected_day_filter))
+        layer, visible = build_viewport_layer(index, st.session_state.get("map_viewport") or {})
+        st.caption(t("map_viewport", lang).format(visible))
+        base_map = folium.Map(location=[35.0, -117.0], zoom_start=6, **map_tile_options())
+        LazyPopupImages().add_to(base_map)
+        st_folium(
+            base_map, width=1200, height=600, key="map_viewport",
+            feature_group_to_add=layer, returned_objects=["bounds", "zoom"]
+        )
+    else:
+        if clustered:
+            st.caption(t("map_clustered", lang))
+        map_key = (places_version, thumbnails_version, "layers" if client_filter else selected_day_filter, lang)
+        cached_folium_map(st.session_state.setdefault("map_render_cache", {}), map_key, build_map, height=600)
+    
+    show_offline_tiles(places, lang)
+    
+    # Batch geocoding: progress of a running (or resumed) job, result of a finished one
+    if "batch_geocode_message" in st.session_state:
+        st.success(st.session_state.pop("batch_geocode_message"))
+    if get_batch_job(batch_geocode_job_name()) is not None:
+        show_batch_geocode_progress(lang)
     
     # Show places without coordinates
     if places_without_coords:
@@ -1532,6 +2945,12 @@ def show_map(lang="en"):
         st.subheader(t("places_without_coordinates", lang))
         st.info(f"These {len(places_without_coords)} place(s) don't have coordinates and can't be shown on the map. Use the 'Find Location' button to add coordinates.")
         
+        all_missing = [p for p in places if p.get("lat") is None or p.get("lon") is None]
+        if get_batch_job(batch_geocode_job_name()) is None and all_missing:
+            if st.button(t("geocode_all", lang).format(len(all_missing)), key="geocode_all", type="primary"):
+                start_batch_geocode(all_missing)
+                st.rerun()
+        
         for place in places_without_coords:
             with st.expander(f"📍 {place['name']} ({place.get('type', 'attraction')})"):
                 st.write(f"**{t('description', lang)}:** {place.get('description', '')}")
@@ -1547,7 +2966,7 @@ def show_map(lang="en"):
                 with col2:
                     if st.button(t("geocode_place", lang), key=f"geocode_{place['id']}"):
                         with st.spinner("Searching for location..."):
-                            city_info = geocode_place_name(geocode_name.strip())
+                            city_info = get_geocoding_service().geocode(geocode_place_name, geocode_name.strip())
                             if city_info:
                                 place["lat"] = city_info["lat"]
                                 place["lon"] = city_info["lon"]
@@ -1599,7 +3018,7 @@ def show_map(lang="en"):
         
         if search_clicked and place_name_for_geocode:
             with st.spinner("Searching for location..."):
-                city_info = geocode_place_name(place_name_for_geocode.strip())
+                city_info = get_geocoding_service().geocode(geocode_place_name, place_name_for_geocode.strip())
                 if city_info:
                     st.session_state.new_place_lat = city_info["lat"]
                     st.session_state.new_place_lon = city_info["lon"]
@@ -1667,127 +3086,7 @@ def show_map(lang="en"):
     
     with col2:
         st.markdown(f"### {t('existing_places', lang)}")
-        if places:
-            # Sort by date, then by name
-            def sort_key(place):
-                day = place.get("day")
-                if day:
-                    try:
-                        date_obj = datetime.strptime(day, "%Y-%m-%d")
-                        return (date_obj, place['name'])
-                    except:
-                        # If date parsing fails, use far future date
-                        return (datetime(9999, 12, 31), place['name'])
-                # Unassigned places go to the end
-                return (datetime(9999, 12, 31), place['name'])
-            sorted_places = sorted(places, key=sort_key)
-            
-            for place in sorted_places:
-                # Format date label
-                if place.get("day"):
-                    try:
-                        date_obj = datetime.strptime(place.get("day"), "%Y-%m-%d")
-                        day_label = date_obj.strftime("%b %d, %Y")
-                    except:
-                        day_label = place.get("day")
-                else:
-                    day_label = t("unassigned", lang)
-                expander_title = f"{place['name']} ({place.get('type', 'attraction')}) - {day_label}"
-                
-                with st.expander(expander_title):
-                    # Display photo if exists
-                    photo_path = place.get("photo")
-                    if photo_path and os.path.exists(photo_path):
-                        display_photo_in_streamlit(photo_path)
-                    
-                    st.write(f"**{t('description', lang)}:** {place.get('description', '')}")
-                    if place.get('link'):
-                        st.markdown(f"🔗 [Link]({place['link']})")
-                    if place.get("lat") is not None and place.get("lon") is not None:
-                        st.write(f"**{t('location', lang)}:** {place['lat']}, {place['lon']}")
-                    else:
-                        st.warning("⚠️ No coordinates - this place won't appear on the map")
-                        # Quick geocode option
-                        if st.button(t("find_coordinates", lang), key=f"quick_geocode_{place['id']}"):
-                            with st.spinner("Searching..."):
-                                city_info = geocode_place_name(place['name'])
-                                if city_info:
-                                    place["lat"] = city_info["lat"]
-                                    place["lon"] = city_info["lon"]
-                                    save_places(places_data)
-                                    st.success(f"✅ {t('coordinates_found', lang)}")
-                                    st.rerun()
-                                else:
-                                    st.error(t("coordinates_not_found", lang))
-                    
-                    # Date selector
-                    current_day = place.get("day")
-                    # Convert string date to date object for date_input
-                    default_date = datetime.now().date()
-                    if current_day:
-                        try:
-                            default_date = datetime.strptime(current_day, "%Y-%m-%d").date()
-                        except:
-                            default_date = datetime.now().date()
-                    
-                    unassign_date = st.checkbox(f"{t('unassign', lang)} {t('date', lang).lower()}", value=False, key=f"unassign_{place['id']}")
-                    
-                    if not unassign_date:
-                        new_day_input = st.date_input(
-                            t("date", lang),
-                            value=default_date,
-                            key=f"day_{place['id']}"
-                        )
-                        new_day = new_day_input.strftime("%Y-%m-%d") if new_day_input else None
-                    else:
-                        new_day = None
-                    
-                    if new_day != current_day:
-                        place["day"] = new_day
-                        save_places(places_data)
-                        st.rerun()
-                    
-                    # Photo upload/update
-                    st.markdown(f"**{t('update_photo', lang)}:**")
-                    with st.form(f"photo_form_{place['id']}"):
-                        new_photo = st.file_uploader(
-                            t("upload_photo", lang),
-                            type=['png', 'jpg', 'jpeg'],
-                            key=f"photo_{place['id']}"
-                        )
-                        if st.form_submit_button(t("update_photo", lang)):
-                            if new_photo is not None:
-                                photo_path = save_photo(new_photo, place['id'])
-                                place["photo"] = photo_path
-                                save_places(places_data)
-                                st.success(t("update_photo", lang) + "!")
-                                st.rerun()
-                            else:
-                                st.warning(t("please_select_photo", lang))
-                    
-                    completed = st.checkbox(
-                        t("mark_as_completed", lang),
-                        value=place.get("completed", False),
-                        key=f"completed_{place['id']}"
-                    )
-                    if completed != place.get("completed", False):
-                        place["completed"] = completed
-                        save_places(places_data)
-                        st.rerun()
-                    
-                    if st.button(f"{t('delete', lang)} {place['name']}", key=f"delete_{place['id']}"):
-                        # Delete photo file if exists
-                        if place.get("photo") and os.path.exists(place.get("photo")):
-                            try:
-                                os.remove(place.get("photo"))
-                            except:
-                                pass
-                        places.remove(place)
-                        places_data["places"] = places
-                        save_places(places_data)
-                        st.rerun()
-        else:
-            st.info(t("no_places", lang))
+        show_places_list(places_data, lang)
 
 def show_todo(lang="en"):
     st.header(t("todo_header", lang))
@@ -2698,6 +3997,8 @@ def show_weather(lang="en"):
     
     if places:
         city_groups = group_places_by_city(places)
+        if start_city_lookups(places) is not None:
+            show_city_lookup_progress(lang)
         
         # Also create individual place options
         for place in places:
@@ -2716,6 +4017,28 @@ def show_weather(lang="en"):
                 except:
                     pass
     
+    # Day-by-day weather where the group will actually be
+    show_itinerary_weather(lang)
+    st.divider()
+    
+    # Trip-wide forecast: every city in one batched request, shown as a date × city table
+    if city_groups:
+        st.subheader(t("trip_forecast_header", lang))
+        city_coords = [(c["lat"], c["lon"]) for c in city_groups.values() if c.get("lat") and c.get("lon")]
+        if st.button(t("get_all_forecasts", lang).format(len(city_coords)), key="trip_forecast_btn"):
+            with st.spinner("Fetching weather data..."):
+                try:
+                    prefetch_forecasts(city_coords)
+                except Exception as e:
+                    st.error(f"Error fetching weather: {str(e)}")
+        trip_table = build_trip_forecast_table(city_groups)
+        if trip_table is not None:
+            st.dataframe(trip_table, use_container_width=True)
+            st.caption(t("trip_forecast_caption", lang))
+        else:
+            st.caption(t("trip_forecast_empty", lang))
+        st.divider()
+    
     # Build location options
     location_options = []
     location_data = {}
@@ -2762,7 +4085,7 @@ def show_weather(lang="en"):
         if manual_city and manual_city.strip():
             if st.button(t("get_weather_forecast", lang), key="manual_city_btn"):
                 with st.spinner("Searching for city..."):
-                    city_info = geocode_city_name(manual_city.strip())
+                    city_info = get_geocoding_service().geocode(geocode_city_name, manual_city.strip())
                     if city_info:
                         selected_location = {
                             "name": f"{city_info['name']}, {city_info.get('admin1', '')} {city_info.get('country', '')}".strip(),
@@ -2816,11 +4139,15 @@ def show_weather(lang="en"):
         location_type_icon = "🏙️" if selected_location.get("type") == "city" else "📍"
         st.subheader(f"{location_type_icon} {selected_location['name']} - {selected_date.strftime('%B %d, %Y')}")
         
-        # Fetch weather data (Open-Meteo is free, no API key needed)
+        # Fetch weather data (Open-Meteo is free, no API key needed); cached forecasts show right away
         weather_data = None
         if st.button(t("get_weather_forecast", lang)):
             with st.spinner("Fetching weather data..."):
                 weather_data = get_weather_from_api(lat, lon, selected_date)
+        else:
+            cached_daily = get_cached_forecast(lat, lon)
+            if cached_daily:
+                weather_data = weather_for_date(cached_daily, selected_date)
         
         # Display weather data
         if weather_data:
@@ -2843,17 +4170,7 @@ def show_weather(lang="en"):
             
             with col2:
                 # Weather icon (using emoji based on condition)
-                icon_map = {
-                    "Clear": "☀️",
-                    "Cloudy": "☁️",
-                    "Rain": "🌧️",
-                    "Drizzle": "🌦️",
-                    "Thunderstorm": "⛈️",
-                    "Snow": "❄️",
-                    "Foggy": "🌫️",
-                    "Unknown": "🌤️"
-                }
-                icon_emoji = icon_map.get(condition, "🌤️")
+                icon_emoji = WEATHER_ICONS.get(condition, "🌤️")
                 st.markdown(f"# {icon_emoji}")
             
             with col3:
@@ -2908,11 +4225,15 @@ def show_routes(lang="en"):
     st.markdown(t("routes_description", lang))
     
     places_data = load_places()
-    places = places_data.get("places", [])
+    trip_info = load_trip_info()
+    hotels = trip_info.get("hotels", [])
+    # Only places with coordinates can be routed
+    places = [p for p in places_data.get("places", []) if p.get("lat") is not None and p.get("lon") is not None]
     
     if len(places) < 2:
         st.info(t("no_places", lang))
         return
+    matrix = get_distance_matrix(places)
     
     # Distance calculator between two places
     st.subheader(t("calculate_distance", lang))
@@ -2927,11 +4248,13 @@ def show_routes(lang="en"):
         to_idx = st.selectbox(t("select_to", lang), range(len(places)), format_func=lambda x: place_names[x], key="to_place")
         to_place = places[to_idx]
     
+    nearest = matrix.nearest(from_idx, k=NEAREST_PLACES_SHOWN)
+    st.caption(t("nearest_places", lang).format(from_place['name']) + ", ".join(
+        f"{places[row]['name']} ({miles:.1f} {t('miles', lang)})" for row, miles in nearest
+    ))
+    
     if from_idx != to_idx:
-        distance_miles = haversine_distance(
-            from_place['lat'], from_place['lon'],
-            to_place['lat'], to_place['lon']
-        )
+        distance_miles = float(matrix.miles[from_idx, to_idx])
         distance_km = distance_miles * 1.60934
         
         col1, col2, col3 = st.columns(3)
@@ -2957,7 +4280,8 @@ def show_routes(lang="en"):
         st.subheader("Route Map")
         route_map = folium.Map(
             location=[(from_place['lat'] + to_place['lat'])/2, (from_place['lon'] + to_place['lon'])/2],
-            zoom_start=7
+            zoom_start=7,
+            **map_tile_options()
         )
         
         # Add markers
@@ -3005,26 +4329,47 @@ def show_routes(lang="en"):
             places_to_optimize = places_by_date[selected_date_opt]
             
             if len(places_to_optimize) >= 2:
+                # Days covered by a hotel stay start and end there unless turned off
+                selected_day = parse_day(selected_date_opt)
+                has_hotel = bool(selected_day) and day_hotels(hotels, selected_day)[0] is not None
+                from_hotel = has_hotel and st.checkbox(t("route_from_hotel", lang), value=True, key="route_from_hotel")
+                closed, start_stop, end_stop = False, None, None
+                if not from_hotel:
+                    stop_names = [p['name'] for p in places_to_optimize]
+                    stop_choices = [None] + list(range(len(places_to_optimize)))
+                    stop_label = lambda i: t("route_any", lang) if i is None else stop_names[i]
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        closed = st.checkbox(t("route_round_trip", lang), key="route_closed")
+                    with col2:
+                        start_stop = st.selectbox(t("route_start", lang), stop_choices, format_func=stop_label,
+                                                  key=f"route_start_{selected_date_opt}")
+                    with col3:
+                        end_stop = st.selectbox(t("route_end", lang), stop_choices, format_func=stop_label,
+                                                key=f"route_end_{selected_date_opt}", disabled=closed)
+                    if closed or end_stop == start_stop:
+                        end_stop = None
+                
                 if st.button(t("optimize_route", lang)):
-                    # Simple optimization: start from first place, go to nearest unvisited
-                    optimized = [places_to_optimize[0]]
-                    remaining = places_to_optimize[1:]
-                    
-                    while remaining:
-                        current = optimized[-1]
-                        nearest = min(remaining, key=lambda p: haversine_distance(
-                            current['lat'], current['lon'], p['lat'], p['lon']
-                        ))
-                        optimized.append(nearest)
-                        remaining.remove(nearest)
+                    # Exact for small days, else greedy nearest-neighbour improved with 2-opt/Or-opt
+                    if from_hotel:
+                        with st.spinner(t("trip_routes_planning", lang)):
+                            plan = plan_trip_routes(places, trip_info, days=[selected_date_opt])[0]
+                    else:
+                        plan = plan_day_route(matrix, places_to_optimize, start=start_stop, end=end_stop, closed=closed)
+                    optimized, route, result = plan["stops"], plan["route"], plan["result"]
                     
                     # Display optimized route
                     st.markdown(f"**{t('route_order', lang)}:**")
-                    total_dist = calculate_route_distance(optimized)
+                    total_dist = calculate_route_distance(route)
                     total_time = estimate_travel_time(total_dist, "driving")
                     
-                    route_text = " → ".join([p['name'] for p in optimized])
+                    route_text = " → ".join([p['name'] for p in route])
                     st.write(route_text)
+                    st.caption(t("route_improvement", lang).format(
+                        result["initial_length"], result["length"], t("miles", lang), result["saved_pct"],
+                        t("route_method_exact", lang) if result["method"] == "exact" else result["method"], result["seconds"]
+                    ))
                     
                     col1, col2 = st.columns(2)
                     with col1:
@@ -3037,7 +4382,8 @@ def show_routes(lang="en"):
                     # Show optimized route on map
                     opt_map = folium.Map(
                         location=[optimized[0]['lat'], optimized[0]['lon']],
-                        zoom_start=7
+                        zoom_start=7,
+                        **map_tile_options()
                     )
                     
                     # Add all markers
@@ -3045,14 +4391,14 @@ def show_routes(lang="en"):
                         folium.Marker(
                             [place['lat'], place['lon']],
                             popup=f"{i+1}. {place['name']}",
-                            icon=folium.Icon(color="blue", icon=str(i+1))
+                            icon=folium.Icon(color="purple", icon="home") if place.get("hotel") else folium.Icon(color="blue", icon=str(i+1))
                         ).add_to(opt_map)
                     
                     # Add route lines
-                    for i in range(len(optimized) - 1):
+                    for i in range(len(route) - 1):
                         folium.PolyLine(
-                            [[optimized[i]['lat'], optimized[i]['lon']], 
-                             [optimized[i+1]['lat'], optimized[i+1]['lon']]],
+                            [[route[i]['lat'], route[i]['lon']], 
+                             [route[i+1]['lat'], route[i+1]['lon']]],
                             color="blue",
                             weight=2,
                             opacity=0.7
@@ -3065,6 +4411,42 @@ def show_routes(lang="en"):
             st.info("Add dates to your places to enable route optimization by date")
     else:
         st.info("Add dates to at least 2 places to enable route optimization")
+    
+    if hotels and places_with_dates:
+        st.divider()
+        show_trip_routes(places, trip_info, lang)
+
+def show_trip_routes(places, trip_info, lang="en"):
+    """Hotel-anchored routes for every trip day, planned together and kept until places or hotels change."""
+    st.subheader(t("trip_routes", lang))
+    st.caption(t("trip_routes_help", lang))
+    plan_key = (st.session_state.get("places_version", 0), json.dumps(trip_info.get("hotels", []), sort_keys=True, default=str))
+    cached = st.session_state.get("trip_route_plan")
+    if st.button(t("plan_all_days", lang), key="plan_all_days"):
+        with st.spinner(t("trip_routes_planning", lang)):
+            cached = st.session_state["trip_route_plan"] = (plan_key, plan_trip_routes(places, trip_info))
+    if cached is None or cached[0] != plan_key:
+        return
+    
+    rows = []
+    total_miles = 0.0
+    for plan in cached[1]:
+        miles = plan["result"]["length"]
+        total_miles += miles
+        hours = estimate_travel_time(miles, "driving")
+        rows.append({
+            t("date", lang): plan["day"],
+            t("route_order", lang): " → ".join(p["name"] for p in plan["route"]),
+            t("miles", lang): round(miles, 1),
+            t("total_time", lang): f"{int(hours)}h {int((hours - int(hours)) * 60)}m",
+        })
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    total_hours = estimate_travel_time(total_miles, "driving")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric(t("trip_routes_total", lang), f"{total_miles:.1f} {t('miles', lang)} ({total_miles * 1.60934:.1f} {t('km', lang)})")
+    with col2:
+        st.metric(t("total_time", lang), f"{int(total_hours)}h {int((total_hours - int(total_hours)) * 60)}m")
 
 if __name__ == "__main__":
     main()
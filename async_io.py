@@ -0,0 +1,47 @@
+"""
+Concurrent outbound I/O for Trip Planner.
+The Streamlit script runs synchronously, so independent lookups used to run
+one after another. gather_calls() hands a batch of calls to the shared job
+scheduler (jobs.py) and waits for all of them together, so the caller pays for
+its slowest lookup instead of the sum. Only lookups to different providers
+gain from this: calls to one rate-limited provider still queue on its limit.
+
+Calls run as scheduler jobs of the kind given for each (e.g. "geocode",
+"forecast", "rates"), so per-kind caps, priorities and the one worker pool
+apply; HTTP still goes through http_client (pooling, retries, rate limits).
+A caller that is itself a job holds its worker while it waits, so it should
+not use a kind whose cap its own calls need.
+"""
+from concurrent.futures import wait
+
+from jobs import get_scheduler, INTERACTIVE
+
+DEFAULT_TIMEOUT = 30
+
+
+def gather_calls(calls, timeout=DEFAULT_TIMEOUT, priority=INTERACTIVE):
+    """
+    Run independent blocking calls concurrently and wait for all of them.
+    calls = {key: (kind, fn, arg1, arg2, ...)}; returns {key: result}. A call
+    that raised, or was still queued or running after `timeout` seconds, maps
+    to its exception instead of aborting the others (queued ones are cancelled,
+    running ones finish in the background).
+    Called functions must not touch st.session_state (they run off the script thread).
+    """
+    if not calls:
+        return {}
+    scheduler = get_scheduler()
+    jobs = {key: scheduler.submit(kind, fn, *args, priority=priority) for key, (kind, fn, *args) in calls.items()}
+    wait(jobs.values(), timeout=timeout)
+    results = {}
+    for key, job in jobs.items():
+        if not job.done():
+            job.cancel()
+            results[key] = TimeoutError(f"{key!r} did not finish within {timeout} s")
+        elif job.cancelled():
+            results[key] = TimeoutError(f"{key!r} was cancelled")
+        elif job.exception() is not None:
+            results[key] = job.exception()
+        else:
+            results[key] = job.result()
+    return results
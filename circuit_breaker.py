@@ -0,0 +1,121 @@
+"""
+Circuit breakers for Trip Planner's external services.
+One breaker per upstream host, shared by every session in the process. After
+FAILURE_THRESHOLD consecutive failures (connection errors, timeouts, 5xx/429)
+the breaker opens and calls fail immediately with CircuitOpenError instead of
+waiting out timeouts. After a cool-down one probe request is let through
+(half-open): success closes the breaker, failure re-opens it with a longer
+cool-down.
+"""
+import threading
+import time
+
+import requests
+
+FAILURE_THRESHOLD = 2
+RESET_TIMEOUT = 30            # seconds before the first half-open probe
+MAX_RESET_TIMEOUT = 300       # cool-down doubles on each failed probe up to this
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Display names for the sidebar; unknown hosts show their host name
+PROVIDER_NAMES = {
+    "nominatim.openstreetmap.org": "Nominatim",
+    "geocoding-api.open-meteo.com": "Open-Meteo geocoding",
+    "api.open-meteo.com": "Open-Meteo forecast",
+    "api.exchangerate-api.com": "ExchangeRate-API",
+    "api.exchangerate.host": "exchangerate.host",
+    "tile.openstreetmap.org": "OpenStreetMap tiles",
+}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while the provider's breaker is open."""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one provider (thread-safe)."""
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_error = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a request may go out now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError(f"{self.name} is unavailable (retry in {self.retry_in():.0f} s)")
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.reset_timeout = self.base_reset_timeout
+            self.last_error = None
+            self._probe_in_flight = False
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error) if error else None
+            if self.state == HALF_OPEN:
+                self.reset_timeout = min(self.reset_timeout * 2, MAX_RESET_TIMEOUT)
+                self._open()
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+            self._probe_in_flight = False
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.time()
+
+    def retry_in(self):
+        """Seconds until the next probe is allowed (0 when closed)."""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.time())
+
+    def status(self):
+        return {
+            "name": self.name,
+            "state": self.state,
+            "failures": self.failures,
+            "retry_in": self.retry_in(),
+            "last_error": self.last_error,
+        }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(host):
+    """Process-wide breaker for `host`."""
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(PROVIDER_NAMES.get(host, host))
+        return breaker
+
+
+def provider_health():
+    """Status dicts of every breaker created so far, sorted by name."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return sorted((b.status() for b in breakers), key=lambda s: s["name"])
@@ -17,6 +17,7 @@ DATA_KEYS = [
     "users",
     "weather",
     "exchange_rates",
+    "geocode_cache",
 ]
 
 # Prefix for photo keys in DB: photo_<place_id>
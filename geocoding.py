@@ -0,0 +1,327 @@
+"""
+Geocoding service for Trip Planner.
+Runs geocode lookups on a shared thread pool, throttled per provider with a
+token bucket (Nominatim allows at most 1 request per second), and dedupes
+identical queries that are already in flight. Callers get
+concurrent.futures.Future objects back, so a batch of place names finishes
+at the provider's rate limit instead of at the sum of request latencies.
+
+GeocodeCache keeps results per normalized query (LRU, size-capped), including
+short-lived "not found" entries so typos don't hammer the APIs.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from jobs import INTERACTIVE, NORMAL, PREFETCH
+
+# Requests per second and burst size allowed by each provider's usage policy
+PROVIDER_RATE_LIMITS = {
+    "nominatim": (1.0, 1),     # https://operations.osmfoundation.org/policies/nominatim/
+    "open-meteo": (10.0, 10),  # free tier, 10k calls/day
+    "osm-tiles": (2.0, 2),     # https://operations.osmfoundation.org/policies/tiles/
+}
+DEFAULT_MAX_WORKERS = 4
+
+# Geocode cache policy
+CACHE_MAX_ENTRIES = 2000
+CACHE_POSITIVE_TTL = 90 * 24 * 3600   # places don't move; keep hits for 90 days
+CACHE_NEGATIVE_TTL = 15 * 60          # retry "not found" after 15 minutes
+CACHE_PERSIST_INTERVAL = 30           # seconds between write-behind saves
+BATCH_JOB_MAX_AGE = 3600              # finished batch jobs nobody collected are dropped after this
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity` saved."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Block until a token is available. Returns False if timeout expires first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(provider):
+    """Return the process-wide token bucket for a provider."""
+    with _buckets_lock:
+        if provider not in _buckets:
+            rate, capacity = PROVIDER_RATE_LIMITS.get(provider, (5.0, 5))
+            _buckets[provider] = TokenBucket(rate, capacity)
+        return _buckets[provider]
+
+
+def rate_limit(provider):
+    """Wait for permission to send one request to `provider`."""
+    get_rate_limiter(provider).acquire()
+
+
+def normalize_query(query):
+    """Canonical form of a place/city query (case and whitespace insensitive)."""
+    return " ".join(str(query).split()).casefold()
+
+
+class GeocodingService:
+    """
+    Geocode lookups with in-flight deduplication. Runs on its own thread pool,
+    or as "geocode" jobs on a jobs.JobScheduler when one is given.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, scheduler=None):
+        self._scheduler = scheduler
+        self._executor = None if scheduler else ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="geocode")
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, geocode_fn, query, priority=NORMAL):
+        """
+        Schedule geocode_fn(query) and return its Future. An identical query
+        (same function, same normalized text) already running shares the Future,
+        and is moved up the queue if this caller needs it sooner.
+        """
+        key = (geocode_fn.__name__, normalize_query(query))
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                if self._scheduler:
+                    self._scheduler.promote(future, priority)
+                return future
+            if self._scheduler:
+                future = self._scheduler.submit("geocode", geocode_fn, str(query).strip(), priority=priority)
+            else:
+                future = self._executor.submit(geocode_fn, str(query).strip())
+            self._in_flight[key] = future
+        future.add_done_callback(lambda f, key=key: self._forget(key, f))
+        return future
+
+    def submit_batch(self, geocode_fn, queries, priority=NORMAL):
+        """Schedule many queries at once. Returns {query: Future} in input order."""
+        return {query: self.submit(geocode_fn, query, priority) for query in queries}
+
+    def geocode(self, geocode_fn, query, timeout=None):
+        """Convenience wrapper: submit at interactive priority and wait for the result."""
+        return self.submit(geocode_fn, query, INTERACTIVE).result(timeout=timeout)
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class GeocodeCache:
+    """
+    Thread-safe LRU cache of geocode results keyed by (kind, normalized query).
+    None results are cached too, with the short negative TTL. When save_fn is
+    given, changes are written behind at most every CACHE_PERSIST_INTERVAL seconds,
+    as a "storage" job when a jobs.JobScheduler is given (so no lookup waits on
+    the write).
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, save_fn=None, scheduler=None):
+        self.max_entries = max_entries
+        self._save_fn = save_fn
+        self._scheduler = scheduler
+        self._entries = OrderedDict()  # key -> (value, expires_at), oldest first
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # one save at a time, in queue order
+        self._dirty = False
+        self._last_persist = time.time()
+
+    @staticmethod
+    def _key(kind, query):
+        return f"{kind}:{normalize_query(query)}"
+
+    def get(self, kind, query):
+        """Return (found, value). Expired entries count as missing."""
+        key = self._key(kind, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self._dirty = True
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def put(self, kind, query, value):
+        """Store a result (None = not found) and evict least recently used entries over the cap."""
+        ttl = CACHE_POSITIVE_TTL if value is not None else CACHE_NEGATIVE_TTL
+        key = self._key(kind, query)
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+        self.maybe_persist()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def to_dict(self):
+        """JSON-serializable snapshot (LRU order preserved)."""
+        with self._lock:
+            return {"entries": [[key, value, expires_at] for key, (value, expires_at) in self._entries.items()]}
+
+    def load_dict(self, data):
+        """Restore entries saved by to_dict(), dropping expired ones."""
+        now = time.time()
+        with self._lock:
+            for item in (data or {}).get("entries", []):
+                try:
+                    key, value, expires_at = item
+                except (TypeError, ValueError):
+                    continue
+                if expires_at > now:
+                    self._entries[key] = (value, expires_at)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def maybe_persist(self, force=False):
+        """Save through save_fn if dirty and the persist interval has passed. Returns the job, if one was queued."""
+        if self._save_fn is None:
+            return None
+        with self._lock:
+            if not self._dirty:
+                return None
+            if not force and time.time() - self._last_persist < CACHE_PERSIST_INTERVAL:
+                return None
+            self._dirty = False
+            self._last_persist = time.time()
+        snapshot = self.to_dict()
+        if self._scheduler is None:
+            self._save(snapshot)
+            return None
+        return self._scheduler.submit("storage", self._save, snapshot, priority=PREFETCH)
+
+    def _save(self, snapshot):
+        try:
+            with self._save_lock:
+                self._save_fn(snapshot)
+        except Exception:
+            with self._lock:
+                self._dirty = True
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def shared_geocode_cache(load_fn=None, save_fn=None, scheduler=None):
+    """Process-wide GeocodeCache, created (and loaded via load_fn) on first call."""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                cache = GeocodeCache(save_fn=save_fn, scheduler=scheduler)
+                if load_fn is not None:
+                    try:
+                        cache.load_dict(load_fn())
+                    except Exception:
+                        pass
+                _shared_cache = cache
+    return _shared_cache
+
+
+class BatchGeocodeJob:
+    """
+    A batch of geocode lookups running on a GeocodingService, tracked by item id.
+    The job lives in the process, not the Streamlit session, so it keeps going
+    (and can be picked up again) if the browser disconnects.
+    """
+
+    def __init__(self, futures):
+        self.futures = futures  # {item_id: Future}
+        self.started_at = time.time()
+
+    @property
+    def total(self):
+        return len(self.futures)
+
+    @property
+    def done_count(self):
+        return sum(1 for future in self.futures.values() if future.done())
+
+    def is_done(self):
+        return all(future.done() for future in self.futures.values())
+
+    def results(self):
+        """{item_id: result} for finished lookups that found something."""
+        found = {}
+        for item_id, future in self.futures.items():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                result = future.result()
+                if result:
+                    found[item_id] = result
+        return found
+
+    def cancel(self):
+        for future in self.futures.values():
+            future.cancel()
+
+
+_batch_jobs = {}
+_batch_jobs_lock = threading.Lock()
+
+
+def start_batch_job(name, service, geocode_fn, queries_by_id):
+    """
+    Start (or return the already running) batch job `name`, geocoding
+    queries_by_id = {item_id: query} through `service`.
+    """
+    with _batch_jobs_lock:
+        job = _batch_jobs.get(name)
+        if job is not None and not job.is_done():
+            return job
+        # Jobs of sessions that went away are never collected
+        for stale in [key for key, other in _batch_jobs.items()
+                      if other.is_done() and time.time() - other.started_at > BATCH_JOB_MAX_AGE]:
+            del _batch_jobs[stale]
+        futures = {item_id: service.submit(geocode_fn, query) for item_id, query in queries_by_id.items()}
+        job = BatchGeocodeJob(futures)
+        _batch_jobs[name] = job
+        return job
+
+
+def get_batch_job(name):
+    """Return the batch job registered under `name`, or None."""
+    with _batch_jobs_lock:
+        return _batch_jobs.get(name)
+
+
+def clear_batch_job(name, job=None):
+    """Forget job `name` (only if it is still `job`, when given)."""
+    with _batch_jobs_lock:
+        if name in _batch_jobs and (job is None or _batch_jobs[name] is job):
+            del _batch_jobs[name]
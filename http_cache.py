@@ -0,0 +1,198 @@
+"""
+On-disk HTTP cache for Trip Planner's outbound GETs.
+Responses are stored in a small SQLite file (data/http_cache.sqlite3 by default),
+so they survive process restarts on self-hosted installs. Freshness follows
+Cache-Control (max-age, no-cache, no-store) and Expires unless a per-host TTL
+override applies (for geocoders only to answers that found something; the
+geocode cache keeps its own short-lived "not found" entries); stale entries with an ETag or Last-Modified are revalidated
+with a conditional request. Total size is capped with LRU eviction.
+"""
+import email.utils
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CACHE_PATH = os.getenv("TRIP_HTTP_CACHE_PATH", os.path.join("data", "http_cache.sqlite3"))
+CACHE_ENABLED = os.getenv("TRIP_HTTP_CACHE", "1") != "0"
+MAX_CACHE_BYTES = 50 * 1024 * 1024
+
+# Seconds a response from these hosts stays fresh, whatever their headers say
+HOST_TTL_OVERRIDES = {
+    "nominatim.openstreetmap.org": 30 * 24 * 3600,   # addresses rarely change
+    "geocoding-api.open-meteo.com": 30 * 24 * 3600,
+    "api.open-meteo.com": 15 * 60,                  # models update hourly
+    "api.exchangerate-api.com": 3600,
+    "api.exchangerate.host": 3600,
+}
+# Hosts whose "nothing found" answers (200 with no results) don't get the override
+GEOCODING_HOSTS = {"nominatim.openstreetmap.org", "geocoding-api.open-meteo.com"}
+
+# Headers that describe the wire encoding, not the (already decoded) body we store
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def _parse_cache_control(value):
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') or None
+    return directives
+
+
+def _has_results(host, body):
+    """True if a geocoder's JSON answer found something ([] / {"error": ...} / no "results" didn't)."""
+    try:
+        data = json.loads(body)
+    except (TypeError, ValueError):
+        return False
+    if isinstance(data, dict):
+        if host == "geocoding-api.open-meteo.com":
+            return bool(data.get("results"))
+        return bool(data) and "error" not in data
+    return bool(data)
+
+
+def freshness_lifetime(host, headers, body=None):
+    """
+    Seconds the response stays fresh, or None if it must not be stored.
+    Host overrides win (for GEOCODING_HOSTS only when `body` has results);
+    then s-maxage/max-age, then Expires; otherwise 0 (stored only for
+    revalidation).
+    """
+    directives = _parse_cache_control(headers.get("Cache-Control"))
+    if "no-store" in directives:
+        return None
+    if host in HOST_TTL_OVERRIDES and (host not in GEOCODING_HOSTS or _has_results(host, body)):
+        return HOST_TTL_OVERRIDES[host]
+    if "no-cache" in directives:
+        return 0
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name):
+            try:
+                return max(0, int(directives[name]))
+            except ValueError:
+                pass
+    if headers.get("Expires"):
+        try:
+            expires = email.utils.parsedate_to_datetime(headers["Expires"]).timestamp()
+            return max(0, int(expires - time.time()))
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+class HTTPCache:
+    """SQLite-backed response store with LRU eviction (thread-safe)."""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB,"
+            " expires_at REAL, etag TEXT, last_modified TEXT, size INTEGER, last_access REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+        self._db.commit()
+
+    def get(self, url):
+        """Stored entry for `url` as a dict, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body, expires_at, etag, last_modified FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        status, headers, body, expires_at, etag, last_modified = row
+        return {
+            "status": status, "headers": json.loads(headers), "body": body,
+            "expires_at": expires_at, "etag": etag, "last_modified": last_modified,
+        }
+
+    def put(self, url, response, lifetime):
+        """Store a response that stays fresh for `lifetime` seconds."""
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS}
+        body = response.content
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, response.status_code, json.dumps(headers), body, now + lifetime,
+                 response.headers.get("ETag"), response.headers.get("Last-Modified"), len(body), now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def refresh(self, url, lifetime):
+        """Mark an entry fresh again after a 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE responses SET expires_at = ?, last_access = ? WHERE url = ?", (now + lifetime, now, url)
+            )
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._db.execute("SELECT url, size FROM responses ORDER BY last_access").fetchall():
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": size, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+
+def build_response(url, entry):
+    """Turn a stored entry back into a requests.Response (response.from_cache is True)."""
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response._content = entry["body"]
+    response.url = url
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """Process-wide HTTPCache, or None when disabled (TRIP_HTTP_CACHE=0) or unavailable."""
+    global _cache, CACHE_ENABLED
+    if not CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = HTTPCache()
+            except (OSError, sqlite3.Error):
+                CACHE_ENABLED = False
+                return None
+        return _cache
@@ -0,0 +1,176 @@
+"""
+Outbound HTTP client for Trip Planner.
+Every call to a third-party API (exchange rates, Nominatim, Open-Meteo) goes
+through http_get(), which uses one pooled requests.Session per host: connections
+are kept alive, so repeat calls to the same host skip the TCP/TLS handshake.
+Timeouts, the retry policy (jittered exponential backoff, idempotent GETs only)
+and the User-Agent header are set here and nowhere else. Requests to a
+rate-limited provider are only retried when the connection itself failed:
+urllib3 retries inside session.get(), past the provider's rate limit, so a
+retried 5xx or read timeout would send a second request at once.
+
+Responses go through the on-disk cache in http_cache: fresh hits never touch
+the network (or a provider's rate limit), stale ones are revalidated with
+If-None-Match / If-Modified-Since. Each host has a circuit breaker
+(circuit_breaker.py), so a dead upstream fails in milliseconds instead of
+waiting out timeouts and retries.
+
+Setting TRIP_STANDIN_URL (see standin.py) sends every request to a local
+stand-in server instead of the real host, for offline runs and benchmarks.
+"""
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from circuit_breaker import get_breaker
+from geocoding import rate_limit
+from http_cache import build_response, freshness_lifetime, get_http_cache
+
+# Nominatim's usage policy requires an identifying User-Agent
+USER_AGENT = "USA_Trip_Planner/1.0"
+
+# (connect, read) seconds; connect is just over a TCP retransmit window
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Retry policy for idempotent requests
+RETRY_CONNECT = 2
+RETRY_READ = 1
+RETRY_STATUS = 2
+RETRY_BACKOFF_FACTOR = 0.5     # 0.5 s, 1 s, ... between attempts
+RETRY_BACKOFF_JITTER = 0.3     # plus up to 0.3 s random jitter
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Final statuses that count against a host's circuit breaker
+FAILURE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Connections kept open per host (geocoding/weather worker pools use up to 4 threads)
+POOL_MAXSIZE = 8
+
+# Local stand-in server (standin.py); requests go to <TRIP_STANDIN_URL>/<host>/<path>
+STANDIN_URL = os.getenv("TRIP_STANDIN_URL", "").rstrip("/")
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _build_retry(rate_limited=False):
+    read, status = (0, 0) if rate_limited else (RETRY_READ, RETRY_STATUS)
+    kwargs = dict(
+        total=RETRY_CONNECT + read + status,
+        connect=RETRY_CONNECT,
+        read=read,
+        status=status,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_jitter=RETRY_BACKOFF_JITTER, **kwargs)
+    except TypeError:
+        # urllib3 < 2.0 has no backoff_jitter
+        return Retry(**kwargs)
+
+
+def _build_session(rate_limited=False):
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=_build_retry(rate_limited))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(url, rate_limited=False):
+    """Return the shared keep-alive session for the host of `url` (without read/status retries if rate_limited)."""
+    key = (urlsplit(url).netloc.lower(), rate_limited)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = _build_session(rate_limited)
+        return session
+
+
+def _route(url):
+    """Rewrite `url` to the stand-in server when one is configured."""
+    if not STANDIN_URL:
+        return url
+    parts = urlsplit(url)
+    routed = f"{STANDIN_URL}/{parts.netloc}{parts.path}"
+    return f"{routed}?{parts.query}" if parts.query else routed
+
+
+def _send(session, url, params, headers, timeout, provider):
+    """One network GET, guarded by the host's circuit breaker and the provider's rate limit."""
+    breaker = get_breaker(urlsplit(url).netloc.lower())
+    breaker.before_call()
+    if provider:
+        rate_limit(provider)
+    try:
+        response = session.get(_route(url), params=params, headers=headers, timeout=timeout)
+    except BaseException as e:
+        # Anything that escapes counts, or a half-open probe would never be released
+        breaker.record_failure(e)
+        raise
+    if response.status_code in FAILURE_STATUS_CODES:
+        breaker.record_failure(f"HTTP {response.status_code}")
+    else:
+        breaker.record_success()
+    return response
+
+
+def http_get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, provider=None, cache=True):
+    """
+    GET `url` through the pooled session for its host. Raises requests exceptions on failure
+    (CircuitOpenError at once while the host is marked down).
+    provider names the rate limit (see geocoding.PROVIDER_RATE_LIMITS) to wait on
+    before a request actually goes out; cache=False bypasses the on-disk cache.
+    If the host is down but a stale cached copy exists, that copy is returned.
+    """
+    session = get_session(url, rate_limited=bool(provider))
+    http_cache = get_http_cache() if cache else None
+    if http_cache is None:
+        return _send(session, url, params, headers, timeout, provider)
+
+    full_url = requests.Request("GET", url, params=params).prepare().url
+    entry = http_cache.get(full_url)
+    if entry and entry["expires_at"] > time.time():
+        return build_response(full_url, entry)
+
+    request_headers = dict(headers or {})
+    if entry and entry["etag"]:
+        request_headers["If-None-Match"] = entry["etag"]
+    if entry and entry["last_modified"]:
+        request_headers["If-Modified-Since"] = entry["last_modified"]
+    try:
+        response = _send(session, full_url, None, request_headers, timeout, provider)
+    except requests.exceptions.RequestException:
+        if entry:
+            return build_response(full_url, entry)
+        raise
+    if response.status_code in FAILURE_STATUS_CODES and entry:
+        return build_response(full_url, entry)
+
+    host = urlsplit(full_url).netloc.lower()
+    body = entry["body"] if response.status_code == 304 and entry else response.content
+    lifetime = freshness_lifetime(host, response.headers, body)
+    if response.status_code == 304 and entry:
+        if lifetime is not None:
+            http_cache.refresh(full_url, lifetime)
+        return build_response(full_url, entry)
+    if response.status_code == 200 and lifetime is not None:
+        http_cache.put(full_url, response, lifetime)
+    return response
+
+
+def close_sessions():
+    """Close all pooled connections (e.g. on shutdown or in tests)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
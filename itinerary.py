@@ -0,0 +1,133 @@
+"""
+Itinerary helpers for Trip Planner.
+Works out where the group will be on each trip day from places[].day, hotel
+check-in/check-out ranges and flight dates. Location lookups are passed in
+as functions, so nothing here touches the network or Streamlit.
+"""
+from datetime import datetime, timedelta
+
+
+def parse_day(value):
+    """'YYYY-MM-DD' -> date, or None for empty/invalid values."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def hotel_for_date(hotels, day):
+    """Hotel whose stay covers the night of `day` (check_in <= day < check_out), or None."""
+    for hotel in hotels or []:
+        check_in = parse_day(hotel.get("check_in"))
+        check_out = parse_day(hotel.get("check_out"))
+        if check_in and check_out and check_in <= day < check_out:
+            return hotel
+    return None
+
+
+def day_hotels(hotels, day):
+    """
+    (morning hotel, night hotel) for `day`: where the group wakes up (last
+    night's stay) and where it sleeps. On days with only one of them, both
+    are that hotel; (None, None) when no stay covers the day.
+    """
+    morning = hotel_for_date(hotels, day - timedelta(days=1))
+    night = hotel_for_date(hotels, day)
+    return morning or night, night or morning
+
+
+def hotel_location_text(hotel):
+    """Free-text location used to geocode a hotel (its location field, else its name)."""
+    return (hotel.get("location") or hotel.get("name") or "").strip()
+
+
+def _trip_flights(trip_info):
+    flights = trip_info.get("flights", [])
+    # Old dict format ({"outbound": {...}, "return": {...}}) is still found in some stores
+    if isinstance(flights, dict):
+        flights = [f for f in flights.values() if isinstance(f, dict)]
+    return [f for f in flights if isinstance(f, dict)]
+
+
+def trip_days(places, trip_info):
+    """Sorted dates of places, flights and every day of each hotel stay (check-in to check-out)."""
+    days = {parse_day(p.get("day")) for p in places}
+    for hotel in trip_info.get("hotels", []):
+        check_in = parse_day(hotel.get("check_in"))
+        check_out = parse_day(hotel.get("check_out"))
+        if check_in and check_out and check_in <= check_out:
+            days.update(check_in + timedelta(days=n) for n in range((check_out - check_in).days + 1))
+    for flight in _trip_flights(trip_info):
+        days.add(parse_day(flight.get("date")))
+    return sorted(d for d in days if d is not None)
+
+
+def build_day_index(places, trip_info, resolve_location, city_of=None):
+    """
+    Map each trip date to where the group will be.
+
+    resolve_location(text) -> dict with 'lat'/'lon' (or None) turns hotel and
+    flight locations into coordinates. city_of(lat, lon) -> name (or None)
+    groups and labels the day's places by city.
+
+    Returns {date: [{"name", "lat", "lon", "source"}]} in date order, where
+    source is "places" (centroid of that day's places per city), "flight"
+    (destination on the flight date) or "hotel" (stay covering that night).
+    Days with no known location map to [].
+    """
+    hotels = trip_info.get("hotels", [])
+    flights_by_day = {}
+    for flight in _trip_flights(trip_info):
+        day = parse_day(flight.get("date"))
+        if day and flight.get("to"):
+            flights_by_day.setdefault(day, []).append(flight)
+    places_by_day = {}
+    for place in places:
+        day = parse_day(place.get("day"))
+        if day and place.get("lat") is not None and place.get("lon") is not None:
+            places_by_day.setdefault(day, []).append(place)
+
+    index = {}
+    for day in trip_days(places, trip_info):
+        locations = []
+        if day in places_by_day:
+            groups = {}
+            for place in places_by_day[day]:
+                name = (city_of(place["lat"], place["lon"]) if city_of else None) or place.get("name", "Unknown")
+                groups.setdefault(name, []).append(place)
+            for name, group in groups.items():
+                locations.append({
+                    "name": name,
+                    "lat": sum(p["lat"] for p in group) / len(group),
+                    "lon": sum(p["lon"] for p in group) / len(group),
+                    "source": "places",
+                })
+        if not locations:
+            for flight in flights_by_day.get(day, []):
+                resolved = resolve_location(flight["to"])
+                if resolved:
+                    locations.append({"name": flight["to"], "lat": resolved["lat"], "lon": resolved["lon"], "source": "flight"})
+        if not locations:
+            # The night's hotel, or on check-out morning the hotel being left
+            hotel = hotel_for_date(hotels, day) or next(
+                (h for h in hotels if parse_day(h.get("check_out")) == day), None
+            )
+            resolved = resolve_location(hotel_location_text(hotel)) if hotel else None
+            if resolved:
+                label = hotel.get("name", "")
+                if hotel.get("location") and hotel["location"] != label:
+                    label = f"{label} ({hotel['location']})"
+                locations.append({"name": label, "lat": resolved["lat"], "lon": resolved["lon"], "source": "hotel"})
+        index[day] = locations
+    return index
+
+
+def unresolved_location_texts(trip_info, resolve_location):
+    """Hotel/flight location texts that resolve_location() can't place yet."""
+    texts = [hotel_location_text(h) for h in trip_info.get("hotels", [])]
+    texts += [f.get("to", "") for f in _trip_flights(trip_info)]
+    missing = []
+    for text in texts:
+        if text and text not in missing and not resolve_location(text):
+            missing.append(text)
+    return missing
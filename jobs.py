@@ -0,0 +1,205 @@
+"""
+Background job scheduler for Trip Planner.
+Slow work (geocoding, forecast refreshes, rate fetching, ...) is queued here
+instead of running in the Streamlit script thread. One bounded pool of worker
+threads serves the whole process; jobs run in priority order (INTERACTIVE
+before NORMAL before PREFETCH), and each job kind can be capped so that, say,
+a batch of geocodes never occupies every worker.
+
+submit() returns a Job, which is a concurrent.futures.Future: pages poll
+done()/result() on later reruns (or from an st.fragment) instead of waiting.
+Queued jobs can be cancelled; running ones finish normally.
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+INTERACTIVE = 0   # the user is waiting on this rerun
+NORMAL = 1        # user-started background work (batch geocoding, refresh buttons)
+PREFETCH = 2      # speculative work nobody is waiting for yet
+
+DEFAULT_WORKERS = 6
+# Max jobs of one kind running at once; kinds not listed are limited only by the pool
+DEFAULT_KIND_LIMITS = {
+    "geocode": 2,     # Nominatim allows 1 req/s anyway
+    "forecast": 2,
+    "rates": 1,
+    "tiles": 1,       # map tile prefetch; rate-limited upstream, one area at a time
+}
+FINISHED_JOBS_KEPT = 100
+
+
+class Job(Future):
+    """A queued call with a kind and priority (a Future, so done()/result()/cancel() work)."""
+
+    def __init__(self, job_id, kind, priority, fn, args, kwargs):
+        super().__init__()
+        self.id = job_id
+        self.kind = kind
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def state(self):
+        if self.cancelled():
+            return "cancelled"
+        if not self.done():
+            return "running" if self.started_at else "queued"
+        return "failed" if self.exception() is not None else "done"
+
+    def status(self):
+        error = self.exception() if self.done() and not self.cancelled() else None
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "priority": self.priority,
+            "state": self.state,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": str(error) if error else None,
+        }
+
+
+class JobScheduler:
+    """Priority queue served by a fixed pool of daemon worker threads."""
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, kind_limits=None):
+        self.max_workers = max_workers
+        self.kind_limits = dict(DEFAULT_KIND_LIMITS if kind_limits is None else kind_limits)
+        self._queue = []            # heap of (priority, seq, job)
+        self._running = {}          # job id -> job
+        self._finished = deque(maxlen=FINISHED_JOBS_KEPT)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"jobs-{n}", daemon=True) for n in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, kind, fn, *args, priority=NORMAL, **kwargs):
+        """Queue fn(*args, **kwargs) as a job of `kind` and return its Job."""
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("scheduler has been shut down")
+            seq = next(self._seq)
+            job = Job(seq, kind, priority, fn, args, kwargs)
+            heapq.heappush(self._queue, (priority, seq, job))
+            self._cond.notify()
+        return job
+
+    def promote(self, job, priority):
+        """Raise a queued job's priority (e.g. a prefetch the user is now waiting for)."""
+        with self._cond:
+            if priority >= job.priority or job.started_at is not None:
+                return
+            for n, (_, seq, queued) in enumerate(self._queue):
+                if queued is job:
+                    job.priority = priority
+                    self._queue[n] = (priority, seq, job)
+                    heapq.heapify(self._queue)
+                    self._cond.notify()
+                    return
+
+    def cancel_kind(self, kind):
+        """Cancel every queued job of `kind`. Returns how many were cancelled."""
+        with self._cond:
+            jobs = [job for _, _, job in self._queue if job.kind == kind]
+        return sum(1 for job in jobs if job.cancel())
+
+    def _running_count(self, kind):
+        return sum(1 for job in self._running.values() if job.kind == kind)
+
+    def _next_job(self):
+        """Block until a job may start; return it (None on shutdown)."""
+        with self._cond:
+            while True:
+                if self._shutdown:
+                    return None
+                skipped = []
+                job = None
+                while self._queue:
+                    entry = heapq.heappop(self._queue)
+                    candidate = entry[2]
+                    if candidate.cancelled():
+                        self._finished.append(candidate)
+                        continue
+                    limit = self.kind_limits.get(candidate.kind)
+                    if limit is not None and self._running_count(candidate.kind) >= limit:
+                        skipped.append(entry)
+                        continue
+                    job = candidate
+                    break
+                for entry in skipped:
+                    heapq.heappush(self._queue, entry)
+                if job is not None:
+                    job.started_at = time.time()
+                    self._running[job.id] = job
+                    return job
+                self._cond.wait()
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            if job.set_running_or_notify_cancel():
+                try:
+                    job.set_result(job.fn(*job.args, **job.kwargs))
+                except BaseException as e:
+                    job.set_exception(e)
+            job.finished_at = time.time()
+            with self._cond:
+                self._running.pop(job.id, None)
+                self._finished.append(job)
+                # A slot for this kind is free again: let waiting workers rescan
+                self._cond.notify_all()
+
+    def status(self):
+        """Counts per kind: {"workers", "queued", "running", "kinds": {kind: {"queued", "running", "limit"}}}."""
+        with self._cond:
+            queued = [job for _, _, job in self._queue if not job.cancelled()]
+            running = list(self._running.values())
+        kinds = {}
+        for job in queued + running:
+            counts = kinds.setdefault(job.kind, {"queued": 0, "running": 0, "limit": self.kind_limits.get(job.kind)})
+            counts["running" if job in running else "queued"] += 1
+        return {"workers": self.max_workers, "queued": len(queued), "running": len(running), "kinds": kinds}
+
+    def jobs(self, kind=None):
+        """Status dicts of running, queued and recently finished jobs (optionally of one kind)."""
+        with self._cond:
+            all_jobs = list(self._running.values()) + [job for _, _, job in sorted(self._queue)] + list(self._finished)
+        return [job.status() for job in all_jobs if kind is None or job.kind == kind]
+
+    def shutdown(self):
+        """Cancel queued jobs and stop the workers once running jobs finish."""
+        with self._cond:
+            self._shutdown = True
+            for _, _, job in self._queue:
+                job.cancel()
+            self._queue.clear()
+            self._cond.notify_all()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide JobScheduler, started on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = JobScheduler()
+        return _scheduler
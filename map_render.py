@@ -0,0 +1,36 @@
+"""
+Memoized map rendering for Trip Planner.
+Rendering a folium map to HTML/JS is most of a rerun's time for a few hundred
+markers. cached_folium_map() renders a map once per caller-chosen key, keeps
+the finished HTML document in a per-session dict and shows it in an iframe
+(st.iframe, or components.html() on Streamlit versions without it), so reruns
+with the same key neither build nor render the map.
+
+The map is shown as a self-contained page (panning, zooming, popups and layer
+control all run in the browser); unlike st_folium(), nothing is sent back to
+the script. Maps whose interaction data is needed (e.g. the viewport-loaded
+map) go through st_folium() instead.
+"""
+import streamlit as st
+import streamlit.components.v1 as components
+
+# Rendered maps kept per cache dict (one per session); each is a few hundred KB
+MAX_CACHED_MAPS = 4
+
+
+def cached_folium_map(cache, cache_key, build_map, height=600):
+    """
+    Show the map returned by build_map(), building and rendering it only when
+    cache_key isn't in `cache` (a dict, e.g. kept in st.session_state).
+    cache_key must cover everything the map shows.
+    """
+    html = cache.pop(cache_key, None)
+    if html is None:
+        html = build_map().get_root().render()
+    cache[cache_key] = html  # most recently used goes last
+    while len(cache) > MAX_CACHED_MAPS:
+        cache.pop(next(iter(cache)))
+    if hasattr(st, "iframe"):
+        st.iframe(html, height=height)
+    else:
+        components.html(html, height=height)
@@ -0,0 +1,138 @@
+"""
+Offline reverse geocoder for Trip Planner.
+Resolves coordinates to a US city/town using the bundled us_cities.csv
+(GeoNames-style columns: name, admin1, lat, lon, population), loaded lazily
+into a grid index on first use. No network access is needed; callers fall
+back to Nominatim when no city lies within MAX_DISTANCE_KM.
+lookup_city() does the reverse (city name -> coordinates) from the same table.
+
+Run `python offline_geocoder.py` to print load time and memory footprint.
+"""
+import csv
+import math
+import os
+import sys
+import threading
+import time
+
+from spatial import GridIndex
+
+CITIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "us_cities.csv")
+
+# Places further than this from every bundled city are left to the online lookup
+MAX_DISTANCE_KM = 30.0
+# Smallest radius assumed for a town when ranking candidates (see _city_radius_km)
+MIN_CITY_RADIUS_KM = 2.0
+
+_index = None
+_names = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def _city_radius_km(population):
+    """Rough city radius from population (~3000 people per km²)."""
+    return max(MIN_CITY_RADIUS_KM, math.sqrt(max(population, 0)) / 100.0)
+
+
+def _load_index():
+    """Read the bundled CSV into a GridIndex and record load statistics."""
+    started = time.perf_counter()
+    index = GridIndex(cell_deg=0.5)
+    approx_bytes = 0
+    with open(CITIES_FILE, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                lat = float(row["lat"])
+                lon = float(row["lon"])
+                population = int(row.get("population") or 0)
+            except (KeyError, TypeError, ValueError):
+                continue
+            city = {
+                "name": row["name"],
+                "admin1": row.get("admin1", ""),
+                "lat": lat,
+                "lon": lon,
+                "radius_km": _city_radius_km(population),
+                "population": population,
+            }
+            index.insert(lat, lon, city)
+            _names.setdefault(city["name"].casefold(), []).append(city)
+            approx_bytes += sys.getsizeof(city) + sum(sys.getsizeof(v) for v in city.values())
+    _stats.update({
+        "cities": len(index),
+        "load_seconds": time.perf_counter() - started,
+        "approx_bytes": approx_bytes,
+    })
+    return index
+
+
+def get_index():
+    """Return the city index, loading it on first use (thread-safe)."""
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = _load_index()
+    return _index
+
+
+def reverse_geocode(lat, lon, max_distance_km=MAX_DISTANCE_KM):
+    """
+    Return the city containing (lat, lon) as a dict with 'name', 'admin1',
+    'lat', 'lon' and 'distance_km', or None when no city is close enough.
+    Candidates are ranked by distance relative to city size, so a point in
+    Hollywood resolves to Los Angeles rather than the nearer West Hollywood centroid.
+    """
+    try:
+        candidates = get_index().query_radius(float(lat), float(lon), max_distance_km)
+    except (OSError, TypeError, ValueError):
+        return None
+    if not candidates:
+        return None
+    dist, city = min(candidates, key=lambda pair: pair[0] / pair[1]["radius_km"])
+    return {
+        "name": city["name"],
+        "admin1": city["admin1"],
+        "lat": city["lat"],
+        "lon": city["lon"],
+        "distance_km": round(dist, 2),
+    }
+
+
+def lookup_city(text):
+    """
+    Coordinates for a bundled city named in `text` ("Las Vegas", "Glendale, AZ",
+    "Las Vegas, NV, USA"), as a dict with 'name', 'admin1', 'lat', 'lon'; None if unknown.
+    Ambiguous names without a state resolve to the most populous city.
+    """
+    parts = [part.strip() for part in str(text or "").split(",") if part.strip()]
+    if not parts:
+        return None
+    get_index()
+    candidates = _names.get(parts[0].casefold(), [])
+    if len(parts) > 1:
+        state = parts[1].upper()
+        candidates = [c for c in candidates if c["admin1"] == state] or candidates
+    if not candidates:
+        return None
+    city = max(candidates, key=lambda c: c["population"])
+    return {"name": city["name"], "admin1": city["admin1"], "lat": city["lat"], "lon": city["lon"]}
+
+
+def index_stats():
+    """Load time and approximate memory of the index ({} until first use)."""
+    return dict(_stats)
+
+
+if __name__ == "__main__":
+    get_index()
+    stats = index_stats()
+    print(f"cities: {stats['cities']}")
+    print(f"load time: {stats['load_seconds'] * 1000:.1f} ms")
+    print(f"approx memory: {stats['approx_bytes'] / 1024:.1f} KiB")
+    samples = [(34.1016, -118.3269), (36.1215, -115.1739), (36.1069, -112.1129), (33.8153, -116.6200)]
+    started = time.perf_counter()
+    for lat, lon in samples:
+        print(f"({lat}, {lon}) -> {reverse_geocode(lat, lon)}")
+    print(f"lookup: {(time.perf_counter() - started) / len(samples) * 1e6:.0f} µs/place (incl. print)")
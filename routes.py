@@ -0,0 +1,456 @@
+"""
+Distance engine for Trip Planner's routes page.
+All pairwise great-circle distances between places are computed at once with
+NumPy broadcasting into one DistanceMatrix (miles), instead of calling a
+scalar haversine from Python loops. Route building, nearest-place lookups and
+route lengths all read from that matrix. When a place moves only its row and
+column are recomputed.
+
+optimize_route() orders a day's stops: a greedy nearest-neighbour route,
+improved with 2-opt (reverse a stretch) and Or-opt (move a run of 1-3 stops)
+until no move helps or the time budget runs out. The first and/or last stop
+can be fixed, and routes can be open or return to the start. Days with up
+to EXACT_MAX_STOPS stops (most of them) are solved exactly instead, with the
+Held-Karp dynamic program.
+
+float32 matrices take half the memory (a 5000-place matrix is 100 MB instead
+of 200 MB) and stay accurate to well under 0.1 mile at trip scale.
+
+Benchmarks:
+    python routes.py
+"""
+import time
+
+import numpy as np
+
+EARTH_RADIUS_MILES = 3959.0
+
+DEFAULT_TIME_BUDGET = 0.5        # seconds of 2-opt/Or-opt after the greedy route
+# Up to this many stops routes are solved exactly: `python routes.py` shows
+# 20-45 ms at 15 stops, doubling with each extra stop (2-opt stays ~5 ms)
+EXACT_MAX_STOPS = 15
+GREEDY_ALL_STARTS_MAX = 200      # with a free start, try every stop up to this many
+OR_OPT_SEGMENT_LENGTHS = (1, 2, 3)
+IMPROVEMENT_EPSILON = 1e-9
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in miles between points given in radians; arrays
+    broadcast, so column vs row vectors give a full pairwise matrix.
+    """
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _radians(points, dtype):
+    """(n, 2) array of (lat, lon) in radians."""
+    return np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2)).astype(dtype)
+
+
+def _pairwise(rad):
+    """(n, n) distances between all rows of a radians array."""
+    lat, lon = rad[:, 0], rad[:, 1]
+    return haversine_miles(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+
+
+def leg_distances(points):
+    """Miles between consecutive (lat, lon) points, as an array of len(points) - 1."""
+    rad = _radians(points, np.float64)
+    return haversine_miles(rad[:-1, 0], rad[:-1, 1], rad[1:, 0], rad[1:, 1])
+
+
+def route_length(dist, order, closed=False):
+    """Length of the route visiting rows of `dist` in `order` (back to the start if closed)."""
+    order = np.asarray(order, dtype=np.intp)
+    if len(order) < 2:
+        return 0.0
+    total = dist[order[:-1], order[1:]].sum()
+    if closed:
+        total += dist[order[-1], order[0]]
+    return float(total)
+
+
+def nearest_neighbour_order(dist, start=0):
+    """Greedy tour over all rows of `dist`: from `start`, always go to the closest unvisited stop."""
+    n = len(dist)
+    visited = np.zeros(n, dtype=bool)
+    order = [start]
+    visited[start] = True
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, dist[order[-1]])
+        nxt = int(np.argmin(row))
+        order.append(nxt)
+        visited[nxt] = True
+    return order
+
+
+def _greedy_path(dist, start, end=None):
+    """Nearest-neighbour path from `start` through every row, finishing at `end` when given."""
+    if end is None or end == start:
+        return nearest_neighbour_order(dist, start)
+    n = len(dist)
+    visited = np.zeros(n, dtype=bool)
+    visited[[start, end]] = True
+    order = [start]
+    for _ in range(n - 2):
+        row = np.where(visited, np.inf, dist[order[-1]])
+        nxt = int(np.argmin(row))
+        order.append(nxt)
+        visited[nxt] = True
+    return order + [end]
+
+
+def initial_route(dist, start=None, end=None, closed=False):
+    """
+    Greedy starting route for the optimizer. A free start tries every stop
+    (up to GREEDY_ALL_STARTS_MAX of them) and keeps the shortest result.
+    """
+    n = len(dist)
+    if start is None and end is not None and not closed:
+        return _greedy_path(dist, end)[::-1]
+    if start is not None:
+        return _greedy_path(dist, start, None if closed else end)
+    starts = range(n) if n <= GREEDY_ALL_STARTS_MAX else [0]
+    return min((nearest_neighbour_order(dist, s) for s in starts), key=lambda o: route_length(dist, o, closed))
+
+
+def _two_opt_pass(dist, tour, deadline):
+    """
+    One pass of 2-opt over a closed tour whose first stop stays in place:
+    for each edge, apply the best reversal it takes part in. Returns moves made.
+    """
+    n = len(tour)
+    moves = 0
+    for i in range(n - 2):
+        if time.perf_counter() > deadline:
+            break
+        a, b = tour[i], tour[i + 1]
+        c = tour[i + 2:]
+        d = np.append(tour[i + 3:], tour[0])
+        delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+        j = int(np.argmin(delta))
+        if delta[j] < -IMPROVEMENT_EPSILON:
+            tour[i + 1:i + 3 + j] = tour[i + 1:i + 3 + j][::-1]
+            moves += 1
+    return moves
+
+
+def _or_opt_pass(dist, tour, deadline):
+    """
+    One pass of Or-opt: move runs of 1-3 consecutive stops (possibly reversed)
+    to the best other place in the tour. The first stop stays in place.
+    """
+    n = len(tour)
+    moves = 0
+    for length in OR_OPT_SEGMENT_LENGTHS:
+        i = 1
+        while i + length <= n:
+            if time.perf_counter() > deadline:
+                return moves
+            segment = tour[i:i + length]
+            prev, nxt = tour[i - 1], tour[(i + length) % n]
+            first, last = segment[0], segment[-1]
+            removed_gain = dist[prev, first] + dist[last, nxt] - dist[prev, nxt]
+            rest = np.concatenate([tour[:i], tour[i + length:]])
+            x, y = rest, np.roll(rest, -1)
+            base = dist[x, y]
+            forward = dist[x, first] + dist[last, y] - base
+            backward = dist[x, last] + dist[first, y] - base
+            k_fwd, k_bwd = int(np.argmin(forward)), int(np.argmin(backward))
+            reverse = backward[k_bwd] < forward[k_fwd]
+            k = k_bwd if reverse else k_fwd
+            if min(forward[k_fwd], backward[k_bwd]) - removed_gain < -IMPROVEMENT_EPSILON:
+                moved = segment[::-1] if reverse else segment
+                tour[:] = np.concatenate([rest[:k + 1], moved, rest[k + 1:]])
+                moves += 1
+            else:
+                i += 1
+    return moves
+
+
+def improve_route(dist, order, start=None, end=None, closed=False, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Improve `order` with 2-opt and Or-opt moves until no move helps or
+    time_budget seconds pass. A fixed start/end stays in place; open routes
+    are handled as closed tours through a dummy stop that links the two ends;
+    end == start means a closed route. Returns (order, moves).
+    """
+    if end is not None and end == start:
+        closed, end = True, None
+    n = len(order)
+    if n < (4 if closed else 3):
+        return list(order), 0
+    deadline = time.perf_counter() + time_budget
+    if closed:
+        work = np.asarray(dist, dtype=np.float64)
+        tour = np.asarray(order, dtype=np.intp)
+    else:
+        # Dummy stop n links the two ends: free to any stop, or only cheap to a fixed
+        # end; `big` outweighs any 2-opt/Or-opt change (at most three edges)
+        big = 4.0 * float(np.max(dist)) + 1.0
+        work = np.zeros((n + 1, n + 1))
+        work[:n, :n] = dist
+        link = np.zeros(n) if start is None and end is None else np.full(n, big)
+        for fixed in (start, end):
+            if fixed is not None:
+                link[fixed] = 0.0
+        work[n, :n] = work[:n, n] = link
+        tour = np.asarray([n] + list(order), dtype=np.intp)
+    moves = 0
+    while time.perf_counter() < deadline:
+        improved = _two_opt_pass(work, tour, deadline) + _or_opt_pass(work, tour, deadline)
+        moves += improved
+        if not improved:
+            break
+    order = [int(stop) for stop in tour]
+    if not closed:
+        order = order[1:]
+        if (start is not None and order[0] != start) or (start is None and end is not None and order[-1] != end):
+            order.reverse()
+    return order, moves
+
+
+def _held_karp_from(dist, start, end=None, closed=False):
+    """
+    Exact shortest route from `start` through every row of `dist`: ending at
+    `end` (any stop if None), or back at `start` when closed. Bitmask DP over
+    subsets of the other stops; each (subset size, last stop) layer is one
+    NumPy operation over all subsets of that size.
+    """
+    n = len(dist)
+    others = [i for i in range(n) if i != start]
+    m = len(others)
+    if m == 0:
+        return [start]
+    inner = dist[np.ix_(others, others)]
+    full = (1 << m) - 1
+    cost = np.full((1 << m, m), np.inf)
+    parent = np.full((1 << m, m), -1, dtype=np.int8)
+    singles = 1 << np.arange(m)
+    cost[singles, np.arange(m)] = dist[start, others]
+    masks = np.arange(1 << m)
+    sizes = np.zeros(1 << m, dtype=np.int8)
+    for bit in range(m):
+        sizes += (masks >> bit) & 1
+    for size in range(2, m + 1):
+        layer = masks[sizes == size]
+        for j in range(m):
+            with_j = layer[(layer >> j) & 1 == 1]
+            candidates = cost[with_j ^ (1 << j)] + inner[:, j]
+            best = np.argmin(candidates, axis=1)
+            cost[with_j, j] = candidates[np.arange(len(with_j)), best]
+            parent[with_j, j] = best
+    if closed:
+        last = int(np.argmin(cost[full] + dist[others, start]))
+    elif end is not None:
+        last = others.index(end)
+    else:
+        last = int(np.argmin(cost[full]))
+    order = []
+    mask = full
+    while last >= 0:
+        order.append(others[last])
+        mask, last = mask ^ (1 << last), int(parent[mask, last])
+    return [start] + order[::-1]
+
+
+def exact_route(dist, start=None, end=None, closed=False):
+    """
+    Shortest possible route (Held-Karp), with the same start/end/closed rules
+    as optimize_route(). Time and memory grow as 2^n * n^2, so keep n small
+    (see EXACT_MAX_STOPS).
+    """
+    if end is not None and end == start:
+        closed, end = True, None
+    dist = np.asarray(dist, dtype=np.float64)
+    n = len(dist)
+    if closed:
+        return _held_karp_from(dist, 0 if start is None else start, closed=True)
+    if start is not None:
+        return _held_karp_from(dist, start, end)
+    if end is not None:
+        return _held_karp_from(dist, end)[::-1]
+    # Free ends: start from a dummy stop that is zero miles from everywhere
+    padded = np.zeros((n + 1, n + 1))
+    padded[:n, :n] = dist
+    return _held_karp_from(padded, n)[1:]
+
+
+def optimize_route(dist, start=None, end=None, closed=False, time_budget=DEFAULT_TIME_BUDGET,
+                   exact_max_stops=EXACT_MAX_STOPS):
+    """
+    Short route through every row of `dist`: the exact optimum for up to
+    exact_max_stops stops, otherwise greedy nearest-neighbour improved with
+    2-opt/Or-opt within time_budget seconds. start/end fix the first/last
+    stop; closed routes (or end == start) return to the start (end is
+    ignored). Returns a dict with the order, its length, the greedy length
+    and the saving.
+    """
+    begun = time.perf_counter()
+    if end is not None and end == start:
+        closed, end = True, None
+    if closed and start is None:
+        start = 0
+    greedy = initial_route(dist, start, end, closed)
+    if len(dist) <= exact_max_stops:
+        order, moves, method = exact_route(dist, start, end, closed), 0, "exact"
+    else:
+        order, moves = improve_route(dist, greedy, start, end, closed, time_budget)
+        method = "2-opt/Or-opt"
+    initial_length = route_length(dist, greedy, closed)
+    length = route_length(dist, order, closed)
+    return {
+        "order": order,
+        "length": length,
+        "initial_length": initial_length,
+        "saved": initial_length - length,
+        "saved_pct": 100.0 * (initial_length - length) / initial_length if initial_length else 0.0,
+        "moves": moves,
+        "method": method,
+        "seconds": time.perf_counter() - begun,
+    }
+
+
+class DistanceMatrix:
+    """
+    Pairwise distances (miles) between points. `ids` (e.g. place ids) map to
+    rows through .index; .miles is the (n, n) array itself.
+    """
+
+    def __init__(self, points, ids=None, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self._rad = _radians(points, self.dtype)
+        self.ids = list(ids) if ids is not None else list(range(len(self._rad)))
+        self.index = {item: row for row, item in enumerate(self.ids)}
+        self.miles = _pairwise(self._rad).astype(self.dtype, copy=False)
+
+    @classmethod
+    def from_places(cls, places, dtype=np.float64):
+        """Matrix over places with 'lat'/'lon', rows keyed by place id."""
+        return cls([(p["lat"], p["lon"]) for p in places], ids=[p.get("id") for p in places], dtype=dtype)
+
+    def __len__(self):
+        return len(self._rad)
+
+    def sub(self, rows):
+        """Distances among the given rows only, as a new (k, k) array."""
+        rows = np.asarray(rows, dtype=np.intp)
+        return self.miles[np.ix_(rows, rows)]
+
+    def distances_from(self, lat, lon):
+        """Miles from (lat, lon) in degrees to every row."""
+        p_lat, p_lon = np.radians([lat, lon]).astype(self.dtype)
+        return haversine_miles(p_lat, p_lon, self._rad[:, 0], self._rad[:, 1])
+
+    def update(self, row, lat, lon):
+        """A point moved: recompute its row and column only (O(n))."""
+        self._rad[row] = np.radians([lat, lon]).astype(self.dtype)
+        distances = haversine_miles(self._rad[row, 0], self._rad[row, 1], self._rad[:, 0], self._rad[:, 1])
+        self.miles[row, :] = distances
+        self.miles[:, row] = distances
+        self.miles[row, row] = 0
+
+    def sync(self, points):
+        """
+        Bring the matrix up to date with `points` (same rows, possibly moved)
+        and return how many rows changed. Rows are updated one by one while
+        that is cheaper than a rebuild.
+        """
+        rad = _radians(points, self.dtype)
+        moved = np.flatnonzero(np.any(rad != self._rad, axis=1))
+        if len(moved) > len(self) // 4:
+            self._rad = rad
+            self.miles = _pairwise(rad).astype(self.dtype, copy=False)
+        else:
+            points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+            for row in moved:
+                self.update(row, points[row, 0], points[row, 1])
+        return len(moved)
+
+    def nearest(self, row, k=5, among=None):
+        """[(row, miles), ...] of the k rows closest to `row` (optionally only rows in `among`)."""
+        candidates = np.arange(len(self)) if among is None else np.asarray(among, dtype=np.intp)
+        candidates = candidates[candidates != row]
+        distances = self.miles[row, candidates]
+        best = np.argsort(distances, kind="stable")[:k]
+        return [(int(candidates[i]), float(distances[i])) for i in best]
+
+
+def _benchmark_matrix():
+    """Pairwise matrix: scalar Python haversine vs NumPy, float64 vs float32."""
+    import math
+
+    def scalar(lat1, lon1, lat2, lon2):
+        dlat = math.radians(lat2 - lat1)
+        dlon = math.radians(lon2 - lon1)
+        a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+        return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+    rng = np.random.default_rng(0)
+    print("distance matrix (ms)")
+    print(f"{'n':>6} {'python':>10} {'numpy64':>10} {'numpy32':>10} {'update':>10}")
+    for n in (10, 50, 200, 1000, 3000):
+        points = np.column_stack([rng.uniform(32, 37, n), rng.uniform(-120, -114, n)])
+        python_ms = float("nan")
+        if n <= 200:
+            start = time.perf_counter()
+            [[scalar(a[0], a[1], b[0], b[1]) for b in points] for a in points]
+            python_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        matrix = DistanceMatrix(points)
+        numpy64_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        DistanceMatrix(points, dtype=np.float32)
+        numpy32_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        matrix.update(0, 34.0, -118.0)
+        update_ms = (time.perf_counter() - start) * 1000
+        print(f"{n:>6} {python_ms:>10.2f} {numpy64_ms:>10.2f} {numpy32_ms:>10.2f} {update_ms:>10.3f}")
+
+
+def _benchmark_optimizer():
+    """Greedy vs 2-opt/Or-opt route length (open route from stop 0) and time."""
+    rng = np.random.default_rng(1)
+    print("route optimizer, average of 5 random sets of stops")
+    print(f"{'n':>6} {'saved %':>10} {'moves':>8} {'ms':>10}")
+    for n in (10, 25, 50, 100, 200):
+        saved, moves, ms = [], [], []
+        for _ in range(5):
+            points = np.column_stack([rng.uniform(32, 37, n), rng.uniform(-120, -114, n)])
+            result = optimize_route(DistanceMatrix(points).miles, start=0, time_budget=2.0, exact_max_stops=0)
+            saved.append(result["saved_pct"])
+            moves.append(result["moves"])
+            ms.append(result["seconds"] * 1000)
+        print(f"{n:>6} {np.mean(saved):>10.1f} {np.mean(moves):>8.1f} {np.mean(ms):>10.1f}")
+
+
+def _benchmark_exact():
+    """Held-Karp solve time vs n (open route, fixed start / free ends) and how far 2-opt/Or-opt falls short."""
+    rng = np.random.default_rng(2)
+    print("exact solver (ms) vs heuristic, average of 3 random sets of stops")
+    print(f"{'n':>6} {'exact':>10} {'free ends':>10} {'heuristic':>10} {'gap %':>8}")
+    for n in range(4, 18):
+        exact_ms, free_ms, heuristic_ms, gaps = [], [], [], []
+        for _ in range(3):
+            dist = DistanceMatrix(np.column_stack([rng.uniform(32, 37, n), rng.uniform(-120, -114, n)])).miles
+            start = time.perf_counter()
+            optimum = route_length(dist, exact_route(dist, start=0))
+            exact_ms.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            exact_route(dist)
+            free_ms.append((time.perf_counter() - start) * 1000)
+            result = optimize_route(dist, start=0, exact_max_stops=0)
+            heuristic_ms.append(result["seconds"] * 1000)
+            gaps.append(100.0 * (result["length"] - optimum) / optimum)
+        print(f"{n:>6} {np.mean(exact_ms):>10.1f} {np.mean(free_ms):>10.1f} {np.mean(heuristic_ms):>10.1f} {np.mean(gaps):>8.2f}")
+
+
+if __name__ == "__main__":
+    _benchmark_matrix()
+    print()
+    _benchmark_optimizer()
+    print()
+    _benchmark_exact()
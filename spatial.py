@@ -0,0 +1,69 @@
+"""
+Spatial helpers for Trip Planner.
+A uniform lat/lon grid index for fast "what is near this point" lookups
+(pure Python, no extra dependencies).
+"""
+import math
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.2
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres."""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+class GridIndex:
+    """
+    Buckets points into square lat/lon cells of `cell_deg` degrees.
+    Lookups only scan the cells overlapping the query area, so cost depends
+    on how many points are nearby, not on the total number of points.
+    """
+
+    def __init__(self, cell_deg=0.5):
+        self.cell_deg = cell_deg
+        self._cells = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _cell(self, lat, lon):
+        return (int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg)))
+
+    def insert(self, lat, lon, item):
+        """Add a point with an arbitrary payload."""
+        self._cells.setdefault(self._cell(lat, lon), []).append((lat, lon, item))
+        self._count += 1
+
+    def query_bbox(self, south, west, north, east):
+        """Return (lat, lon, item) tuples inside the bounding box."""
+        row_min, col_min = self._cell(south, west)
+        row_max, col_max = self._cell(north, east)
+        if (row_max - row_min + 1) * (col_max - col_min + 1) > len(self._cells):
+            # Box covers more cells than are occupied (e.g. zoomed far out): scan occupied cells
+            keys = [k for k in self._cells if row_min <= k[0] <= row_max and col_min <= k[1] <= col_max]
+        else:
+            keys = [(row, col) for row in range(row_min, row_max + 1) for col in range(col_min, col_max + 1)]
+        found = []
+        for key in keys:
+            for lat, lon, item in self._cells.get(key, ()):
+                if south <= lat <= north and west <= lon <= east:
+                    found.append((lat, lon, item))
+        return found
+
+    def query_radius(self, lat, lon, radius_km):
+        """Return (distance_km, item) pairs within radius_km, nearest first."""
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        dlon = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        found = []
+        for p_lat, p_lon, item in self.query_bbox(lat - dlat, lon - dlon, lat + dlat, lon + dlon):
+            dist = haversine_km(lat, lon, p_lat, p_lon)
+            if dist <= radius_km:
+                found.append((dist, item))
+        found.sort(key=lambda pair: pair[0])
+        return found
@@ -0,0 +1,418 @@
+"""
+Local stand-in server for Trip Planner's network dependencies.
+Lets the geocoding, weather, exchange-rate and Supabase code paths run (and be
+benchmarked) on a machine without internet access. One stdlib HTTP server
+answers for every provider; requests are routed by the real host name as the
+first path segment, e.g. /nominatim.openstreetmap.org/search?q=...
+
+For each request it, in order:
+  1. replays a recorded fixture (fixtures/<host>/<hash>.json) if there is one,
+  2. with --record, forwards to the real host and saves the answer as a fixture,
+  3. otherwise answers with deterministic synthetic data (offline city index,
+     generated forecasts and rates), unless --strict is given.
+
+/supabase/rest/v1/app_data is a minimal PostgREST-compatible table (select by
+key, upsert), kept in memory or in --db-file.
+
+Latency and failures can be injected globally from the command line, or per
+host at runtime: POST /_standin/faults {"host": ..., "latency_ms": ...,
+"jitter_ms": ..., "fail_rate": ..., "fail_status": ..., "hang_rate": ...}.
+GET /_standin/stats returns request counts per host.
+
+Usage:
+    python standin.py --port 8765 --latency-ms 150 --fail-rate 0.05
+    TRIP_STANDIN_URL=http://127.0.0.1:8765 \\
+    SUPABASE_URL=http://127.0.0.1:8765/supabase SUPABASE_KEY=standin.standin.standin \\
+    streamlit run app.py
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from offline_geocoder import lookup_city, reverse_geocode
+
+DEFAULT_PORT = 8765
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+HANG_SECONDS = 30               # longer than http_client's read timeout
+FORECAST_DAYS = 16
+
+
+class Faults:
+    """Injected latency/failures for one host (or the default for all hosts)."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, fail_rate=0.0, fail_status=503, hang_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.hang_rate = hang_rate
+
+    def update(self, values):
+        for name in ("latency_ms", "jitter_ms", "fail_rate", "fail_status", "hang_rate"):
+            if name in values:
+                setattr(self, name, type(getattr(self, name))(values[name]))
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def fixture_path(fixtures_dir, host, path, query):
+    """File holding the recorded answer for host + path + (sorted) query."""
+    canonical = path + "?" + urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+    digest = hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(fixtures_dir, host, f"{digest}.json")
+
+
+# --- Synthetic providers: deterministic answers shaped like the real APIs ---
+
+def _resolve_text(text):
+    """City for free text, trying "A, B, C" then "B, C" and so on."""
+    parts = [p.strip() for p in str(text or "").split(",") if p.strip()]
+    for start in range(len(parts)):
+        city = lookup_city(", ".join(parts[start:]))
+        if city:
+            return city
+    return None
+
+
+def _nominatim_search(params):
+    city = _resolve_text(params.get("q"))
+    if not city:
+        return 200, []
+    name = params["q"].split(",")[0].strip()
+    return 200, [{
+        "lat": str(city["lat"]),
+        "lon": str(city["lon"]),
+        "display_name": f"{name}, {city['name']}, {city['admin1']}, United States",
+        "class": "place",
+        "type": "city",
+        "importance": 0.5,
+        "address": {"city": city["name"], "state": city["admin1"], "country": "United States", "country_code": "us"},
+    }]
+
+
+def _nominatim_reverse(params):
+    try:
+        city = reverse_geocode(float(params["lat"]), float(params["lon"]))
+    except (KeyError, ValueError):
+        return 400, {"error": "Invalid coordinates"}
+    if not city:
+        return 200, {"error": "Unable to geocode"}
+    return 200, {
+        "lat": params["lat"],
+        "lon": params["lon"],
+        "display_name": f"{city['name']}, {city['admin1']}, United States",
+        "address": {"city": city["name"], "state": city["admin1"], "country": "United States", "country_code": "us"},
+    }
+
+
+def _open_meteo_search(params):
+    city = _resolve_text(params.get("name"))
+    if not city:
+        return 200, {"generationtime_ms": 0.1}
+    return 200, {"results": [{
+        "name": city["name"],
+        "latitude": city["lat"],
+        "longitude": city["lon"],
+        "country": "United States",
+        "admin1": city["admin1"],
+    }]}
+
+
+def _daily_forecast(lat, lon, fields):
+    start = date.today()
+    daily = {"time": []}
+    for name in fields:
+        daily[name] = []
+    for n in range(FORECAST_DAYS):
+        day = start + timedelta(days=n)
+        rng = random.Random(f"{lat:.2f},{lon:.2f}|{day.isoformat()}")
+        high = 60 + 25 * rng.random() - (lat - 34) * 1.5
+        values = {
+            "temperature_2m_max": round(high, 1),
+            "temperature_2m_min": round(high - 12 - 8 * rng.random(), 1),
+            "weathercode": rng.choice([0, 0, 0, 1, 1, 2, 3, 45, 61, 80, 95]),
+            "precipitation_sum": round(max(0.0, rng.gauss(0, 0.1)), 2),
+            "windspeed_10m_max": round(3 + 15 * rng.random(), 1),
+            "winddirection_10m_dominant": rng.randrange(360),
+        }
+        daily["time"].append(day.isoformat())
+        for name in fields:
+            daily[name].append(values.get(name, 0))
+    return daily
+
+
+def _open_meteo_forecast(params):
+    try:
+        lats = [float(v) for v in params["latitude"].split(",")]
+        lons = [float(v) for v in params["longitude"].split(",")]
+    except (KeyError, ValueError):
+        return 400, {"error": True, "reason": "Invalid latitude/longitude"}
+    if len(lats) != len(lons):
+        return 400, {"error": True, "reason": "Parameter count mismatch"}
+    fields = [f for f in params.get("daily", "").split(",") if f]
+    locations = [
+        {"latitude": lat, "longitude": lon, "timezone": "America/Los_Angeles", "daily": _daily_forecast(lat, lon, fields)}
+        for lat, lon in zip(lats, lons)
+    ]
+    # A single location comes back as an object, several as a list
+    return 200, locations[0] if len(locations) == 1 else locations
+
+
+def _usd_pln(day):
+    return round(3.6 + 0.6 * random.Random(f"PLN|{day}").random(), 4)
+
+
+def _exchangerate_api(path, params):
+    # /v4/latest/USD or /v4/historical/USD/YYYYMMDD
+    parts = path.strip("/").split("/")
+    if len(parts) >= 3 and parts[1] == "latest":
+        day = date.today().isoformat()
+    elif len(parts) == 4 and parts[1] == "historical":
+        try:
+            day = datetime.strptime(parts[3], "%Y%m%d").date().isoformat()
+        except ValueError:
+            return 404, {"result": "error"}
+    else:
+        return 404, {"result": "error"}
+    return 200, {"base": "USD", "date": day, "rates": {"USD": 1, "PLN": _usd_pln(day)}}
+
+
+def _exchangerate_host(path, params):
+    day = path.strip("/")
+    try:
+        datetime.strptime(day, "%Y-%m-%d")
+    except ValueError:
+        return 404, {"success": False}
+    return 200, {"success": True, "base": params.get("base", "USD"), "date": day, "rates": {"PLN": _usd_pln(day)}}
+
+
+def synthetic_response(host, path, params):
+    """(status, json body) for a provider request, or None if the host/path is unknown."""
+    if host == "nominatim.openstreetmap.org":
+        if path.startswith("/search"):
+            return _nominatim_search(params)
+        if path.startswith("/reverse"):
+            return _nominatim_reverse(params)
+    elif host == "geocoding-api.open-meteo.com" and path.startswith("/v1/search"):
+        return _open_meteo_search(params)
+    elif host == "api.open-meteo.com" and path.startswith("/v1/forecast"):
+        return _open_meteo_forecast(params)
+    elif host == "api.exchangerate-api.com":
+        return _exchangerate_api(path, params)
+    elif host == "api.exchangerate.host":
+        return _exchangerate_host(path, params)
+    return None
+
+
+class AppDataTable:
+    """The Supabase app_data table (key, value) as PostgREST would serve it."""
+
+    def __init__(self, db_file=None):
+        self.db_file = db_file
+        self._rows = {}
+        self._lock = threading.Lock()
+        if db_file and os.path.exists(db_file):
+            with open(db_file) as f:
+                self._rows = json.load(f)
+
+    def select(self, params):
+        columns = [c for c in params.get("select", "*").split(",") if c]
+        with self._lock:
+            rows = [{"key": key, "value": value} for key, value in self._rows.items()]
+        key_filter = params.get("key", "")
+        if key_filter.startswith("eq."):
+            rows = [row for row in rows if row["key"] == key_filter[3:]]
+        if params.get("limit"):
+            rows = rows[:int(params["limit"])]
+        if columns != ["*"]:
+            rows = [{c: row.get(c) for c in columns} for row in rows]
+        return rows
+
+    def upsert(self, payload):
+        rows = payload if isinstance(payload, list) else [payload]
+        with self._lock:
+            for row in rows:
+                self._rows[row["key"]] = row.get("value")
+            if self.db_file:
+                with open(self.db_file, "w") as f:
+                    json.dump(self._rows, f)
+        return rows
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fixtures_dir=FIXTURES_DIR, record=False, strict=False, db_file=None, faults=None):
+        super().__init__(address, StandinHandler)
+        self.fixtures_dir = fixtures_dir
+        self.record = record
+        self.strict = strict
+        self.app_data = AppDataTable(db_file)
+        self.faults = {"*": faults or Faults()}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def faults_for(self, host):
+        return self.faults.get(host) or self.faults["*"]
+
+    def count(self, host, outcome):
+        with self.lock:
+            counts = self.stats.setdefault(host, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    server_version = "TripPlannerStandin/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _split(self):
+        parts = urlsplit(self.path)
+        host, _, path = parts.path.lstrip("/").partition("/")
+        return host, "/" + path, parts.query
+
+    def _inject_faults(self, host):
+        """Apply latency; return True if the request should fail instead of being answered."""
+        faults = self.server.faults_for(host)
+        delay = faults.latency_ms + random.uniform(0, faults.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000.0)
+        if faults.hang_rate and random.random() < faults.hang_rate:
+            self.server.count(host, "hung")
+            time.sleep(HANG_SECONDS)
+            return True
+        if faults.fail_rate and random.random() < faults.fail_rate:
+            self.server.count(host, "failed")
+            self._send_json(faults.fail_status, {"error": "injected failure"})
+            return True
+        return False
+
+    def do_GET(self):
+        host, path, query = self._split()
+        if host == "_standin":
+            return self._control(path)
+        if self._inject_faults(host):
+            return
+        params = dict(parse_qsl(query, keep_blank_values=True))
+        if host == "supabase":
+            self.server.count(host, "db")
+            if path.startswith("/rest/v1/app_data"):
+                return self._send_json(200, self.server.app_data.select(params))
+            return self._send_json(404, {"message": "unknown table"})
+
+        fixture = fixture_path(self.server.fixtures_dir, host, path, query)
+        if os.path.exists(fixture):
+            with open(fixture) as f:
+                recorded = json.load(f)
+            self.server.count(host, "replayed")
+            return self._send_json(recorded["status"], recorded["body"])
+        if self.server.record:
+            return self._record(host, path, query, fixture)
+        synthetic = None if self.server.strict else synthetic_response(host, path, params)
+        if synthetic is None:
+            self.server.count(host, "missing")
+            return self._send_json(404, {"error": f"no fixture for {host}{path}"})
+        self.server.count(host, "synthetic")
+        status, body = synthetic
+        self._send_json(status, body)
+
+    def _record(self, host, path, query, fixture):
+        import requests
+
+        url = f"https://{host}{path}" + (f"?{query}" if query else "")
+        try:
+            upstream = requests.get(url, headers={"User-Agent": "USA_Trip_Planner/1.0"}, timeout=(3.05, 15))
+            body = upstream.json()
+        except (requests.RequestException, ValueError) as e:
+            self.server.count(host, "record_failed")
+            return self._send_json(502, {"error": f"recording failed: {e}"})
+        os.makedirs(os.path.dirname(fixture), exist_ok=True)
+        with open(fixture, "w") as f:
+            json.dump({"url": url, "status": upstream.status_code, "body": body}, f, indent=1)
+        self.server.count(host, "recorded")
+        self._send_json(upstream.status_code, body)
+
+    def do_POST(self):
+        host, path, query = self._split()
+        if host == "_standin" and path == "/faults":
+            values = self._read_json() or {}
+            target = values.pop("host", "*")
+            faults = self.server.faults.setdefault(target, Faults(**self.server.faults["*"].to_dict()))
+            faults.update(values)
+            return self._send_json(200, {h: f.to_dict() for h, f in self.server.faults.items()})
+        if host == "supabase" and path.startswith("/rest/v1/app_data"):
+            if self._inject_faults(host):
+                return
+            self.server.count(host, "db")
+            rows = self.server.app_data.upsert(self._read_json())
+            return self._send_json(201, rows)
+        self._send_json(404, {"error": "not found"})
+
+    def _control(self, path):
+        if path == "/stats":
+            return self._send_json(200, self.server.stats)
+        if path == "/faults":
+            return self._send_json(200, {h: f.to_dict() for h, f in self.server.faults.items()})
+        self._send_json(404, {"error": "not found"})
+
+
+def start_standin(port=0, **options):
+    """Start a stand-in server on a background thread (port 0 = any free port). Returns the server."""
+    server = StandinServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, name="standin", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for Trip Planner's external APIs")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of recorded responses")
+    parser.add_argument("--record", action="store_true", help="forward unknown requests upstream and record them")
+    parser.add_argument("--strict", action="store_true", help="404 instead of synthetic data when no fixture exists")
+    parser.add_argument("--db-file", help="persist the app_data table to this JSON file")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    faults = Faults(args.latency_ms, args.jitter_ms, args.fail_rate, args.fail_status, args.hang_rate)
+    server = StandinServer(
+        ("127.0.0.1", args.port), fixtures_dir=args.fixtures, record=args.record,
+        strict=args.strict, db_file=args.db_file, faults=faults,
+    )
+    print(f"Stand-in listening on {server.base_url}")
+    print(f"  TRIP_STANDIN_URL={server.base_url}")
+    print(f"  SUPABASE_URL={server.base_url}/supabase")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,39 @@
+"""Tests for async_io.py: gathering calls on the job scheduler."""
+import threading
+import time
+
+from async_io import gather_calls
+
+
+def test_gather_runs_calls_concurrently():
+    started = time.monotonic()
+    results = gather_calls({
+        "a": ("test-a", time.sleep, 0.2),
+        "b": ("test-b", time.sleep, 0.2),
+        "c": ("test-c", lambda x: x * 2, 21),
+    })
+    assert results == {"a": None, "b": None, "c": 42}
+    assert time.monotonic() - started < 0.35
+
+
+def test_gather_returns_exceptions_per_key():
+    def fail():
+        raise ValueError("no such city")
+
+    results = gather_calls({"ok": ("test", int, "7"), "bad": ("test", fail)})
+    assert results["ok"] == 7
+    assert isinstance(results["bad"], ValueError)
+
+
+def test_gather_times_out_slow_calls():
+    release = threading.Event()
+    started = time.monotonic()
+    results = gather_calls({"slow": ("test", release.wait, 5), "fast": ("test", int, "1")}, timeout=0.1)
+    release.set()
+    assert time.monotonic() - started < 1
+    assert isinstance(results["slow"], TimeoutError)
+    assert results["fast"] == 1
+
+
+def test_gather_of_nothing():
+    assert gather_calls({}) == {}
@@ -0,0 +1,73 @@
+"""Tests for circuit_breaker.py: state changes of one breaker."""
+import pytest
+import requests
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, MAX_RESET_TIMEOUT, OPEN, CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls time.time() as seen by circuit_breaker.py; advance with clock[0] += seconds."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(circuit_breaker.time, "time", lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    breaker.record_failure(OSError("timeout"))
+    assert breaker.state == CLOSED
+    breaker.before_call()
+    breaker.record_failure(OSError("timeout"))
+    assert breaker.state == OPEN
+    assert breaker.status()["last_error"] == "timeout"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_lets_one_probe_through_after_the_cool_down(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 29
+    assert breaker.retry_in() == pytest.approx(1)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock[0] += 1
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.retry_in() == 0
+    breaker.before_call()
+
+
+def test_failed_probes_back_off(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    timeouts = []
+    for _ in range(6):
+        clock[0] += breaker.reset_timeout
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        timeouts.append(breaker.reset_timeout)
+    assert timeouts == [60, 120, 240, MAX_RESET_TIMEOUT, MAX_RESET_TIMEOUT, MAX_RESET_TIMEOUT]
+    clock[0] += breaker.reset_timeout
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.reset_timeout == 30
+
+
+def test_open_error_is_a_connection_error():
+    # Callers that already handle requests' connection errors handle an open breaker too
+    assert issubclass(CircuitOpenError, requests.exceptions.ConnectionError)
@@ -0,0 +1,162 @@
+"""Tests for geocoding.py: rate limiting and the geocode cache."""
+import threading
+import time
+
+import pytest
+
+import geocoding
+from geocoding import CACHE_NEGATIVE_TTL, CACHE_PERSIST_INTERVAL, CACHE_POSITIVE_TTL, GeocodeCache, TokenBucket
+from jobs import JobScheduler
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls time.time() as seen by geocoding.py; advance with clock[0] += seconds."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(geocoding.time, "time", lambda: now[0])
+    return now
+
+
+def test_token_bucket_allows_a_burst_up_to_capacity():
+    bucket = TokenBucket(rate=10, capacity=3)
+    started = time.monotonic()
+    for _ in range(3):
+        assert bucket.acquire(timeout=0)
+    assert time.monotonic() - started < 0.05
+
+
+def test_token_bucket_waits_for_the_next_token():
+    bucket = TokenBucket(rate=10, capacity=3)
+    for _ in range(3):
+        bucket.acquire()
+    started = time.monotonic()
+    assert bucket.acquire()
+    assert 0.08 <= time.monotonic() - started < 0.3
+
+
+def test_token_bucket_holds_the_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # One token at once, then one every 50 ms
+    assert 0.23 <= time.monotonic() - started < 0.5
+
+
+def test_token_bucket_timeout_returns_false():
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.acquire(timeout=0)
+    started = time.monotonic()
+    assert not bucket.acquire(timeout=0.05)
+    assert time.monotonic() - started < 0.3
+
+
+def test_token_bucket_is_shared_between_threads():
+    bucket = TokenBucket(rate=20, capacity=1)
+    started = time.monotonic()
+    threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(2)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 8 tokens: one at once, 7 more at 20 per second
+    assert time.monotonic() - started >= 0.33
+
+
+def test_cache_hits_and_misses():
+    cache = GeocodeCache()
+    assert cache.get("city", "Fresno") == (False, None)
+    cache.put("city", "Fresno", {"lat": 36.7, "lon": -119.8})
+    assert cache.get("city", "  fresno ") == (True, {"lat": 36.7, "lon": -119.8})
+    assert cache.get("reverse", "Fresno") == (False, None)
+
+
+def test_cache_keeps_not_found_for_the_negative_ttl(clock):
+    cache = GeocodeCache()
+    cache.put("city", "Nowhere", None)
+    clock[0] += CACHE_NEGATIVE_TTL - 1
+    assert cache.get("city", "Nowhere") == (True, None)
+    clock[0] += 2
+    assert cache.get("city", "Nowhere") == (False, None)
+    assert len(cache) == 0
+
+
+def test_cache_keeps_hits_for_the_positive_ttl(clock):
+    cache = GeocodeCache()
+    cache.put("city", "Fresno", {"lat": 36.7})
+    clock[0] += CACHE_NEGATIVE_TTL + 1
+    assert cache.get("city", "Fresno")[0]
+    clock[0] += CACHE_POSITIVE_TTL
+    assert not cache.get("city", "Fresno")[0]
+
+
+def test_cache_evicts_least_recently_used():
+    cache = GeocodeCache(max_entries=3)
+    for name in ("a", "b", "c"):
+        cache.put("city", name, name)
+    cache.get("city", "a")
+    cache.put("city", "d", "d")
+    assert len(cache) == 3
+    assert not cache.get("city", "b")[0]
+    assert all(cache.get("city", name)[0] for name in ("a", "c", "d"))
+
+
+def test_cache_round_trips_and_drops_expired_entries(clock):
+    cache = GeocodeCache()
+    cache.put("city", "Fresno", {"lat": 36.7})
+    cache.put("city", "Nowhere", None)
+    snapshot = cache.to_dict()
+    clock[0] += CACHE_NEGATIVE_TTL + 1
+    restored = GeocodeCache(max_entries=10)
+    restored.load_dict(snapshot)
+    assert restored.get("city", "Fresno") == (True, {"lat": 36.7})
+    assert restored.get("city", "Nowhere") == (False, None)
+
+
+def test_cache_load_keeps_the_newest_entries_over_the_cap():
+    cache = GeocodeCache()
+    for name in ("a", "b", "c"):
+        cache.put("city", name, name)
+    restored = GeocodeCache(max_entries=2)
+    restored.load_dict(cache.to_dict())
+    assert [cache_key for cache_key, _, _ in restored.to_dict()["entries"]] == ["city:b", "city:c"]
+
+
+def test_cache_writes_behind_at_most_every_interval(clock):
+    saved = []
+    cache = GeocodeCache(save_fn=saved.append)
+    cache.put("city", "a", "a")
+    assert saved == []
+    clock[0] += CACHE_PERSIST_INTERVAL
+    cache.put("city", "b", "b")
+    assert len(saved) == 1 and len(saved[0]["entries"]) == 2
+    assert cache.maybe_persist(force=True) is None and len(saved) == 1  # nothing new
+
+
+def test_cache_retries_a_failed_save(clock):
+    calls = []
+
+    def save(snapshot):
+        calls.append(snapshot)
+        if len(calls) == 1:
+            raise OSError("disk full")
+
+    cache = GeocodeCache(save_fn=save)
+    cache.put("city", "a", "a")
+    cache.maybe_persist(force=True)
+    cache.maybe_persist(force=True)
+    assert len(calls) == 2
+
+
+def test_cache_saves_as_a_storage_job():
+    saved = []
+    scheduler = JobScheduler(max_workers=1)
+    try:
+        cache = GeocodeCache(save_fn=saved.append, scheduler=scheduler)
+        cache.put("city", "a", "a")
+        job = cache.maybe_persist(force=True)
+        assert job.kind == "storage"
+        job.result(timeout=5)
+        assert len(saved) == 1
+    finally:
+        scheduler.shutdown()
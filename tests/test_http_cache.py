@@ -0,0 +1,80 @@
+"""Tests for http_cache.py: freshness rules and the on-disk store."""
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from http_cache import HOST_TTL_OVERRIDES, HTTPCache, build_response, freshness_lifetime
+
+NOMINATIM = "nominatim.openstreetmap.org"
+OTHER = "example.com"
+
+
+def make_response(body=b"{}", status=200, **headers):
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict({name.replace("_", "-"): value for name, value in headers.items()})
+    response._content = body
+    return response
+
+
+def test_freshness_follows_cache_control():
+    assert freshness_lifetime(OTHER, {"Cache-Control": "max-age=60"}) == 60
+    assert freshness_lifetime(OTHER, {"Cache-Control": "public, s-maxage=30, max-age=60"}) == 30
+    assert freshness_lifetime(OTHER, {"Cache-Control": "no-cache, max-age=60"}) == 0
+    assert freshness_lifetime(OTHER, {"Cache-Control": "no-store"}) is None
+    assert freshness_lifetime(OTHER, {}) == 0
+
+
+def test_freshness_falls_back_to_expires():
+    expires = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 120))
+    assert 100 <= freshness_lifetime(OTHER, {"Expires": expires}) <= 120
+    assert freshness_lifetime(OTHER, {"Expires": "not a date"}) == 0
+
+
+def test_host_override_applies_only_to_geocoder_answers_with_results():
+    found = b'[{"lat": "34.05", "lon": "-118.24"}]'
+    assert freshness_lifetime(NOMINATIM, {"Cache-Control": "max-age=60"}, found) == HOST_TTL_OVERRIDES[NOMINATIM]
+    assert freshness_lifetime(NOMINATIM, {"Cache-Control": "max-age=60"}, b"[]") == 60
+    assert freshness_lifetime(NOMINATIM, {}, b'{"error": "Unable to geocode"}') == 0
+    assert freshness_lifetime("geocoding-api.open-meteo.com", {}, b'{"generationtime_ms": 0.1}') == 0
+    # no-store wins over any override
+    assert freshness_lifetime(NOMINATIM, {"Cache-Control": "no-store"}, found) is None
+
+
+def test_store_round_trip(tmp_path):
+    cache = HTTPCache(path=str(tmp_path / "cache.sqlite3"))
+    cache.put("https://x/a", make_response(b'{"a": 1}', ETag='"v1"', Content_Type="application/json"), 60)
+    entry = cache.get("https://x/a")
+    assert entry["etag"] == '"v1"' and entry["body"] == b'{"a": 1}'
+    assert entry["expires_at"] > time.time() + 50
+    response = build_response("https://x/a", entry)
+    assert response.from_cache and response.json() == {"a": 1}
+    assert cache.get("https://x/missing") is None
+
+
+def test_refresh_extends_a_stale_entry(tmp_path):
+    cache = HTTPCache(path=str(tmp_path / "cache.sqlite3"))
+    cache.put("https://x/a", make_response(Last_Modified="Mon, 02 Jun 2025 10:00:00 GMT"), 0)
+    assert cache.get("https://x/a")["expires_at"] <= time.time()
+    cache.refresh("https://x/a", 300)
+    assert cache.get("https://x/a")["expires_at"] > time.time() + 250
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    cache = HTTPCache(path=str(tmp_path / "cache.sqlite3"), max_bytes=250)
+    for name in ("a", "b"):
+        cache.put(f"https://x/{name}", make_response(b"x" * 100), 60)
+        time.sleep(0.01)
+    cache.get("https://x/a")
+    time.sleep(0.01)
+    cache.put("https://x/c", make_response(b"x" * 100), 60)
+    assert cache.get("https://x/b") is None
+    assert cache.get("https://x/a") is not None and cache.get("https://x/c") is not None
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_store_survives_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    HTTPCache(path=path).put("https://x/a", make_response(b"kept"), 60)
+    assert HTTPCache(path=path).get("https://x/a")["body"] == b"kept"
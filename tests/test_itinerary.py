@@ -0,0 +1,94 @@
+"""Tests for itinerary.py: where the group is on each trip day."""
+from datetime import date
+
+from itinerary import build_day_index, day_hotels, hotel_for_date, parse_day, trip_days, unresolved_location_texts
+
+CITIES = {
+    "San Francisco": {"lat": 37.77, "lon": -122.42},
+    "Los Angeles": {"lat": 34.05, "lon": -118.24},
+    "Las Vegas": {"lat": 36.17, "lon": -115.14},
+}
+
+HOTELS = [
+    {"name": "Hotel A", "location": "San Francisco", "check_in": "2025-06-01", "check_out": "2025-06-03"},
+    {"name": "Hotel B", "location": "Los Angeles", "check_in": "2025-06-03", "check_out": "2025-06-05"},
+]
+
+
+def resolve(text):
+    return CITIES.get(text)
+
+
+def test_parse_day():
+    assert parse_day("2025-06-01") == date(2025, 6, 1)
+    assert parse_day("") is None
+    assert parse_day(None) is None
+    assert parse_day("June 1st") is None
+
+
+def test_hotel_for_date_covers_nights_not_the_check_out_day():
+    assert hotel_for_date(HOTELS, date(2025, 6, 2))["name"] == "Hotel A"
+    assert hotel_for_date(HOTELS, date(2025, 6, 3))["name"] == "Hotel B"
+    assert hotel_for_date(HOTELS, date(2025, 6, 5)) is None
+
+
+def test_trip_days_cover_places_stays_and_flights():
+    places = [{"day": "2025-05-30"}, {"day": None}, {"day": "bad"}]
+    trip_info = {"hotels": HOTELS, "flights": [{"date": "2025-06-07", "to": "Las Vegas"}]}
+    days = trip_days(places, trip_info)
+    assert days[0] == date(2025, 5, 30)
+    assert date(2025, 6, 1) in days and date(2025, 6, 5) in days
+    assert days[-1] == date(2025, 6, 7)
+    assert len(days) == len(set(days))
+
+
+def test_day_index_groups_the_days_places_by_city():
+    places = [
+        {"name": "Pier 39", "lat": 37.80, "lon": -122.41, "day": "2025-06-02"},
+        {"name": "Alcatraz", "lat": 37.82, "lon": -122.42, "day": "2025-06-02"},
+        {"name": "Muir Woods", "lat": 37.89, "lon": -122.57, "day": "2025-06-02"},
+    ]
+    city_of = lambda lat, lon: "Mill Valley" if lon < -122.5 else "San Francisco"
+    index = build_day_index(places, {"hotels": HOTELS}, resolve, city_of)
+    locations = {loc["name"]: loc for loc in index[date(2025, 6, 2)]}
+    assert set(locations) == {"San Francisco", "Mill Valley"}
+    assert locations["San Francisco"]["source"] == "places"
+    assert abs(locations["San Francisco"]["lat"] - 37.81) < 1e-9
+
+
+def test_day_index_falls_back_to_flights_then_hotels():
+    trip_info = {
+        "hotels": HOTELS,
+        # Old stores keep flights as a dict
+        "flights": {"outbound": {"date": "2025-06-01", "to": "Las Vegas"}},
+    }
+    index = build_day_index([], trip_info, resolve)
+    assert [loc["source"] for loc in index[date(2025, 6, 1)]] == ["flight"]
+    assert index[date(2025, 6, 2)][0]["name"] == "Hotel A (San Francisco)"
+    # Check-out morning: the hotel being left
+    assert index[date(2025, 6, 5)][0]["name"] == "Hotel B (Los Angeles)"
+
+
+def test_day_index_leaves_unknown_days_empty():
+    hotels = [{"name": "Nowhere Inn", "check_in": "2025-06-01", "check_out": "2025-06-02"}]
+    index = build_day_index([], {"hotels": hotels}, resolve)
+    assert index == {date(2025, 6, 1): [], date(2025, 6, 2): []}
+
+
+def test_unresolved_location_texts():
+    trip_info = {
+        "hotels": HOTELS + [{"name": "Motel", "location": "Barstow"}, {"name": "Motel", "location": "Barstow"}],
+        "flights": [{"date": "2025-06-07", "to": "Las Vegas"}, {"date": "2025-06-08", "to": "Reno"}],
+    }
+    assert unresolved_location_texts(trip_info, resolve) == ["Barstow", "Reno"]
+
+
+def test_day_hotels_anchor_each_day():
+    def names(day):
+        return tuple(hotel["name"] if hotel else None for hotel in day_hotels(HOTELS, day))
+
+    assert names(date(2025, 6, 1)) == ("Hotel A", "Hotel A")   # check-in: no previous night
+    assert names(date(2025, 6, 2)) == ("Hotel A", "Hotel A")
+    assert names(date(2025, 6, 3)) == ("Hotel A", "Hotel B")   # moving on
+    assert names(date(2025, 6, 5)) == ("Hotel B", "Hotel B")   # check-out, nothing booked after
+    assert names(date(2025, 6, 6)) == (None, None)
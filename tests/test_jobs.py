@@ -0,0 +1,137 @@
+"""Tests for jobs.py: priorities, per-kind caps and cancelling."""
+import threading
+import time
+
+import pytest
+
+from jobs import INTERACTIVE, NORMAL, PREFETCH, JobScheduler
+
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def make(max_workers=1, kind_limits=None):
+        scheduler = JobScheduler(max_workers=max_workers, kind_limits=kind_limits or {})
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.shutdown()
+
+
+def block(scheduler):
+    """Occupy the single worker until the returned event is set."""
+    release = threading.Event()
+    started = threading.Event()
+    scheduler.submit("block", lambda: (started.set(), release.wait(5)))
+    assert started.wait(5)
+    return release
+
+
+def test_runs_jobs_in_priority_order(make_scheduler):
+    scheduler = make_scheduler()
+    release = block(scheduler)
+    ran = []
+    jobs = [
+        scheduler.submit("test", ran.append, "prefetch", priority=PREFETCH),
+        scheduler.submit("test", ran.append, "normal 1", priority=NORMAL),
+        scheduler.submit("test", ran.append, "interactive", priority=INTERACTIVE),
+        scheduler.submit("test", ran.append, "normal 2", priority=NORMAL),
+    ]
+    assert jobs[0].state == "queued"
+    release.set()
+    for job in jobs:
+        job.result(timeout=5)
+    assert ran == ["interactive", "normal 1", "normal 2", "prefetch"]
+
+
+def test_promote_moves_a_queued_job_ahead(make_scheduler):
+    scheduler = make_scheduler()
+    release = block(scheduler)
+    ran = []
+    normal = scheduler.submit("test", ran.append, "normal", priority=NORMAL)
+    prefetch = scheduler.submit("test", ran.append, "prefetch", priority=PREFETCH)
+    scheduler.promote(prefetch, INTERACTIVE)
+    release.set()
+    normal.result(timeout=5)
+    assert ran == ["prefetch", "normal"]
+
+
+def test_kind_limit_caps_concurrent_jobs(make_scheduler):
+    scheduler = make_scheduler(max_workers=4, kind_limits={"geocode": 2})
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def work():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    jobs = [scheduler.submit("geocode", work) for _ in range(6)]
+    # Other kinds still get the free workers
+    other = scheduler.submit("rates", time.sleep, 0)
+    other.result(timeout=1)
+    assert not all(job.done() for job in jobs)
+    for job in jobs:
+        job.result(timeout=5)
+    assert peak[0] == 2
+
+
+def test_cancel_queued_jobs(make_scheduler):
+    scheduler = make_scheduler()
+    release = block(scheduler)
+    ran = []
+    single = scheduler.submit("test", ran.append, "single")
+    tiles = [scheduler.submit("tiles", ran.append, n) for n in range(3)]
+    kept = scheduler.submit("test", ran.append, "kept")
+    assert single.cancel()
+    assert scheduler.cancel_kind("tiles") == 3
+    assert scheduler.status()["queued"] == 1
+    release.set()
+    kept.result(timeout=5)
+    assert ran == ["kept"]
+    assert single.state == "cancelled" and all(job.cancelled() for job in tiles)
+
+
+def test_failed_job_keeps_its_error(make_scheduler):
+    scheduler = make_scheduler()
+
+    def fail():
+        raise ValueError("boom")
+
+    job = scheduler.submit("test", fail)
+    with pytest.raises(ValueError):
+        job.result(timeout=5)
+    assert job.state == "failed"
+    assert job.status()["error"] == "boom"
+    assert scheduler.jobs("test")[0]["state"] == "failed"
+    # The worker survives and runs the next job
+    assert scheduler.submit("test", int, "3").result(timeout=5) == 3
+
+
+def test_status_counts_per_kind(make_scheduler):
+    scheduler = make_scheduler(kind_limits={"geocode": 2})
+    release = block(scheduler)
+    scheduler.submit("geocode", int, "1")
+    scheduler.submit("geocode", int, "2")
+    status = scheduler.status()
+    assert status["running"] == 1 and status["queued"] == 2
+    assert status["kinds"]["geocode"] == {"queued": 2, "running": 0, "limit": 2}
+    release.set()
+
+
+def test_shutdown_cancels_queued_jobs_and_refuses_new_ones(make_scheduler):
+    scheduler = make_scheduler()
+    release = block(scheduler)
+    queued = scheduler.submit("test", int, "1")
+    scheduler.shutdown()
+    release.set()
+    assert queued.cancelled()
+    with pytest.raises(RuntimeError):
+        scheduler.submit("test", int, "1")
@@ -0,0 +1,190 @@
+"""Tests for routes.py: the distance matrix and the route optimizers."""
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from routes import (
+    DistanceMatrix, exact_route, improve_route, initial_route, leg_distances, nearest_neighbour_order, optimize_route, route_length,
+)
+from spatial import haversine_km
+
+KM_PER_MILE = 1.609344
+
+
+def random_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(32, 42, n), rng.uniform(-124, -114, n)])
+
+
+# (start, end, closed) cases the optimizers take, for a route over n stops
+def route_cases(n):
+    cases = [(None, None, False), (None, None, True), (0, None, False), (0, None, True), (None, n - 1, False)]
+    if n > 1:
+        cases += [(0, n - 1, False), (n - 1, 0, False), (n - 2, n - 2, False)]
+    return cases
+
+
+def check_constraints(order, n, start, end, closed):
+    """The order visits every stop once and keeps the fixed ends."""
+    assert sorted(order) == list(range(n))
+    if end is not None and end == start:
+        closed = True
+    if start is not None:
+        assert order[0] == start
+    if end is not None and not closed:
+        assert order[-1] == end
+
+
+def test_matrix_matches_scalar_haversine():
+    points = random_points(30)
+    matrix = DistanceMatrix(points)
+    assert matrix.miles.shape == (30, 30)
+    assert np.allclose(matrix.miles, matrix.miles.T)
+    assert np.all(np.diag(matrix.miles) == 0)
+    for i, j in [(0, 1), (5, 17), (29, 3)]:
+        expected = haversine_km(*points[i], *points[j]) / KM_PER_MILE
+        assert matrix.miles[i, j] == pytest.approx(expected, rel=1e-3)
+
+
+def test_float32_matrix_stays_accurate():
+    points = random_points(200)
+    exact = DistanceMatrix(points).miles
+    small = DistanceMatrix(points, dtype=np.float32)
+    assert small.miles.dtype == np.float32
+    assert np.max(np.abs(small.miles - exact)) < 0.1
+
+
+def test_places_map_to_rows_by_id():
+    places = [{"id": 7, "lat": 34.0, "lon": -118.0}, {"id": 3, "lat": 37.7, "lon": -122.4}, {"id": 9, "lat": 36.1, "lon": -115.1}]
+    matrix = DistanceMatrix.from_places(places)
+    assert len(matrix) == 3
+    assert matrix.index == {7: 0, 3: 1, 9: 2}
+    sub = matrix.sub([2, 0])
+    assert sub[0, 1] == matrix.miles[2, 0]
+    assert matrix.distances_from(34.0, -118.0)[0] == pytest.approx(0, abs=1e-9)
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_update_matches_a_rebuild(dtype):
+    points = random_points(40)
+    matrix = DistanceMatrix(points, dtype=dtype)
+    points[11] = (35.5, -117.5)
+    matrix.update(11, 35.5, -117.5)
+    assert np.allclose(matrix.miles, DistanceMatrix(points, dtype=dtype).miles, atol=1e-3)
+    assert matrix.miles[11, 11] == 0
+
+
+@pytest.mark.parametrize("moved", [0, 3, 30])
+def test_sync_updates_moved_rows(moved):
+    points = random_points(40)
+    matrix = DistanceMatrix(points)
+    rows = np.random.default_rng(1).choice(40, moved, replace=False)
+    points[rows] += 0.25
+    assert matrix.sync(points) == moved
+    assert np.allclose(matrix.miles, DistanceMatrix(points).miles)
+    assert matrix.sync(points) == 0
+
+
+def test_nearest():
+    matrix = DistanceMatrix([(34.0, -118.0), (34.1, -118.0), (35.0, -118.0), (34.2, -118.0)])
+    assert [row for row, _ in matrix.nearest(0, k=2)] == [1, 3]
+    assert [row for row, _ in matrix.nearest(0, k=5, among=[0, 2, 3])] == [3, 2]
+
+
+def test_route_length_and_greedy_order():
+    points = [(34.0, -118.0), (34.0, -117.5), (34.0, -116.0), (34.0, -115.0)]
+    dist = DistanceMatrix(points).miles
+    legs = leg_distances(points)
+    assert route_length(dist, [0, 1, 2, 3]) == pytest.approx(legs.sum())
+    assert route_length(dist, [0, 1, 2, 3], closed=True) == pytest.approx(legs.sum() + dist[3, 0])
+    assert route_length(dist, [2]) == 0.0
+    assert nearest_neighbour_order(dist, start=1) == [1, 0, 2, 3]
+
+
+@pytest.mark.parametrize("start, end, closed", route_cases(40))
+def test_improve_route_keeps_the_ends_and_never_gets_longer(start, end, closed):
+    dist = DistanceMatrix(random_points(40, seed=3)).miles
+    greedy = initial_route(dist, start, end, closed)
+    check_constraints(greedy, 40, start, end, closed)
+    order, moves = improve_route(dist, greedy, start, end, closed, time_budget=2.0)
+    check_constraints(order, 40, start, end, closed)
+    is_closed = closed or (end is not None and end == start)
+    assert route_length(dist, order, is_closed) <= route_length(dist, greedy, is_closed) + 1e-9
+    assert moves > 0
+
+
+def test_improve_route_leaves_tiny_routes_alone():
+    dist = DistanceMatrix(random_points(3)).miles
+    assert improve_route(dist, [2, 0, 1], closed=True) == ([2, 0, 1], 0)
+    assert improve_route(dist[:2, :2], [1, 0]) == ([1, 0], 0)
+
+
+def test_optimize_route_reports_the_saving():
+    dist = DistanceMatrix(random_points(60, seed=4)).miles
+    result = optimize_route(dist, start=0, exact_max_stops=0, time_budget=2.0)
+    check_constraints(result["order"], 60, 0, None, False)
+    assert result["method"] == "2-opt/Or-opt"
+    assert result["length"] == pytest.approx(route_length(dist, result["order"]))
+    assert result["saved"] == pytest.approx(result["initial_length"] - result["length"])
+    assert result["saved"] >= 0
+
+
+def brute_force_length(dist, start, end, closed):
+    """Shortest route length over every order of the stops that keeps the ends."""
+    n = len(dist)
+    if end is not None and end == start:
+        closed, end = True, None
+    best = np.inf
+    for order in permutations(range(n)):
+        if start is not None and order[0] != start:
+            continue
+        if end is not None and not closed and order[-1] != end:
+            continue
+        best = min(best, route_length(dist, order, closed))
+    return best
+
+
+def random_symmetric(n, seed):
+    """Distances that break the triangle inequality, so shortcuts can't hide mistakes."""
+    rng = np.random.default_rng(seed)
+    dist = rng.uniform(1, 100, (n, n))
+    dist = (dist + dist.T) / 2
+    np.fill_diagonal(dist, 0)
+    return dist
+
+
+@pytest.mark.parametrize("n", range(1, 8))
+@pytest.mark.parametrize("kind", ["points", "random"])
+def test_exact_route_matches_brute_force(n, kind):
+    for seed in range(3):
+        dist = DistanceMatrix(random_points(n, seed)).miles if kind == "points" else random_symmetric(n, seed)
+        for start, end, closed in route_cases(n):
+            order = exact_route(dist, start, end, closed)
+            check_constraints(order, n, start, end, closed)
+            is_closed = closed or (end is not None and end == start)
+            expected = brute_force_length(dist, start, end, closed)
+            assert route_length(dist, order, is_closed) == pytest.approx(expected), (start, end, closed)
+
+
+@pytest.mark.parametrize("n", [2, 5, 7])
+def test_optimize_route_is_exact_for_small_days(n):
+    dist = random_symmetric(n, seed=n)
+    for start, end, closed in route_cases(n):
+        result = optimize_route(dist, start, end, closed)
+        assert result["method"] == "exact"
+        check_constraints(result["order"], n, start, end, closed)
+        assert result["length"] == pytest.approx(brute_force_length(dist, start, end, closed))
+        assert result["saved"] >= -1e-9
+
+
+def test_exact_route_is_never_longer_than_the_heuristic():
+    dist = DistanceMatrix(random_points(9, seed=5)).miles
+    for start, end, closed in route_cases(9):
+        exact = optimize_route(dist, start, end, closed)
+        heuristic = optimize_route(dist, start, end, closed, exact_max_stops=0)
+        assert exact["length"] <= heuristic["length"] + 1e-9
+        if start is not None:
+            assert exact["order"][0] == heuristic["order"][0] == start
+        if end is not None and not closed and end != start:
+            assert exact["order"][-1] == heuristic["order"][-1] == end
@@ -0,0 +1,57 @@
+"""Tests for spatial.py: the grid index against a brute-force scan."""
+import random
+
+import pytest
+
+from spatial import GridIndex, haversine_km
+
+
+@pytest.fixture
+def points():
+    rng = random.Random(0)
+    return [(rng.uniform(32.0, 42.0), rng.uniform(-124.5, -114.0), n) for n in range(500)]
+
+
+@pytest.fixture
+def index(points):
+    grid = GridIndex(cell_deg=0.5)
+    for lat, lon, item in points:
+        grid.insert(lat, lon, item)
+    return grid
+
+
+def test_haversine_km():
+    assert haversine_km(34.05, -118.24, 34.05, -118.24) == 0
+    # Los Angeles - San Francisco
+    assert haversine_km(34.05, -118.24, 37.77, -122.42) == pytest.approx(559, abs=3)
+
+
+@pytest.mark.parametrize("box", [
+    (34.0, -119.0, 34.8, -118.0),     # a few cells
+    (33.26, -118.01, 33.74, -117.49), # within cell boundaries
+    (30.0, -130.0, 45.0, -110.0),     # more cells than are occupied
+    (50.0, -100.0, 51.0, -99.0),      # nothing there
+])
+def test_bbox_matches_brute_force(points, index, box):
+    south, west, north, east = box
+    expected = {item for lat, lon, item in points if south <= lat <= north and west <= lon <= east}
+    assert {item for _, _, item in index.query_bbox(*box)} == expected
+    assert len(index) == len(points)
+
+
+def test_radius_matches_brute_force_nearest_first(points, index):
+    lat, lon, radius = 36.0, -119.5, 80.0
+    found = index.query_radius(lat, lon, radius)
+    expected = {item for p_lat, p_lon, item in points if haversine_km(lat, lon, p_lat, p_lon) <= radius}
+    assert {item for _, item in found} == expected
+    distances = [dist for dist, _ in found]
+    assert distances == sorted(distances)
+
+
+def test_points_on_cell_edges_and_negative_coordinates():
+    grid = GridIndex(cell_deg=1.0)
+    grid.insert(-0.5, -0.5, "sw")
+    grid.insert(0.0, 0.0, "origin")
+    grid.insert(1.0, -1.0, "edge")
+    assert {item for _, _, item in grid.query_bbox(-1.0, -1.0, 0.0, 0.0)} == {"sw", "origin"}
+    assert {item for _, _, item in grid.query_bbox(0.0, -1.0, 1.0, 0.0)} == {"origin", "edge"}
@@ -0,0 +1,309 @@
+"""
+Offline map tiles for Trip Planner.
+Folium maps load OpenStreetMap tiles straight from the browser, so with no
+signal (Death Valley, the Grand Canyon) they come up blank. This module keeps
+tiles in a SQLite file (data/tiles.sqlite3 by default, LRU-evicted above a
+disk quota), can prefetch every tile of the trip's bounding box at chosen
+zoom levels while still online, and runs a small local tile server that
+answers from that store and fetches misses upstream when it can.
+
+Tiles already on disk are served even when stale if the upstream can't be
+reached; fresh ones never touch the network.
+
+Usage:
+    python tile_cache.py --port 8766
+    python tile_cache.py --prefetch 32.5,-119.0,36.5,-112.0 --zooms 6-11
+    TRIP_TILE_URL=http://127.0.0.1:8766 streamlit run app.py
+
+OpenStreetMap's tile policy (https://operations.osmfoundation.org/policies/tiles/)
+discourages bulk downloads: prefetches are capped at MAX_PREFETCH_TILES and
+go through the "osm-tiles" rate limit. Point TRIP_TILE_UPSTREAM at another
+tile provider for larger areas.
+"""
+import argparse
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from http_client import http_get
+
+DEFAULT_PORT = 8766
+TILE_CACHE_PATH = os.getenv("TRIP_TILE_CACHE_PATH", os.path.join("data", "tiles.sqlite3"))
+MAX_TILE_BYTES = int(os.getenv("TRIP_TILE_CACHE_MB", "500")) * 1024 * 1024
+UPSTREAM_URL = os.getenv("TRIP_TILE_UPSTREAM", "https://tile.openstreetmap.org/{z}/{x}/{y}.png")
+# Local tile server the maps load from (unset = tiles come from OpenStreetMap directly)
+TILE_SERVER_URL = os.getenv("TRIP_TILE_URL", "").rstrip("/")
+TILE_ATTRIBUTION = '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+
+TILE_MAX_AGE = 14 * 24 * 3600    # refetched after this when online; older tiles still served offline
+MAX_PREFETCH_TILES = 5000
+MAX_ZOOM = 19
+AVERAGE_TILE_BYTES = 15 * 1024   # for size estimates before a prefetch
+
+
+def lat_lon_to_tile(lat, lon, zoom):
+    """(x, y) of the Web Mercator tile containing the point at `zoom`."""
+    lat = max(-85.0511, min(85.0511, lat))
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(n - 1, max(0, x)), min(n - 1, max(0, y))
+
+
+def tiles_in_bbox(bbox, zoom):
+    """Yield (x, y) of every tile at `zoom` overlapping bbox = (south, west, north, east)."""
+    south, west, north, east = bbox
+    x_min, y_min = lat_lon_to_tile(north, west, zoom)
+    x_max, y_max = lat_lon_to_tile(south, east, zoom)
+    for x in range(x_min, x_max + 1):
+        for y in range(y_min, y_max + 1):
+            yield x, y
+
+
+def count_tiles(bbox, zooms):
+    """Number of tiles a prefetch of bbox at these zoom levels covers."""
+    south, west, north, east = bbox
+    total = 0
+    for zoom in zooms:
+        x_min, y_min = lat_lon_to_tile(north, west, zoom)
+        x_max, y_max = lat_lon_to_tile(south, east, zoom)
+        total += (x_max - x_min + 1) * (y_max - y_min + 1)
+    return total
+
+
+def bbox_around(points, margin_deg=0.1):
+    """(south, west, north, east) enclosing (lat, lon) points plus a margin, or None for no points."""
+    points = list(points)
+    if not points:
+        return None
+    lats = [lat for lat, _ in points]
+    lons = [lon for _, lon in points]
+    return (
+        max(-85.0, min(lats) - margin_deg), max(-180.0, min(lons) - margin_deg),
+        min(85.0, max(lats) + margin_deg), min(180.0, max(lons) + margin_deg),
+    )
+
+
+class TileStore:
+    """SQLite tile store with LRU eviction above max_bytes (thread-safe)."""
+
+    def __init__(self, path=TILE_CACHE_PATH, max_bytes=MAX_TILE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The app (prefetch) and the tile server may be separate processes
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tiles ("
+            " z INTEGER, x INTEGER, y INTEGER, data BLOB, fetched_at REAL, size INTEGER, last_access REAL,"
+            " PRIMARY KEY (z, x, y))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS tiles_lru ON tiles (last_access)")
+        self._db.commit()
+
+    def get(self, z, x, y):
+        """(data, fetched_at) of a stored tile, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT data, fetched_at FROM tiles WHERE z = ? AND x = ? AND y = ?", (z, x, y)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE tiles SET last_access = ? WHERE z = ? AND x = ? AND y = ?", (time.time(), z, x, y))
+            self._db.commit()
+        return row
+
+    def has(self, z, x, y):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM tiles WHERE z = ? AND x = ? AND y = ?", (z, x, y)).fetchone() is not None
+
+    def put(self, z, x, y, data):
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?, ?, ?)", (z, x, y, data, now, len(data), now))
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM tiles").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for z, x, y, size in self._db.execute("SELECT z, x, y, size FROM tiles ORDER BY last_access").fetchall():
+            self._db.execute("DELETE FROM tiles WHERE z = ? AND x = ? AND y = ?", (z, x, y))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tiles").fetchone()
+        return {"tiles": count, "bytes": size, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM tiles")
+            self._db.commit()
+
+
+class TileCache:
+    """Tiles from the store, fetched upstream (and stored) when missing or stale."""
+
+    def __init__(self, store=None, upstream_url=UPSTREAM_URL):
+        self.store = store or TileStore()
+        self.upstream_url = upstream_url
+
+    def fetch(self, z, x, y):
+        """Download one tile and store it. Raises requests exceptions on failure."""
+        response = http_get(self.upstream_url.format(z=z, x=x, y=y), provider="osm-tiles", cache=False)
+        response.raise_for_status()
+        self.store.put(z, x, y, response.content)
+        return response.content
+
+    def tile(self, z, x, y):
+        """PNG bytes of a tile, or None if it isn't stored and can't be fetched."""
+        entry = self.store.get(z, x, y)
+        if entry and time.time() - entry[1] < TILE_MAX_AGE:
+            return entry[0]
+        try:
+            return self.fetch(z, x, y)
+        except requests.exceptions.RequestException:
+            return entry[0] if entry else None
+
+    def prefetch(self, bbox, zooms, progress=None):
+        """
+        Download every tile of bbox at the given zoom levels that isn't stored
+        yet. progress (a dict) is updated in place as {"total", "done",
+        "fetched", "failed"} so another thread can show it. Raises ValueError
+        above MAX_PREFETCH_TILES.
+        """
+        zooms = sorted(set(zooms))
+        total = count_tiles(bbox, zooms)
+        if total > MAX_PREFETCH_TILES:
+            raise ValueError(f"{total} tiles requested, at most {MAX_PREFETCH_TILES} per prefetch")
+        progress = progress if progress is not None else {}
+        progress.update(total=total, done=0, fetched=0, failed=0)
+        for zoom in zooms:
+            for x, y in tiles_in_bbox(bbox, zoom):
+                if not self.store.has(zoom, x, y):
+                    try:
+                        self.fetch(zoom, x, y)
+                        progress["fetched"] += 1
+                    except requests.exceptions.RequestException:
+                        progress["failed"] += 1
+                progress["done"] += 1
+        return progress
+
+
+class TileServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cache=None):
+        super().__init__(address, TileHandler)
+        self.cache = cache or TileCache()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class TileHandler(BaseHTTPRequestHandler):
+    """GET /{z}/{x}/{y}.png from the tile cache; GET /_tiles/stats for store size."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if status == 200 and content_type == "image/png":
+            self.send_header("Cache-Control", "max-age=86400")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].strip("/")
+        if path == "_tiles/stats":
+            stats = self.server.cache.store.stats()
+            self._send(200, json.dumps(stats).encode(), "application/json")
+            return
+        parts = path.split("/")
+        try:
+            z, x, y = int(parts[0]), int(parts[1]), int(parts[2].split(".")[0])
+            if len(parts) != 3 or not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+                raise ValueError
+        except (IndexError, ValueError):
+            self._send(404, b"not a tile", "text/plain")
+            return
+        data = self.server.cache.tile(z, x, y)
+        if data is None:
+            self._send(404, b"tile not available offline", "text/plain")
+        else:
+            self._send(200, data, "image/png")
+
+
+def tile_url_template():
+    """Leaflet URL template for the local tile server, or None when TRIP_TILE_URL isn't set."""
+    if not TILE_SERVER_URL:
+        return None
+    return TILE_SERVER_URL + "/{z}/{x}/{y}.png"
+
+
+def start_tile_server(port=0, cache=None):
+    """Start a tile server on a background thread (port 0 = any free port). Returns the server."""
+    server = TileServer(("127.0.0.1", port), cache)
+    threading.Thread(target=server.serve_forever, name="tile-server", daemon=True).start()
+    return server
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tile_cache():
+    """Process-wide TileCache, opened on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TileCache()
+        return _cache
+
+
+def _parse_zooms(value):
+    """'6-11' or '6,8,10' -> [6, 7, ...]."""
+    zooms = []
+    for part in value.split(","):
+        low, _, high = part.partition("-")
+        zooms.extend(range(int(low), int(high or low) + 1))
+    return zooms
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline map tile cache and server for Trip Planner")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--prefetch", help="download the tiles of south,west,north,east and exit")
+    parser.add_argument("--zooms", default="6-11", help="zoom levels to prefetch, e.g. 6-11 or 8,10,12")
+    args = parser.parse_args()
+    if args.prefetch:
+        bbox = tuple(float(v) for v in args.prefetch.split(","))
+        result = get_tile_cache().prefetch(bbox, _parse_zooms(args.zooms))
+        print(f"{result['fetched']} tiles downloaded, {result['failed']} failed, {result['total']} in area")
+        print(get_tile_cache().store.stats())
+    else:
+        server = TileServer(("127.0.0.1", args.port), get_tile_cache())
+        print(f"Tile server listening on {server.base_url}")
+        print(f"  TRIP_TILE_URL={server.base_url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass